@@ -0,0 +1,171 @@
+import math
+import time
+from typing import Callable, Dict, Optional
+
+
+# RVR logs arrive every 10 minutes
+DATA_CADENCE_SECONDS = 600
+OVERRUN_POLICIES = ('coalesce', 'skip')
+
+
+def cadence_period(interval: float, cadence: float = DATA_CADENCE_SECONDS) -> float:
+    """
+    Snap an update interval so its ticks line up with the data cadence
+
+    Intervals shorter than the cadence become the largest whole divisor of
+    it that is not longer than the interval (60 -> 60, 45 -> 40); longer
+    ones become a whole multiple of it.
+
+    Args:
+        interval: Requested update interval (seconds)
+        cadence: Data cadence (seconds)
+
+    Returns:
+        Tick period in seconds
+    """
+    if interval >= cadence:
+        return float(cadence * max(1, round(interval / cadence)))
+    divisor = math.ceil(cadence / interval)
+    while cadence % divisor:
+        divisor += 1
+    return cadence / divisor
+
+
+class CycleScheduler:
+    """
+    Wall-clock aligned cycle scheduler with deadline accounting
+
+    Ticks fall on multiples of `period` seconds since the epoch, shifted by
+    `offset` (e.g., a few seconds after each 10-minute boundary to let the
+    log writer finish). A cycle misses its deadline when it is still
+    running `deadline` seconds after its tick. Ticks that pass while a
+    cycle overruns are never queued: with the 'coalesce' policy the most
+    recent missed tick runs at once and stands in for the others; with
+    'skip' they are all dropped and the scheduler waits for the next
+    boundary.
+    """
+
+    def __init__(self, period: float, offset: float = 0.0, deadline: Optional[float] = None,
+                 overrun_policy: str = 'coalesce', load_threshold: float = 0.5,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize the scheduler
+
+        Args:
+            period: Seconds between ticks
+            offset: Shift of every tick from the aligned boundary (seconds)
+            deadline: Seconds after its tick by which a cycle should finish (default: period)
+            overrun_policy: 'coalesce' or 'skip' for ticks missed during an overrun
+            load_threshold: Start lateness, as a fraction of the period, that counts as load
+            clock: Wall-clock source (seconds since the epoch)
+        """
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"overrun_policy must be one of {OVERRUN_POLICIES}")
+        self.period = float(period)
+        self.offset = float(offset) % self.period
+        self.deadline = float(deadline) if deadline is not None else self.period
+        self.overrun_policy = overrun_policy
+        self.load_threshold = load_threshold
+        self.clock = clock
+
+        self._last_tick = None
+        self._overran = False
+        self.stats = {
+            'ticks': 0,
+            'deadline_misses': 0,
+            'coalesced_ticks': 0,
+            'skipped_ticks': 0,
+            'last_lateness_s': None,
+            'max_lateness_s': 0.0,
+            'last_duration_s': None,
+        }
+
+    def boundary_at_or_before(self, t: float) -> float:
+        return math.floor((t - self.offset) / self.period) * self.period + self.offset
+
+    def next_tick(self, now: Optional[float] = None) -> float:
+        """
+        Scheduled time of the next cycle
+
+        Ticks that already passed since the last executed one are coalesced
+        or skipped according to the overrun policy.
+        """
+        now = self.clock() if now is None else now
+        if self._last_tick is None:
+            boundary = self.boundary_at_or_before(now)
+            return boundary if boundary >= now else boundary + self.period
+
+        candidate = self._last_tick + self.period
+        if candidate >= now:
+            return candidate
+
+        latest = self.boundary_at_or_before(now)
+        missed = int(round((latest - candidate) / self.period)) + 1
+        if self.overrun_policy == 'coalesce':
+            self.stats['coalesced_ticks'] += missed - 1
+            self._last_tick = latest - self.period  # the latest missed tick runs now
+            return latest
+        self.stats['skipped_ticks'] += missed
+        self._last_tick = latest
+        return latest + self.period
+
+    def wait_until(self, tick: float, waiter: Optional[Callable[[float], bool]] = None) -> bool:
+        """
+        Block until a tick is due
+
+        Args:
+            tick: Scheduled time (seconds since the epoch)
+            waiter: Optional wait(timeout) -> bool that may return early (e.g., a
+                    file watcher); its True result is passed through
+
+        Returns:
+            True if the waiter returned early, False when the tick is due
+        """
+        timeout = max(0.0, tick - self.clock())
+        if waiter is not None:
+            return bool(waiter(timeout))
+        if timeout:
+            time.sleep(timeout)
+        return False
+
+    def start_cycle(self, tick: float) -> float:
+        """Record the start of a scheduled cycle and return its lateness (seconds)"""
+        lateness = max(0.0, self.clock() - tick)
+        self.stats['ticks'] += 1
+        self.stats['last_lateness_s'] = round(lateness, 3)
+        self.stats['max_lateness_s'] = round(max(self.stats['max_lateness_s'], lateness), 3)
+        return lateness
+
+    def finish_cycle(self, tick: float, started: Optional[float] = None) -> bool:
+        """
+        Record the end of a scheduled cycle
+
+        Returns:
+            True if the cycle missed its deadline
+        """
+        now = self.clock()
+        if started is not None:
+            self.stats['last_duration_s'] = round(now - started, 3)
+        missed = now > tick + self.deadline
+        if missed:
+            self.stats['deadline_misses'] += 1
+        self._overran = missed
+        self._last_tick = tick
+        return missed
+
+    @property
+    def under_load(self) -> bool:
+        """Whether the last cycle overran or started later than the load threshold"""
+        lateness = self.stats['last_lateness_s'] or 0.0
+        return self._overran or lateness > self.load_threshold * self.period
+
+    def get_status(self) -> Dict:
+        status = dict(self.stats)
+        status.update({
+            'period_s': self.period,
+            'offset_s': self.offset,
+            'deadline_s': self.deadline,
+            'overrun_policy': self.overrun_policy,
+            'under_load': self.under_load,
+        })
+        return status
@@ -1,207 +1,313 @@
-import pandas as pd
-import glob
+"""
+RVR map generator: rvr_map_with_slider.html from the newest prediction CSV
+
+Run as a script (see --help) or import it, e.g. from RealTimeRVRSystem:
+
+    from generate_rvr_map import generate_map
+    generate_map(mode='incremental')
+
+Prediction files are found through each prediction directory's
+predictions_manifest.json (see prediction_manifest.py), so the newest file,
+or the files covering a --start/--end range, are resolved without listing
+the directories or opening files outside the range.
+
+folium and pandas are imported by the functions that need them, and the
+runway TDZ/MID positions are computed from data/runways.json with the
+vectorized geodesic in runway_geometry.py (no geopy), so an incremental
+refresh that leaves the map shell alone does not import folium.
+"""
+
+import argparse
+import gc
 import os
-import folium
-from folium import plugins
-from geopy.distance import geodesic
-import numpy as np
-from datetime import datetime, timedelta
-from folium import Element
-import json
-
-print("=== RVR MAP GENERATOR WITH TIME SLIDER ===\n")
-
-# Step 1: Check if folder exists
-folder_path = '.'  # Look in current directory
-print(f"1. Checking folder: {folder_path}")
-print(f"   Folder exists: {os.path.exists(folder_path)}")
-
-if os.path.exists(folder_path):
-    files = os.listdir(folder_path)
-    csv_files_in_dir = [f for f in files if f.endswith('.csv')]
-    print(f"   CSV files in folder: {csv_files_in_dir}")
-else:
-    print("   ❌ FOLDER NOT FOUND!")
-    print("   Current directory:", os.getcwd())
-    print("   Available folders:", [d for d in os.listdir('.') if os.path.isdir(d)])
-
-# Step 2: Find CSV files - ENHANCED DEBUGGING
-print(f"\n2. ENHANCED CSV FILE SEARCH:")
-print(f"   Current working directory: {os.getcwd()}")
-
-# Check multiple possible locations for CSV files - PRIORITIZE REAL-TIME DATA
-search_paths = [
-    'data/real_time_predictions',  # Real-time predictions directory
-    'data/real_time_predictions/latest_predictions.csv',  # Latest predictions file
-    '.',  # Current directory
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from runway_geometry import load_airport, zone_positions
+
+OUTPUT_FILE = 'rvr_map_with_slider.html'
+LIVE_PAGE = 'rvr_map_live.html'
+MAP_MODES = ('slider', 'compact', 'surface', 'pyramid', 'incremental', 'live')
+
+# Runway thresholds, headings, lengths and zone offsets (data/runways.json)
+AIRPORT = load_airport()
+RUNWAYS = AIRPORT['runways']
+MAP_ZONES = ('TDZ', 'MID')
+
+# Prediction directories, indexed by their predictions_manifest.json (relative to the working directory)
+PREDICTION_DIRS = (
     'data/predicted_rvr',  # predicted_rvr subdirectory
+    'data/real_time_predictions',  # Real-time predictions directory (wins on overlapping rows)
+)
+# Other places a CSV may be dropped by hand; small, so still listed directly
+SEARCH_PATHS = (
+    '.',  # Current directory
     'data/raw',  # raw data directory (if needed)
-]
-
-all_csv_files = []
-for search_path in search_paths:
-    print(f"\n   Searching in: {search_path}")
-    print(f"   Path exists: {os.path.exists(search_path)}")
-    
-    if os.path.exists(search_path):
-        if os.path.isdir(search_path):
-            files_in_path = os.listdir(search_path)
-            csv_files_in_path = [f for f in files_in_path if f.endswith('.csv')]
-            print(f"   Files in {search_path}: {len(files_in_path)} total files")
-            print(f"   CSV files in {search_path}: {csv_files_in_path}")
-            
-            # Add full paths to the list
-            for csv_file in csv_files_in_path:
-                full_path = os.path.join(search_path, csv_file)
-                all_csv_files.append(full_path)
-                print(f"   Added: {full_path}")
-        else:
-            # It's a file, check if it's a CSV
-            if search_path.endswith('.csv'):
-                all_csv_files.append(search_path)
-                print(f"   Added file: {search_path}")
+)
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+def runway_positions(runways: Dict = RUNWAYS, zones: Optional[Dict] = None) -> Dict[str, Tuple[float, float]]:
+    """
+    TDZ and MID points of every runway (see runway_geometry.zone_positions)
+
+    Args:
+        runways: Runway definitions (beg, heading, length_m)
+        zones: Zone offsets (default: the airport's, from data/runways.json)
+
+    Returns:
+        Dictionary of zone name -> (lat, lon)
+    """
+    return zone_positions(runways, zones or AIRPORT['zones'], MAP_ZONES)
+
+
+def find_csv_files(search_paths=SEARCH_PATHS, verbose: bool = False) -> List[str]:
+    """
+    Prediction CSV files in the search paths
+
+    Args:
+        search_paths: Directories (all their .csv files) and .csv file paths
+        verbose: Print what was searched and found
+
+    Returns:
+        CSV paths, without duplicates, in search order
+    """
+    log = print if verbose else _quiet
+    log(f"\n2. ENHANCED CSV FILE SEARCH:")
+    log(f"   Current working directory: {os.getcwd()}")
+
+    all_csv_files = []
+    for search_path in search_paths:
+        log(f"\n   Searching in: {search_path}")
+        log(f"   Path exists: {os.path.exists(search_path)}")
+
+        if os.path.exists(search_path):
+            if os.path.isdir(search_path):
+                files_in_path = os.listdir(search_path)
+                csv_files_in_path = [f for f in files_in_path if f.endswith('.csv')]
+                log(f"   Files in {search_path}: {len(files_in_path)} total files")
+                log(f"   CSV files in {search_path}: {csv_files_in_path}")
+
+                # Add full paths to the list
+                for csv_file in csv_files_in_path:
+                    full_path = os.path.join(search_path, csv_file)
+                    all_csv_files.append(full_path)
+                    log(f"   Added: {full_path}")
             else:
-                print(f"   {search_path} is not a CSV file")
+                # It's a file, check if it's a CSV
+                if search_path.endswith('.csv'):
+                    all_csv_files.append(search_path)
+                    log(f"   Added file: {search_path}")
+                else:
+                    log(f"   {search_path} is not a CSV file")
+        else:
+            log(f"   Path {search_path} does not exist")
+
+    csv_files = list(dict.fromkeys(os.path.normpath(path) for path in all_csv_files))
+    log(f"\n   Total CSV files found across all paths: {len(csv_files)}")
+    for i, file_path in enumerate(csv_files):
+        log(f"   {i+1}. {file_path}")
+
+    if not csv_files:
+        log("   ❌ NO CSV FILES FOUND!")
+        log(f"   Current directory contents: {os.listdir('.')}")
     else:
-        print(f"   Path {search_path} does not exist")
-
-print(f"\n   Total CSV files found across all paths: {len(all_csv_files)}")
-for i, file_path in enumerate(all_csv_files):
-    print(f"   {i+1}. {file_path}")
-
-# Use the found CSV files instead of glob
-csv_files = all_csv_files
-
-if not csv_files:
-    print("   ❌ NO CSV FILES FOUND!")
-    print("   DEBUG: Let's check what's actually in the current directory:")
-    print(f"   Current directory contents: {os.listdir('.')}")
-    if os.path.exists('predicted_rvr'):
-        print(f"   predicted_rvr directory contents: {os.listdir('predicted_rvr')}")
-else:
-    print(f"   ✅ Found {len(csv_files)} CSV files")
-
-# Step 3: Define runway positions with better coordinates
-runways = {
-    '11': {'beg': (28.546269726812046, 77.07209263473048), 'heading': 103.0, 'length_m': 4430},
-    '29': {'beg': (28.538300748490773, 77.1068818248323), 'heading': 283.0, 'length_m': 4430},
-    '10': {'beg': (28.567182331326887, 77.08498547442058), 'heading': 104.4, 'length_m': 3813},
-    '28': {'beg': (28.558606400571975, 77.12240587666396), 'heading': 284.4, 'length_m': 3813},
-    '09': {'beg': (28.570559706309265, 77.08822392522595), 'heading': 91.4,  'length_m': 2816},
-    '27': {'beg': (28.569910389750675, 77.11687357828113), 'heading': 271.4, 'length_m': 2816},
-}
-
-print(f"\n3. Computing runway positions...")
-predicted_map = {}
-for rwy, data in runways.items():
-    beg = data['beg']
-    hdg = data['heading']
-    length = data['length_m']
-    tdz = geodesic(meters=300).destination(beg, hdg)
-    mid = geodesic(meters=length / 2).destination(beg, hdg)
-    
-    predicted_map[f'RWY_{rwy}_TDZ'] = (tdz.latitude, tdz.longitude)
-    predicted_map[f'RWY_{rwy}_MID'] = (mid.latitude, mid.longitude)
-
-print(f"   Expected zone names: {list(predicted_map.keys())}")
+        log(f"   ✅ Found {len(csv_files)} CSV files")
+    return csv_files
+
+
+def prediction_manifests(directories=PREDICTION_DIRS, verbose: bool = False) -> List:
+    """
+    Loaded manifests of the existing prediction directories
+
+    A directory without a manifest (or changed since its manifest was
+    saved) is indexed once here.
+    """
+    from prediction_manifest import PredictionManifest
+
+    log = print if verbose else _quiet
+    manifests = []
+    for directory in directories:
+        if os.path.isdir(directory):
+            manifest = PredictionManifest(directory).load_or_build()
+            log(f"   📇 {manifest.path}: {len(manifest)} files")
+            manifests.append(manifest)
+    return manifests
+
+
+def latest_prediction_file(verbose: bool = False) -> Optional[str]:
+    """
+    Most recently written prediction CSV
+
+    Read from the manifests of PREDICTION_DIRS; only the small
+    SEARCH_PATHS directories are listed.
+    """
+    candidates = []
+    for manifest in prediction_manifests(verbose=verbose):
+        entry = manifest.latest()
+        if entry is not None:
+            candidates.append((entry['mtime_ns'], str(entry['path'])))
+    candidates += [(os.stat(path).st_mtime_ns, path) for path in find_csv_files(verbose=verbose)]
+    return max(candidates)[1] if candidates else None
+
+
+def load_prediction_range(start=None, end=None, verbose: bool = False):
+    """
+    Prediction rows of start..end from the files that cover the range
+
+    Returns:
+        (DataFrame, latest row, 'Datetime'); (None, None, None) if no rows
+    """
+    import pandas as pd
+
+    frames = [manifest.read_range(start, end) for manifest in prediction_manifests(verbose=verbose)]
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        print(f"   ❌ No predictions between {start or 'the start'} and {end or 'the end'}")
+        return None, None, None
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates('Datetime', keep='last').sort_values('Datetime').reset_index(drop=True)
+    print(f"   {len(df)} rows from {df['Datetime'].min()} to {df['Datetime'].max()}")
+    return df, df.iloc[-1], 'Datetime'
+
+
+def load_predictions(path: str, verbose: bool = False):
+    """
+    Read a prediction CSV and parse its datetime column
+
+    Args:
+        path: CSV file
+        verbose: Print the file's shape, columns and sample values
+
+    Returns:
+        (DataFrame, latest row, datetime column); (None, None, None) if the
+        file cannot be read. The latest row and datetime column are None
+        when no datetime column could be parsed.
+    """
+    import pandas as pd
+
+    log = print if verbose else _quiet
+    log(f"\n4. Processing file for time series: {os.path.basename(path)}")
+    log(f"   Full path: {path}")
+    log(f"   File size: {os.path.getsize(path) / (1024*1024):.2f} MB")
+    log(f"   Last modified: {datetime.fromtimestamp(os.path.getmtime(path))}")
+
+    try:
+        df = pd.read_csv(path)
+    except Exception as e:
+        print(f"   ❌ Error processing CSV {path}: {e}")
+        return None, None, None
+
+    log(f"   ✅ Successfully read CSV file")
+    log(f"   Shape: {df.shape}")
+    log(f"   Columns: {list(df.columns)}")
+    if verbose:
+        print(f"   First 3 rows:")
+        print(df.head(3).to_string())
+
+    # Find datetime column
+    datetime_candidates = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
+    log(f"   Datetime column candidates: {datetime_candidates}")
+    if not datetime_candidates:
+        print(f"   ❌ No datetime column found in {path}")
+        return df, None, None
+
+    datetime_col = datetime_candidates[0]  # Use the first one found
+    try:
+        df[datetime_col] = pd.to_datetime(df[datetime_col])
+    except Exception as e:
+        print(f"   ❌ Error converting datetime column {datetime_col}: {e}")
+        return df, None, None
+
+    # The latest row is used for the static display
+    latest_row = df.iloc[-1]
+    log(f"   ✅ Date range: {df[datetime_col].min()} to {df[datetime_col].max()} ({len(df)} rows)")
+    log(f"   Latest timestamp: {latest_row[datetime_col]}")
+
+    predicted_cols = [col for col in df.columns if 'predicted' in col.lower()]
+    log(f"   Predicted columns found: {len(predicted_cols)}")
+    if not predicted_cols:
+        print(f"   ❌ No predicted columns found in {path}")
+    for col in predicted_cols[:3]:  # Check first 3 predicted columns
+        non_null_count = df[col].notna().sum()
+        log(f"   {col}: {non_null_count}/{len(df)} non-null values")
+    return df, latest_row, datetime_col
+
 
 def prepare_time_series_data(df, runway_positions, hours_ahead=12):
     """
     Prepare time series data for the slider
-    
+
+    Builds features column-wise: each zone's values are gathered once and
+    the whole value matrix is colored by threshold binning, so a full
+    year of 10-minute steps takes seconds rather than a row-by-row pass.
+
     Args:
         df: DataFrame with prediction data
         runway_positions: Dictionary of runway zone positions
-        hours_ahead: Number of hours to look ahead
-    
+        hours_ahead: Number of hours to look ahead (None for all rows)
+
     Returns:
         List of GeoJSON features for each time step
     """
+    from rvr_map_payload import classify_rvr, round_rvr_values, select_time_window, zone_value_columns
+
     print(f"\n📊 Preparing time series data for {hours_ahead} hours...")
-    # Use the earliest timestamp in the data as the reference point
-    reference_time = df['Datetime'].min()
-    print(f"   Reference time from data: {reference_time}")
-    # Get data for the next 12 hours from reference time
-    end_time = reference_time + timedelta(hours=hours_ahead)
-    mask = (df['Datetime'] >= reference_time) & (df['Datetime'] <= end_time)
-    filtered_df = df[mask].copy()
-    if filtered_df.empty:
-        print(f"   ⚠️ No data found for the next {hours_ahead} hours")
-        print(f"   Using first {hours_ahead}*6 rows of available data")
-        filtered_df = df.head(hours_ahead * 6).copy()  # 6 records per hour (10-minute intervals)
+    filtered_df = select_time_window(df, hours_ahead)
     print(f"   Found {len(filtered_df)} time steps")
     print(f"   Time range: {filtered_df['Datetime'].min()} to {filtered_df['Datetime'].max()}")
-    
-    # Zone to column mapping
-    zone_to_column_mapping = {
-        'RWY_09_TDZ': 'RWY_09_TDZ_predicted',
-        'RWY_09_MID': 'RWY_09_BEG_predicted',  # Using BEG as MID
-        'RWY_10_TDZ': 'RWY_10_TDZ_predicted',
-        'RWY_10_MID': 'RWY_10_TDZ_predicted',  # Using TDZ as MID since no MID column
-        'RWY_11_TDZ': 'RWY_11_TDZ_predicted',
-        'RWY_11_MID': 'RWY_11_BEG_predicted',  # Using BEG as MID
-        'RWY_27_TDZ': 'RWY_27_MID_predicted',  # Using MID as TDZ
-        'RWY_27_MID': 'RWY_27_MID_predicted',
-        'RWY_28_TDZ': 'RWY_28_TDZ_predicted',
-        'RWY_28_MID': 'RWY_28_MID_predicted',
-        'RWY_29_TDZ': 'RWY_29_BEG_predicted',  # Using BEG as TDZ
-        'RWY_29_MID': 'RWY_29_MID_predicted',
-    }
-    
-    features = []
-    
-    for idx, row in filtered_df.iterrows():
-        timestamp = row['Datetime']
-        time_str = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Create features for this time step
-        for zone_name, (lat, lon) in runway_positions.items():
-            # Get predicted value
-            predicted_value = None
-            if zone_name in zone_to_column_mapping:
-                column_name = zone_to_column_mapping[zone_name]
-                if column_name in row.index and not pd.isna(row[column_name]):
-                    predicted_value = row[column_name]
-            
-            # Use default if no prediction available
-            if predicted_value is None:
-                predicted_value = 1000  # Default value
-            
-            # Determine color based on RVR value
-            if predicted_value >= 800:
-                color = 'green'
-                status = 'Good'
-            elif predicted_value >= 500:
-                color = 'orange'
-                status = 'Moderate'
-            elif predicted_value >= 200:
-                color = 'red'
-                status = 'Poor'
-            else:
-                color = 'darkred'
-                status = 'Very Poor'
-            
-            # Create GeoJSON feature with different styling for time slider
-            feature = {
-                'type': 'Feature',
-                'geometry': {
-                    'type': 'Point',
-                    'coordinates': [lon, lat]
-                },
-                'properties': {
-                    'time': time_str,
-                    'zone': zone_name,
-                    'rvr_value': round(predicted_value, 1),
-                    'status': status,
-                    'color': color,
-                    'style': {
-                        'fillColor': color,
-                        'color': 'black',
-                        'weight': 2,
-                        'fillOpacity': 0.7,
-                        'radius': 12
+
+    zone_names = list(runway_positions.keys())
+    positions = list(runway_positions.values())
+    time_strings = filtered_df['Datetime'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+    # zones x time steps
+    values = zone_value_columns(filtered_df, zone_names)
+    rounded = [round_rvr_values(zone_values) for zone_values in values]
+    colors, statuses = classify_rvr(values)
+    colors, statuses = colors.tolist(), statuses.tolist()
+
+    # Millions of short-lived dicts would otherwise trigger repeated full
+    # garbage-collector passes; none of them form reference cycles
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        features = []
+        for step, time_str in enumerate(time_strings):
+            for zone_index, zone_name in enumerate(zone_names):
+                lat, lon = positions[zone_index]
+                predicted_value = values[zone_index][step]
+                rvr_value = rounded[zone_index][step]
+                color = colors[zone_index][step]
+                status = statuses[zone_index][step]
+
+                # Create GeoJSON feature with different styling for time slider
+                features.append({
+                    'type': 'Feature',
+                    'geometry': {
+                        'type': 'Point',
+                        'coordinates': [lon, lat]
                     },
-                    'popup_content': f"""
+                    'properties': {
+                        'time': time_str,
+                        'zone': zone_name,
+                        'rvr_value': rvr_value,
+                        'status': status,
+                        'color': color,
+                        'style': {
+                            'fillColor': color,
+                            'color': 'black',
+                            'weight': 2,
+                            'fillOpacity': 0.7,
+                            'radius': 12
+                        },
+                        'popup_content': f"""
                     <div style=\"min-width: 200px;\">
                         <h4 style=\"margin: 5px 0; color: {color};\">{zone_name}</h4>
                         <p><strong>Predicted RVR:</strong> {predicted_value:.0f}m</p>
@@ -209,192 +315,92 @@ def prepare_time_series_data(df, runway_positions, hours_ahead=12):
                         <p><strong>Time:</strong> {time_str}</p>
                     </div>
                     """
-                }
-            }
-            features.append(feature)
-    
+                    }
+                })
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
     print(f"   Created {len(features)} features for time slider")
     return features
 
-# Step 4: Process the CSV file for time series data
-latest_data = None
-latest_file = None
-df = None
-if csv_files:
-    # Sort files by modification time to get the latest
-    csv_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-    latest_file = csv_files[0]
-    print(f"\n4. Processing file for time series: {os.path.basename(latest_file)}")
-    print(f"   Full path: {latest_file}")
-    print(f"   File size: {os.path.getsize(latest_file) / (1024*1024):.2f} MB")
-    print(f"   Last modified: {datetime.fromtimestamp(os.path.getmtime(latest_file))}")
-    
-    try:
-        print(f"   Attempting to read CSV file...")
-        df = pd.read_csv(latest_file)
-        print(f"   ✅ Successfully read CSV file")
-        print(f"   Shape: {df.shape}")
-        print(f"   Columns: {list(df.columns)}")
-        print(f"   Column count: {len(df.columns)}")
-        
-        # Show first few rows for debugging
-        print(f"   First 3 rows:")
-        print(df.head(3).to_string())
-        
-        # Find datetime column
-        datetime_col = None
-        datetime_candidates = []
-        for col in df.columns:
-            if 'date' in col.lower() or 'time' in col.lower():
-                datetime_candidates.append(col)
-        
-        print(f"   Datetime column candidates: {datetime_candidates}")
-        
-        if datetime_candidates:
-            datetime_col = datetime_candidates[0]  # Use the first one found
-            print(f"   Selected datetime column: {datetime_col}")
-            
-            # Check if datetime conversion works
-            try:
-                df[datetime_col] = pd.to_datetime(df[datetime_col])
-                print(f"   ✅ Successfully converted {datetime_col} to datetime")
-                print(f"   Date range: {df[datetime_col].min()} to {df[datetime_col].max()}")
-                print(f"   Total rows: {len(df)}")
-                
-                # Get the latest row for static display
-                latest_row = df.iloc[-1]
-                latest_data = latest_row
-                print(f"   Latest timestamp: {latest_row[datetime_col]}")
-                print(f"   Latest row index: {df.index[-1]}")
-                
-            except Exception as e:
-                print(f"   ❌ Error converting datetime column: {e}")
-                datetime_col = None
-        else:
-            print(f"   ❌ No datetime column found!")
-            print(f"   Available columns: {list(df.columns)}")
-        
-        # Check for predicted columns with enhanced debugging
-        predicted_cols = [col for col in df.columns if 'predicted' in col.lower()]
-        print(f"   Predicted columns found: {len(predicted_cols)}")
-        if predicted_cols:
-            print(f"   All predicted columns: {predicted_cols}")
-            print(f"   Sample predicted columns: {predicted_cols[:5]}")
-            
-            # Check for non-null values in predicted columns
-            for col in predicted_cols[:3]:  # Check first 3 predicted columns
-                non_null_count = df[col].notna().sum()
-                print(f"   {col}: {non_null_count}/{len(df)} non-null values")
-                if non_null_count > 0:
-                    print(f"   {col} sample values: {df[col].dropna().head(3).tolist()}")
-        else:
-            print(f"   ❌ No predicted columns found!")
-            print(f"   All columns: {list(df.columns)}")
-            
-    except Exception as e:
-        print(f"   ❌ Error processing CSV: {e}")
-        import traceback
-        print(f"   Full error traceback:")
-        traceback.print_exc()
-
-# Step 5: Create the map with time slider
-print(f"\n5. Creating RVR map with time slider...")
-
-# Create map centered on Delhi Airport
-m = folium.Map(location=[28.556, 77.095], zoom_start=14, tiles='OpenStreetMap')
-
-# Add runway beginning markers (static)
-print("   Adding runway beginning markers...")
-for rwy, data in runways.items():
-    folium.Marker(
-        location=data['beg'],
-        popup=f"<b>Runway {rwy} Beginning</b><br>Heading: {data['heading']}°<br>Length: {data['length_m']}m",
-        icon=folium.Icon(color='green', icon='info-sign'),
-        tooltip=f"RWY {rwy} BEG"
+
+def create_base_map(runways: Dict = RUNWAYS):
+    """Map centered on Delhi Airport with the static runway beginning markers"""
+    import folium
+
+    m = folium.Map(location=list(AIRPORT['center']), zoom_start=14, tiles='OpenStreetMap')
+
+    # Add runway beginning markers (static)
+    for rwy, data in runways.items():
+        folium.Marker(
+            location=data['beg'],
+            popup=f"<b>Runway {rwy} Beginning</b><br>Heading: {data['heading']}°<br>Length: {data['length_m']}m",
+            icon=folium.Icon(color='green', icon='info-sign'),
+            tooltip=f"RWY {rwy} BEG"
+        ).add_to(m)
+    return m
+
+
+def add_time_slider(m, df, positions: Dict, hours_ahead: Optional[float] = 12) -> bool:
+    """
+    Add the TimestampedGeoJson time slider (one feature per zone and step)
+
+    Returns:
+        False if there were no features to add
+    """
+    from folium import plugins
+
+    time_series_features = prepare_time_series_data(df, positions, hours_ahead=hours_ahead)
+    if not time_series_features:
+        return False
+
+    # Create TimestampedGeoJson layer
+    plugins.TimestampedGeoJson(
+        {
+            'type': 'FeatureCollection',
+            'features': time_series_features
+        },
+        period='PT10M',  # 10-minute periods
+        duration='PT5M',  # 5-minute duration for each step
+        add_last_point=True,
+        auto_play=False,
+        loop=False,
+        max_speed=10,
+        loop_button=True,
+        date_options='YYYY-MM-DD HH:mm:ss',
+        time_slider_drag_update=True
     ).add_to(m)
+    return True
 
-# Add time slider if we have data
-if df is not None:
-    print("   Preparing time series data for slider...")
-    
-    # Prepare time series data
-    time_series_features = prepare_time_series_data(df, predicted_map, hours_ahead=12)
-    
-    if time_series_features:
-        print("   Adding time slider to map...")
-        
-        # Create TimestampedGeoJson layer
-        timestamped_geojson = plugins.TimestampedGeoJson(
-            {
-                'type': 'FeatureCollection',
-                'features': time_series_features
-            },
-            period='PT10M',  # 10-minute periods
-            duration='PT5M',  # 5-minute duration for each step
-            add_last_point=True,
-            auto_play=False,
-            loop=False,
-            max_speed=10,
-            loop_button=True,
-            date_options='YYYY-MM-DD HH:mm:ss',
-            time_slider_drag_update=True
-        )
-        
-        # Add the time slider to the map
-        timestamped_geojson.add_to(m)
-        
-        print("   ✅ Time slider added successfully!")
-    else:
-        print("   ❌ No time series features created")
-else:
-    print("   ❌ No data available for time slider")
 
-# Add static RVR markers for the latest available values (like the old map)
-if df is not None and latest_data is not None:
-    print("   Adding static RVR markers for latest values...")
-    # Find datetime column
-    datetime_col = None
-    for col in df.columns:
-        if 'date' in col.lower() or 'time' in col.lower():
-            datetime_col = col
-            break
-    # Zone to column mapping
-    zone_to_column_mapping = {
-        'RWY_09_TDZ': 'RWY_09_TDZ_predicted',
-        'RWY_09_MID': 'RWY_09_BEG_predicted',  # Using BEG as MID
-        'RWY_10_TDZ': 'RWY_10_TDZ_predicted',
-        'RWY_10_MID': 'RWY_10_TDZ_predicted',  # Using TDZ as MID since no MID column
-        'RWY_11_TDZ': 'RWY_11_TDZ_predicted',
-        'RWY_11_MID': 'RWY_11_BEG_predicted',  # Using BEG as MID
-        'RWY_27_TDZ': 'RWY_27_MID_predicted',  # Using MID as TDZ
-        'RWY_27_MID': 'RWY_27_MID_predicted',
-        'RWY_28_TDZ': 'RWY_28_TDZ_predicted',
-        'RWY_28_MID': 'RWY_28_MID_predicted',
-        'RWY_29_TDZ': 'RWY_29_BEG_predicted',  # Using BEG as TDZ
-        'RWY_29_MID': 'RWY_29_MID_predicted',
-    }
-    for zone_name, (lat, lon) in predicted_map.items():
+def add_latest_markers(m, positions: Dict, latest_data, datetime_col: Optional[str]):
+    """
+    Add static RVR markers and labels for the latest row (like the old map)
+
+    Args:
+        m: folium.Map
+        positions: Dictionary of zone name -> (lat, lon)
+        latest_data: Latest prediction row (pandas Series)
+        datetime_col: Name of its datetime column
+    """
+    import folium
+    import pandas as pd
+
+    from rvr_map_payload import DEFAULT_RVR, ZONE_TO_COLUMN, classify_rvr
+
+    for zone_name, (lat, lon) in positions.items():
         # Get predicted value
         predicted_value = None
-        if zone_name in zone_to_column_mapping:
-            column_name = zone_to_column_mapping[zone_name]
+        if zone_name in ZONE_TO_COLUMN:
+            column_name = ZONE_TO_COLUMN[zone_name]
             if column_name in latest_data.index and not pd.isna(latest_data[column_name]):
                 predicted_value = latest_data[column_name]
         if predicted_value is None:
-            predicted_value = 1000
+            predicted_value = DEFAULT_RVR
         # Determine color
-        if predicted_value >= 800:
-            color = 'green'
-            status = 'Good'
-        elif predicted_value >= 500:
-            color = 'orange'
-            status = 'Moderate'
-        elif predicted_value >= 200:
-            color = 'red'
-            status = 'Poor'
-        else:
-            color = 'darkred'
-            status = 'Very Poor'
+        colors, statuses = classify_rvr(predicted_value)
+        color, status = str(colors), str(statuses)
         # Popup
         popup_content = f"""
         <div style='min-width: 200px;'>
@@ -425,40 +431,348 @@ if df is not None and latest_data is not None:
             location=[lat + 0.0003, lon + 0.0003],
             icon=folium.DivIcon(html=label_html, class_name='rvr-label')
         ).add_to(m)
-    print("   ✅ Static RVR markers added!")
-
-# Save map
-output_file = 'rvr_map_with_slider.html'
-m.save(output_file)
-
-print(f"\n=== SUMMARY ===")
-print(f"✅ RVR map with time slider saved to: {output_file}")
-print(f"Expected zones: {len(predicted_map)}")
-print(f"CSV files found: {len(csv_files)}")
-print(f"Latest data file: {os.path.basename(latest_file) if latest_file else 'None'}")
-
-print(f"\n=== WHAT TO CHECK ===")
-print("1. Open rvr_map_with_slider.html in your browser")
-print("2. You should see:")
-print("   - Green markers at runway beginnings")
-print("   - A time slider at the bottom of the map")
-print("   - Colored circles showing RVR predictions that change over time")
-print("   - A legend showing RVR status colors")
-
-print(f"\n3. Time Slider Features:")
-print("   - Drag the slider to see predictions at different times")
-print("   - Use play/pause buttons to animate through time")
-print("   - Shows predictions for up to 12 hours ahead")
-print("   - Each time step represents 10-minute intervals")
-
-print(f"\n4. RVR Color coding:")
-print("   - Green: ≥800m (Good visibility)")
-print("   - Orange: 500-799m (Moderate visibility)")
-print("   - Red: 200-499m (Poor visibility)")
-print("   - Dark Red: <200m (Very poor visibility)")
-
-print(f"\n5. If you don't see the slider:")
-print("   - Check if the HTML file opens properly")
-print("   - Check browser console for JavaScript errors")
-print("   - Try refreshing the page")
-print("   - Make sure you have internet connection for folium plugins")
\ No newline at end of file
+
+
+def build_map(df, latest_data, datetime_col: Optional[str], positions: Dict, mode: str = 'slider',
+              hours_ahead: Optional[float] = 12, sidecar: Optional[str] = None,
+              pyramid_dir: Optional[str] = None):
+    """
+    Base map plus the time layer of one of the file-based modes
+
+    Args:
+        df: Prediction rows with a parsed Datetime column (None for a map without data)
+        latest_data: Latest prediction row (pandas Series)
+        datetime_col: Name of its datetime column
+        positions: Dictionary of zone name -> (lat, lon)
+        mode: 'slider', 'compact', 'surface' or 'pyramid'
+        hours_ahead: Hours of data on the slider (None for all rows)
+        sidecar: Compact payload sidecar path
+        pyramid_dir: Tile directory for mode 'pyramid'
+
+    Returns:
+        folium.Map
+    """
+    m = create_base_map()
+
+    if df is None:
+        print("   ❌ No data available for time slider")
+    elif mode == 'pyramid':
+        from rvr_map_pyramid import add_pyramid_layer, build_pyramid, write_pyramid
+
+        # Every row, aggregated per level; the page loads tiles for the visible span
+        started = time.perf_counter()
+        index_path = write_pyramid(build_pyramid(df, positions), pyramid_dir or 'rvr_map_pyramid')
+        print(f"   Pyramid written to {index_path.parent} in {time.perf_counter() - started:.2f}s")
+        add_pyramid_layer(m, positions, os.path.relpath(index_path.parent).replace(os.sep, '/'))
+        print("   ✅ Pyramid time browser added")
+    elif mode in ('compact', 'surface'):
+        from rvr_map_layers import add_compact_layer
+        from rvr_map_payload import build_compact_payload, select_time_window, write_payload_sidecar
+
+        # Geometry once, zone x time values, JS recolors fixed markers
+        window = select_time_window(df, hours_ahead)
+        if mode == 'surface':
+            from rvr_surface import build_surface_payload
+
+            # Plus an interpolated surface image per step; missing zones are interpolated too
+            started = time.perf_counter()
+            payload = build_surface_payload(window, positions)
+            print(f"   Interpolated {payload['surface']['shape'][0]}x{payload['surface']['shape'][1]} "
+                  f"surface for {len(payload['offsets'])} steps in {(time.perf_counter() - started) * 1000:.0f} ms")
+        else:
+            payload = build_compact_payload(window, positions)
+        sidecar_url = None
+        if sidecar:
+            sidecar_path = write_payload_sidecar(payload, sidecar)
+            sidecar_url = os.path.relpath(sidecar_path).replace(os.sep, '/')
+            print(f"   Payload sidecar: {sidecar_path} ({os.path.getsize(sidecar_path) / 1024:.1f} KB)")
+        add_compact_layer(m, payload, sidecar_url=sidecar_url)
+        print(f"   ✅ {'Surface' if mode == 'surface' else 'Compact'} time slider added "
+              f"({len(payload['offsets'])} time steps)")
+    else:
+        if add_time_slider(m, df, positions, hours_ahead):
+            print("   ✅ Time slider added successfully!")
+        else:
+            print("   ❌ No time series features created")
+        add_latest_markers(m, positions, latest_data, datetime_col)
+        print("   ✅ Static RVR markers added!")
+
+    return m
+
+
+def update_incremental_map(source_file, output_file: str = OUTPUT_FILE, positions: Optional[Dict] = None,
+                           sidecar=None, refresh: float = 60, tail_rows: int = 1000) -> int:
+    """
+    Append new rows to the map sidecar and rebuild the HTML shell only if needed
+
+    The newest rows of the source are read from its tail; only rows after the
+    sidecar's high-water mark are appended. The whole file is read only for a
+    new sidecar or when the tail does not reach back to the high-water mark.
+
+    Args:
+        source_file: Prediction CSV (e.g. latest_predictions.csv or a day file);
+                     None only creates the sidecar header and the shell
+        output_file: Map HTML shell path
+        positions: Zone positions (default: runway_positions())
+        sidecar: Sidecar path (default: rvr_map_data.ndjson)
+        refresh: Seconds between sidecar re-fetches in the page (0 = off)
+        tail_rows: Rows read from the end of the source per run
+
+    Returns:
+        Number of time steps appended
+    """
+    from rvr_map_payload import IncrementalMapPayload, shell_fingerprint
+
+    positions = positions or runway_positions()
+    sidecar_path = Path(sidecar or 'rvr_map_data.ndjson')
+    if sidecar_path.suffix != '.ndjson':
+        sidecar_path = sidecar_path.with_suffix('.ndjson')
+    payload = IncrementalMapPayload(sidecar_path, positions)
+    existing = IncrementalMapPayload(sidecar_path)
+    if existing.load() and existing.matches_geometry(positions):
+        payload = existing
+    elif sidecar_path.exists():
+        print(f"   Runway geometry changed; rebuilding {sidecar_path}")
+        sidecar_path.unlink()
+
+    appended = 0
+    if source_file:
+        import pandas as pd
+
+        from rvr_tail_reader import CSVTailReader
+
+        started = time.perf_counter()
+        reader = CSVTailReader(source_file, max_rows=tail_rows, datetime_column=None)
+        rows = reader.read()
+        rows['Datetime'] = pd.to_datetime(rows['Datetime'], errors='coerce')
+        mark = payload.high_water_mark
+        if mark is None or (len(rows) >= tail_rows and rows['Datetime'].min() > mark):
+            # New sidecar, or the tail may not cover everything after the mark
+            rows = pd.read_csv(source_file)
+            rows['Datetime'] = pd.to_datetime(rows['Datetime'], errors='coerce')
+        appended = payload.append_frame(rows)
+        print(f"   Appended {appended} new time steps in {(time.perf_counter() - started) * 1000:.1f} ms "
+              f"(high-water mark: {payload.high_water_mark})")
+    elif not sidecar_path.exists():
+        payload.reset()
+
+    # The shell only changes with geometry or styling, never with new data
+    sidecar_url = os.path.relpath(sidecar_path, os.path.dirname(os.path.abspath(output_file))).replace(os.sep, '/')
+    fingerprint = shell_fingerprint(payload.zones, payload.coords, RUNWAYS, sidecar_url, refresh)
+    fingerprint_path = Path(output_file).with_suffix('.shell')
+    current = fingerprint_path.read_text().strip() if fingerprint_path.exists() else None
+    if current == fingerprint and Path(output_file).exists():
+        print(f"   Map shell unchanged: {output_file}")
+        return appended
+
+    from rvr_map_layers import add_compact_layer
+
+    print(f"   Regenerating map shell: {output_file}")
+    m = create_base_map()
+    add_compact_layer(m, payload.payload(), sidecar_url=sidecar_url, refresh_seconds=refresh or None)
+    m.save(output_file)
+    fingerprint_path.write_text(fingerprint + '\n')
+    return appended
+
+
+def write_live_page(output_file: str = LIVE_PAGE, positions: Optional[Dict] = None) -> str:
+    """
+    Write the live map page, whose markers live_map_server.py updates
+
+    The page needs no prediction data; the server streams it.
+
+    Returns:
+        output_file
+    """
+    from rvr_map_layers import add_live_layer
+
+    m = create_base_map()
+    add_live_layer(m, positions or runway_positions(), events_url='/events')
+    m.save(output_file)
+    return output_file
+
+
+def generate_map(output_file: str = OUTPUT_FILE, mode: str = 'slider', source_file: Optional[str] = None,
+                 hours_ahead: Optional[float] = 12, sidecar: Optional[str] = None,
+                 pyramid_dir: Optional[str] = None, refresh: float = 60, tail_rows: int = 1000,
+                 start=None, end=None, verbose: bool = False) -> str:
+    """
+    Build the RVR map from the newest prediction CSV, or from a time range
+
+    Args:
+        output_file: Map HTML path (mode 'live' defaults to rvr_map_live.html)
+        mode: 'slider' (TimestampedGeoJson, the default), 'compact' (JS-recolored
+              markers), 'surface' (compact plus an interpolated RVR surface),
+              'pyramid' (aggregate tiles in pyramid_dir),
+              'incremental' (append to an .ndjson sidecar) or 'live'
+        source_file: Prediction CSV (default: newest prediction CSV)
+        hours_ahead: Hours of data on the slider (None for all rows; ignored with a range)
+        sidecar: Compact/incremental payload sidecar path
+        pyramid_dir: Tile directory for mode 'pyramid'
+        refresh: Incremental mode: seconds between sidecar re-fetches in the page
+        tail_rows: Incremental mode: rows read from the end of the source
+        start: Range start; with start and/or end the map shows that range, read
+               from the files the manifests list for it (not in incremental mode)
+        end: Range end
+        verbose: Print the CSV search and file diagnostics
+
+    Returns:
+        Path of the map HTML
+    """
+    if mode not in MAP_MODES:
+        raise ValueError(f"Unknown map mode {mode!r}; expected one of {MAP_MODES}")
+    log = print if verbose else _quiet
+
+    positions = runway_positions()
+    log(f"\n3. Runway zones: {list(positions.keys())}")
+
+    if mode == 'live':
+        if output_file == OUTPUT_FILE:
+            output_file = LIVE_PAGE
+        return write_live_page(output_file, positions)
+
+    ranged = mode != 'incremental' and source_file is None and (start is not None or end is not None)
+    if ranged:
+        print(f"   Range: {start or 'first'} to {end or 'last'}")
+        df, latest_data, datetime_col = load_prediction_range(start, end, verbose=verbose)
+        hours_ahead = None
+    else:
+        if source_file is None:
+            source_file = latest_prediction_file(verbose=verbose)
+        print(f"   Source: {source_file}")
+
+    if mode == 'incremental':
+        update_incremental_map(source_file, output_file, positions, sidecar=sidecar,
+                               refresh=refresh, tail_rows=tail_rows)
+        return output_file
+
+    if not ranged:
+        df = latest_data = datetime_col = None
+        if source_file:
+            df, latest_data, datetime_col = load_predictions(source_file, verbose=verbose)
+    if latest_data is None:
+        df = None
+
+    log(f"\n5. Creating RVR map ({mode})...")
+    m = build_map(df, latest_data, datetime_col, positions, mode=mode, hours_ahead=hours_ahead,
+                  sidecar=sidecar, pyramid_dir=pyramid_dir)
+    m.save(output_file)
+    return output_file
+
+
+def print_guide(hours_ahead: Optional[float]):
+    """What to look for in the generated slider map"""
+    print(f"\n=== WHAT TO CHECK ===")
+    print(f"1. Open {OUTPUT_FILE} in your browser")
+    print("2. You should see:")
+    print("   - Green markers at runway beginnings")
+    print("   - A time slider at the bottom of the map")
+    print("   - Colored circles showing RVR predictions that change over time")
+
+    print(f"\n3. Time Slider Features:")
+    print("   - Drag the slider to see predictions at different times")
+    print("   - Use play/pause buttons to animate through time")
+    print(f"   - Shows predictions for up to {hours_ahead:g} hours ahead" if hours_ahead else "   - Shows all available predictions")
+    print("   - Each time step represents 10-minute intervals")
+
+    print(f"\n4. RVR Color coding:")
+    print("   - Green: ≥800m (Good visibility)")
+    print("   - Orange: 500-799m (Moderate visibility)")
+    print("   - Red: 200-499m (Poor visibility)")
+    print("   - Dark Red: <200m (Very poor visibility)")
+
+    print(f"\n5. If you don't see the slider:")
+    print("   - Check browser console for JavaScript errors")
+    print("   - Make sure you have internet connection for folium plugins")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the RVR map with a time slider")
+    parser.add_argument('--compact', action='store_true',
+                        help="Store zone x time values compactly and recolor fixed markers with JS")
+    parser.add_argument('--surface', action='store_true',
+                        help="Compact map plus an inverse-distance interpolated RVR surface image per step; "
+                             "missing zones are interpolated instead of shown as 1000 m")
+    parser.add_argument('--sidecar', default=None,
+                        help="With --compact/--surface, write the payload to this file (e.g. rvr_map_data.json.gz) "
+                             "instead of embedding it; the page must then be served over HTTP")
+    parser.add_argument('--hours', type=float, default=12,
+                        help="Hours of data on the slider from the earliest timestamp (0 = all)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Append only rows newer than the sidecar's high-water mark (compact map with "
+                             "an .ndjson sidecar); the HTML is rewritten only when geometry or styling changes")
+    parser.add_argument('--refresh', type=float, default=60,
+                        help="With --incremental, seconds between sidecar re-fetches in the page (0 = off)")
+    parser.add_argument('--tail-rows', type=int, default=1000,
+                        help="With --incremental, rows read from the end of the source CSV per run")
+    parser.add_argument('--pyramid', default=None, metavar='DIR',
+                        help="Write 10-min/1-h/6-h/1-day aggregate tiles of all rows to DIR and browse them "
+                             "by visible span (serve over HTTP)")
+    parser.add_argument('--archive', default=None, metavar='DIR',
+                        help="Render one static map per day of --start..--end into DIR, in parallel, "
+                             "with an index.html (--compact or --surface for compact day maps)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="With --archive, worker processes (default: CPU count)")
+    parser.add_argument('--live', action='store_true',
+                        help="Write rvr_map_live.html, whose markers are updated by live_map_server.py")
+    parser.add_argument('--source', default=None,
+                        help="Prediction CSV to map (default: the newest prediction CSV)")
+    parser.add_argument('--start', default=None,
+                        help="Map predictions from this time (e.g. 2024-01-05), reading only the files "
+                             "that cover the range; the slider then spans the whole range")
+    parser.add_argument('--end', default=None, help="Map predictions up to this time")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="Map HTML path")
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help="Print the CSV search, file diagnostics and a viewing guide")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    started = time.perf_counter()
+    args = parse_args(argv)
+    hours_ahead = args.hours or None
+    if args.live:
+        mode = 'live'
+    elif args.incremental:
+        mode = 'incremental'
+    elif args.pyramid:
+        mode = 'pyramid'
+    elif args.surface:
+        mode = 'surface'
+    elif args.compact:
+        mode = 'compact'
+    else:
+        mode = 'slider'
+
+    if args.archive:
+        from rvr_map_archive import render_archive
+
+        mode = 'surface' if args.surface else 'compact' if args.compact else 'slider'
+        print(f"=== RVR MAP ARCHIVE ({mode}) ===")
+        index_path = render_archive(args.start, args.end, args.archive, mode=mode, source_file=args.source,
+                                    workers=args.workers, verbose=args.verbose)
+        print(f"\n✅ Archive index saved to: {index_path} ({time.perf_counter() - started:.2f}s)")
+        return 0
+
+    print(f"=== RVR MAP GENERATOR ({mode}) ===")
+    output_file = generate_map(args.output, mode=mode, source_file=args.source, hours_ahead=hours_ahead,
+                               sidecar=args.sidecar, pyramid_dir=args.pyramid, refresh=args.refresh,
+                               tail_rows=args.tail_rows, start=args.start, end=args.end,
+                               verbose=args.verbose)
+
+    elapsed = time.perf_counter() - started
+    if mode == 'live':
+        print(f"\n✅ Live map page saved to: {output_file} ({elapsed:.2f}s)")
+        print(f"   Serve it with: python scripts/live_map_server.py")
+    elif mode == 'incremental':
+        print(f"\n✅ Incremental map update done ({elapsed:.2f}s)")
+    else:
+        print(f"\n✅ RVR map saved to: {output_file} ({elapsed:.2f}s)")
+        if args.verbose and mode == 'slider':
+            print_guide(hours_ahead)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
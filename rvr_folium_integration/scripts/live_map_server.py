@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Local live map server: pushes new RVR predictions to open map pages
+
+Endpoints:
+    GET /            the Leaflet page (generate_rvr_map.py --live; written on start if missing)
+    GET /events      server-sent events; a full state on connect, then only
+                     the zones whose values changed in each new cycle
+    GET /snapshot    latest snapshot as JSON
+    GET /health
+
+The server reads RealTimeRVRSystem.get_latest_snapshot() (lock-free) on a
+short poll interval, so new cycles reach browsers within that interval
+without regenerating any HTML.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+def snapshot_message(snapshot, previous=None) -> Optional[Dict]:
+    """
+    Event payload for a snapshot, with only the zones that changed since previous
+
+    Args:
+        snapshot: PredictionSnapshot
+        previous: Snapshot last sent (None for a full message)
+
+    Returns:
+        Message dict (a missing value is None), or None when nothing changed
+    """
+    full = previous is None or previous.zones != snapshot.zones
+    if full:
+        changed = np.ones(len(snapshot.zones), dtype=bool)
+        changed_currents = changed
+    else:
+        changed = ~_same(snapshot.predictions, previous.predictions)
+        changed_currents = ~_same(snapshot.currents, previous.currents)
+        if not changed.any() and not changed_currents.any() and snapshot.timestamp == previous.timestamp:
+            return None
+    zones = snapshot.zones
+    # A zone that lost its value is sent as null (JSON) so pages stop showing the old one
+    return {
+        'seq': snapshot.sequence,
+        'time': str(snapshot.timestamp),
+        'full': full,
+        'values': {zones[i]: _finite_or_none(snapshot.predictions[i]) for i in np.flatnonzero(changed)},
+        'currents': {zones[i]: _finite_or_none(snapshot.currents[i]) for i in np.flatnonzero(changed_currents)},
+    }
+
+
+def _finite_or_none(value) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def _same(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+
+def _sse(message: Dict) -> bytes:
+    return f"id: {message['seq']}\ndata: {json.dumps(message, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+class LiveMapServer:
+    """
+    Asyncio HTTP server streaming prediction snapshots to map pages
+    """
+
+    def __init__(self, source, page_path="rvr_map_live.html",
+                 host: str = "127.0.0.1", port: int = 8766,
+                 poll_interval: float = 0.2, heartbeat_interval: float = 15.0,
+                 client_queue_size: int = 32):
+        """
+        Initialize the server
+
+        Args:
+            source: Object with get_latest_snapshot() (e.g. a running RealTimeRVRSystem)
+            page_path: Map page served at / (from generate_rvr_map.py --live)
+            host: Interface to bind
+            port: TCP port to bind
+            poll_interval: Seconds between snapshot checks
+            heartbeat_interval: Seconds between keep-alive comments on idle streams
+            client_queue_size: Messages buffered per client before it is resynced
+        """
+        self.source = source
+        self.page_path = Path(page_path)
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.client_queue_size = client_queue_size
+
+        self._clients: Set[asyncio.Queue] = set()
+        self._last_sent = None
+        self._server = None
+        self._watch_task = None
+        self._page_cache = None
+        self.stats = {'requests': 0, 'clients': 0, 'messages': 0, 'resyncs': 0,
+                      'last_publish_latency_ms': None}
+
+    # ─── Snapshots ────────────────────────────────────────────────────────────
+    async def watch_snapshots(self):
+        """Broadcast the change of each new snapshot to every connected client"""
+        while True:
+            snapshot = self.source.get_latest_snapshot()
+            if snapshot is not None and (self._last_sent is None or
+                                         snapshot.sequence != self._last_sent.sequence):
+                message = snapshot_message(snapshot, self._last_sent)
+                self._last_sent = snapshot
+                if message is not None:
+                    self.stats['messages'] += 1
+                    self.stats['last_publish_latency_ms'] = round(
+                        (time.time() - snapshot.published_at) * 1000, 1)
+                    for queue in list(self._clients):
+                        self._offer(queue, message)
+            await asyncio.sleep(self.poll_interval)
+
+    def _offer(self, queue: asyncio.Queue, message: Dict):
+        """Queue a message; a client that fell behind gets one full message instead"""
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            self.stats['resyncs'] += 1
+            queue.put_nowait(snapshot_message(self._last_sent))
+
+    # ─── HTTP ─────────────────────────────────────────────────────────────────
+    def page(self) -> bytes:
+        """Map page bytes, re-read only when the file changes"""
+        stat = self.page_path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        if self._page_cache is None or self._page_cache[0] != version:
+            self._page_cache = (version, self.page_path.read_bytes())
+        return self._page_cache[1]
+
+    async def stream_events(self, writer: asyncio.StreamWriter):
+        """Serve one /events connection until the client goes away"""
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\n"
+                     b"Connection: keep-alive\r\n\r\n"
+                     b"retry: 2000\n\n")
+        queue = asyncio.Queue(maxsize=self.client_queue_size)
+        if self._last_sent is not None:
+            queue.put_nowait(snapshot_message(self._last_sent))
+        self._clients.add(queue)
+        self.stats['clients'] += 1
+        try:
+            await writer.drain()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                else:
+                    if message is None:
+                        break
+                    writer.write(_sse(message))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(queue)
+            self.stats['clients'] -= 1
+
+    def respond(self, writer: asyncio.StreamWriter, status: int, body: bytes,
+                content_type: str = 'application/json', keep_alive: bool = True):
+        reason = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed'}.get(status, 'Internal Server Error')
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Cache-Control: no-cache\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection; /events takes it over"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+                self.stats['requests'] += 1
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                path = urlsplit(target).path
+
+                if method != 'GET':
+                    self.respond(writer, 405, b'{"error": "only GET is supported"}', keep_alive=keep_alive)
+                elif path == '/events':
+                    await self.stream_events(writer)
+                    break
+                elif path in ('/', '/index.html'):
+                    try:
+                        self.respond(writer, 200, self.page(), 'text/html; charset=utf-8', keep_alive)
+                    except FileNotFoundError:
+                        self.respond(writer, 404, f"{self.page_path} not found; run "
+                                     f"generate_rvr_map.py --live first".encode(), 'text/plain', keep_alive)
+                elif path == '/snapshot':
+                    message = snapshot_message(self._last_sent) if self._last_sent is not None else {}
+                    self.respond(writer, 200, json.dumps(message).encode(), keep_alive=keep_alive)
+                elif path == '/health':
+                    self.respond(writer, 200, json.dumps({'status': 'ok', **self.stats}).encode(),
+                                 keep_alive=keep_alive)
+                else:
+                    self.respond(writer, 404, json.dumps({'error': f"no route for {path}"}).encode(),
+                                 keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self._watch_task = asyncio.ensure_future(self.watch_snapshots())
+        print(f"🗺️ Live RVR map on http://{self.host}:{self.port}/")
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def stop(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        for queue in list(self._clients):
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)  # ends the stream
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+def main():
+    """Run the real-time system in the background and serve the live map"""
+    from real_time_rvr_system import RealTimeRVRSystem
+
+    parser = argparse.ArgumentParser(description="Live RVR map server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--page', default='rvr_map_live.html',
+                        help="Map page from generate_rvr_map.py --live")
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    parser.add_argument('--update-interval', type=float, default=60)
+    parser.add_argument('--event-driven', action='store_true',
+                        help="Run a cycle as soon as new data lands")
+    args = parser.parse_args()
+
+    if not Path(args.page).exists():
+        from generate_rvr_map import write_live_page
+        print(f"🗺️ Writing live map page: {write_live_page(args.page)}")
+
+    system = RealTimeRVRSystem(update_interval=args.update_interval, event_driven=args.event_driven)
+    server = LiveMapServer(system, page_path=args.page, host=args.host, port=args.port,
+                           poll_interval=args.poll_interval)
+    system.start()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print(f"\n⏹️ Live map server stopped")
+    finally:
+        system.stop()
+
+
+if __name__ == "__main__":
+    main()
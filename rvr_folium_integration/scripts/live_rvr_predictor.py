@@ -1,99 +1,221 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from joblib import load as joblib_load
 from datetime import datetime, timedelta
 import json
+import os
+import threading
 import time
 from typing import Dict, List, Optional, Tuple
 
+from model_registry import ModelRegistry, RegistryView
+from prediction_cache import PredictionCache
+from rvr_cascade import PredictionCascade, TIER_CHEAP, TIER_FULL, TIER_RULE
+from rvr_features import ROLLING_WINDOWS, build_feature_vector, zone_to_rvr_column
+
 class LiveRVRPredictor:
     """
     Real-time RVR prediction system for Delhi Airport
     Takes live sensor data and predicts RVR values for different runway zones
     """
     
-    def __init__(self, model_dir: str = "saved_models"):
+    def __init__(self, model_dir: str = "saved_models", preload: bool = False,
+                 max_model_memory_mb: Optional[float] = None, load_workers: int = 4,
+                 cascade: Optional[PredictionCascade] = None, prediction_cache_size: int = 0,
+                 cache_quantization: Optional[Dict[str, Optional[float]]] = None,
+                 cache_saturation: Optional[float] = None):
         """
         Initialize the live RVR predictor
         
         Args:
             model_dir: Directory containing trained models
+            preload: Deserialize every model up front in a thread pool instead of on first use
+            max_model_memory_mb: Memory cap for loaded models (least recently used are evicted)
+            load_workers: Thread pool size for preloading
+            cascade: Cheap-first routing (defaults to PredictionCascade over saved_models/cascade)
+            prediction_cache_size: Entries in the prediction memo cache (0 disables it)
+            cache_quantization: Quantization step per feature kind ('calendar', 'rvr', 'spread');
+                                None for a kind leaves it out of the cache key
+            cache_saturation: Key all-saturated rows without calendar features (approximate;
+                              None keeps them, see PredictionCache)
         """
         self.model_dir = Path(model_dir)
-        self.models = {}
-        self.scalers = {}
-        self.feature_columns = {}
-        self.runway_zones = []
         
-        # Load all trained models
-        self._load_models()
+        # Index model files by name only; models are deserialized on demand
+        start = time.perf_counter()
+        self.registry = ModelRegistry(model_dir, max_memory_mb=max_model_memory_mb,
+                                      max_workers=load_workers, validator=self._validate_model)
+        self.models = RegistryView(self.registry, 'model')
+        self.scalers = RegistryView(self.registry, 'scaler')
+        self.feature_columns = RegistryView(self.registry, 'feature_columns')
+        self.runway_zones = self.registry.runway_ids
+        
+        if preload:
+            self.registry.preload()
+        self.cold_start_seconds = time.perf_counter() - start
         
         # Initialize historical data storage for lag features
         self.historical_data = {}
         self.max_lag = 3  # Maximum lag period
+        # Rolling-window features need more history than the lags alone
+        self.history_size = max(self.max_lag + 1, max(ROLLING_WINDOWS))
+        
+        # Cheap-first routing: saturation rule -> shallow model -> tuned model
+        self.cascade = cascade if cascade is not None else PredictionCascade(str(self.model_dir / "cascade"))
+        self.shadow_full_model = False
+        self.last_prediction_tiers = {}
+        
+        # Optional memo of model outputs keyed on quantized feature vectors
+        self.prediction_cache = None
+        if prediction_cache_size > 0:
+            self.prediction_cache = PredictionCache(prediction_cache_size, cache_quantization,
+                                                    saturation=cache_saturation)
         
-        print(f"Loaded {len(self.models)} models for live prediction")
+        # Hot reload: validated entries wait here until the next cycle swaps them in
+        self._pending_models = {}
+        self._pending_lock = threading.Lock()
+        self._seen_versions = {}
+        self._rejected_versions = {}
+        self._watcher_thread = None
+        self._watcher_stop = threading.Event()
+        self.model_reloads = []
+        
+        loaded = len(self.registry.get_status()['loaded_models'])
+        print(f"Indexed {len(self.runway_zones)} models in {self.model_dir} "
+              f"({loaded} loaded, cold start {self.cold_start_seconds * 1000:.1f} ms)")
     
-    def _load_models(self):
-        """Load all trained models from the model directory"""
-        print(f"🔍 Searching for models in: {self.model_dir}")
-        print(f"   Directory exists: {self.model_dir.exists()}")
+    def get_model_registry_status(self) -> Dict:
+        """
+        Get model loading status (index size, loaded models, memory use, cold-start timings)
         
-        model_files = list(self.model_dir.glob("rvr_model_RWY_*.pkl"))
-        print(f"   Found {len(model_files)} model files")
+        Returns:
+            Dictionary with registry statistics
+        """
+        status = self.registry.get_status()
+        status['cold_start_ms'] = round(self.cold_start_seconds * 1000, 3)
+        status['pending_reloads'] = list(self._pending_models.keys())
+        status['reload_count'] = len(self.model_reloads)
+        return status
+    
+    def start_model_watcher(self, poll_interval: float = 30.0):
+        """
+        Watch the model directory and load retrained models in the background
+        
+        New files are deserialized and smoke-tested on the watcher thread;
+        apply_pending_model_updates() swaps them in between prediction cycles.
         
-        for model_file in model_files:
+        Args:
+            poll_interval: Seconds between directory checks
+        """
+        if self._watcher_thread is not None and self._watcher_thread.is_alive():
+            return
+        self._watcher_stop.clear()
+        self._watcher_thread = threading.Thread(
+            target=self._watch_models, args=(poll_interval,), name="rvr-model-watcher", daemon=True
+        )
+        self._watcher_thread.start()
+        print(f"👀 Watching {self.model_dir} for model updates every {poll_interval}s")
+    
+    def stop_model_watcher(self):
+        """Stop the model directory watcher thread"""
+        self._watcher_stop.set()
+        if self._watcher_thread is not None:
+            self._watcher_thread.join(timeout=5)
+            self._watcher_thread = None
+    
+    def _watch_models(self, poll_interval: float):
+        """Watcher thread body"""
+        while not self._watcher_stop.wait(poll_interval):
             try:
-                print(f"\n   📁 Processing: {model_file.name}")
-                print(f"   File size: {model_file.stat().st_size / 1024:.1f} KB")
-                
-                # Parse runway and zone from filename
-                parts = model_file.stem.split("_")
-                print(f"   Filename parts: {parts}")
-                
-                if len(parts) >= 5:
-                    runway = parts[3]  # e.g., '09'
-                    zone = parts[4]    # e.g., 'BEG'
-                    runway_id = f"RWY_{runway}_{zone}"
-                    print(f"   Parsed runway: {runway}, zone: {zone}")
-                    print(f"   Runway ID: {runway_id}")
-                    
-                    # Load model data
-                    print(f"   Loading model data...")
-                    model_data = joblib_load(model_file)
-                    
-                    if isinstance(model_data, dict) and 'model' in model_data:
-                        self.models[runway_id] = model_data['model']
-                        self.scalers[runway_id] = model_data.get('scaler')
-                        self.feature_columns[runway_id] = model_data.get('feature_columns', [])
-                        self.runway_zones.append(runway_id)
-                        
-                        print(f"   ✅ Successfully loaded model for {runway_id}")
-                        print(f"   Model type: {type(model_data['model']).__name__}")
-                        print(f"   Has scaler: {self.scalers[runway_id] is not None}")
-                        print(f"   Feature columns: {len(self.feature_columns[runway_id])} columns")
-                        if self.feature_columns[runway_id]:
-                            print(f"   Sample features: {self.feature_columns[runway_id][:3]}")
-                    else:
-                        print(f"   ❌ Invalid model format for {model_file.name}")
-                        print(f"   Model data type: {type(model_data)}")
-                        if isinstance(model_data, dict):
-                            print(f"   Available keys: {list(model_data.keys())}")
-                        
-                else:
-                    print(f"   ❌ Could not parse filename: {model_file.name}")
-                    print(f"   Expected format: rvr_model_RWY_XX_YY.pkl")
-                        
+                self.check_for_model_updates()
+            except Exception as e:
+                print(f"   ❌ Error checking for model updates: {e}")
+    
+    def check_for_model_updates(self) -> List[str]:
+        """
+        Load and validate changed model files, staging them for the next swap
+        
+        A file is only loaded once its version (mtime, size) has been seen
+        unchanged on two consecutive checks, so half-written pickles are skipped.
+        
+        Returns:
+            List of runway zones with a validated model waiting to be swapped in
+        """
+        staged = []
+        changed = self.registry.changed_models()
+        
+        for runway_id, info in changed.items():
+            version = info['version']
+            if self._rejected_versions.get(runway_id) == version:
+                continue
+            if self._seen_versions.get(runway_id) != version:
+                # First sighting: wait one more check for the write to settle
+                self._seen_versions[runway_id] = version
+                continue
+            with self._pending_lock:
+                pending = self._pending_models.get(runway_id)
+            if pending is not None and pending.version == version:
+                continue
+            
+            try:
+                entry = self.registry.load_entry(runway_id, info['path'])
+                self._validate_model(entry)
             except Exception as e:
-                print(f"   ❌ Error loading model {model_file.name}: {e}")
-                import traceback
-                traceback.print_exc()
+                print(f"   ❌ Rejected new model for {runway_id}: {e}")
+                self._rejected_versions[runway_id] = version
+                continue
+            
+            with self._pending_lock:
+                self._pending_models[runway_id] = entry
+            staged.append(runway_id)
+            print(f"   📦 Staged new model for {runway_id} (loaded in {entry.load_seconds * 1000:.1f} ms)")
         
-        print(f"\n📊 Model Loading Summary:")
-        print(f"   Total models loaded: {len(self.models)}")
-        print(f"   Runway zones: {self.runway_zones}")
-        print(f"   Models with scalers: {sum(1 for scaler in self.scalers.values() if scaler is not None)}")
+        return staged
+    
+    def _validate_model(self, entry):
+        """
+        Smoke-test a freshly loaded model before it is allowed to serve
+        
+        Raises:
+            ValueError: The model cannot score a feature vector or returns a non-finite value
+        """
+        if not entry.feature_columns:
+            raise ValueError("model has no feature_columns")
+        features = np.zeros((1, len(entry.feature_columns)))
+        if entry.scaler is not None:
+            features = entry.scaler.transform(features)
+        prediction = np.asarray(entry.model.predict(features), dtype=float)
+        if prediction.shape[0] != 1 or not np.isfinite(prediction).all():
+            raise ValueError(f"smoke prediction returned {prediction}")
+    
+    def apply_pending_model_updates(self) -> List[str]:
+        """
+        Swap staged models in; call between prediction cycles
+        
+        Each zone's model/scaler/feature_columns triple is replaced as one
+        object, and the historical data buffers are left untouched.
+        
+        Returns:
+            List of runway zones whose model was swapped
+        """
+        with self._pending_lock:
+            pending, self._pending_models = self._pending_models, {}
+        
+        for runway_id, entry in pending.items():
+            self.registry.swap(entry)
+            if self.prediction_cache is not None:
+                self.prediction_cache.invalidate(runway_id)
+            self.model_reloads.append({
+                'runway_id': runway_id,
+                'version': entry.version,
+                'swapped_at': datetime.now(),
+            })
+            print(f"   🔁 Swapped in new model for {runway_id}")
+        self.model_reloads = self.model_reloads[-100:]
+        
+        # Pick up zones whose model files were added since startup
+        self.runway_zones = self.registry.runway_ids
+        return list(pending.keys())
     
     def update_sensor_data(self, sensor_data: Dict[str, float], timestamp: Optional[datetime] = None):
         """
@@ -112,14 +234,74 @@ class LiveRVRPredictor:
             if runway_id not in self.historical_data:
                 self.historical_data[runway_id] = []
             
-            self.historical_data[runway_id].append({
+            history = self.historical_data[runway_id]
+            if history and history[-1]['timestamp'] == timestamp:
+                # A corrected reading replaces the one it corrects
+                history[-1] = {'timestamp': timestamp, 'value': value}
+                continue
+            history.append({
                 'timestamp': timestamp,
                 'value': value
             })
             
-            # Keep only the last max_lag + 1 entries
-            if len(self.historical_data[runway_id]) > self.max_lag + 1:
-                self.historical_data[runway_id] = self.historical_data[runway_id][-self.max_lag-1:]
+            # Keep only the entries the lag and rolling features need
+            if len(self.historical_data[runway_id]) > self.history_size:
+                self.historical_data[runway_id] = self.historical_data[runway_id][-self.history_size:]
+    
+    def save_history_snapshot(self, path) -> int:
+        """
+        Write the lag/rolling buffers to a compact binary file (numpy .npz)
+        
+        Args:
+            path: Snapshot file; replaced atomically
+            
+        Returns:
+            Size of the snapshot in bytes
+        """
+        path = Path(path)
+        zones = sorted(zone for zone, entries in self.historical_data.items() if entries)
+        entries = [entry for zone in zones for entry in self.historical_data[zone]]
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                zones=np.array(zones, dtype=str),
+                counts=np.array([len(self.historical_data[zone]) for zone in zones], dtype=np.int32),
+                values=np.array([entry['value'] for entry in entries], dtype=float),
+                times=pd.DatetimeIndex([entry['timestamp'] for entry in entries]).as_unit('ns').asi8,
+            )
+        os.replace(tmp_path, path)
+        return path.stat().st_size
+    
+    def load_history_snapshot(self, path) -> Optional[pd.Timestamp]:
+        """
+        Replace the lag/rolling buffers with a snapshot written by save_history_snapshot
+        
+        Args:
+            path: Snapshot file
+            
+        Returns:
+            Newest reading timestamp in the snapshot, or None if it is missing or unreadable
+        """
+        try:
+            with np.load(path) as snapshot:
+                zones, counts = snapshot['zones'], snapshot['counts']
+                values, times = snapshot['values'], pd.to_datetime(snapshot['times'], unit='ns')
+        except (OSError, KeyError, ValueError) as e:
+            if Path(path).exists():
+                print(f"   ⚠️ Ignoring unreadable history snapshot {path}: {e}")
+            return None
+        
+        history = {}
+        offset = 0
+        for zone, count in zip(zones, counts):
+            history[str(zone)] = [
+                {'timestamp': times[i], 'value': float(values[i])}
+                for i in range(offset, offset + int(count))
+            ][-self.history_size:]
+            offset += int(count)
+        self.historical_data = history
+        return times.max() if len(times) else None
     
     def create_lag_features(self, runway_id: str) -> Optional[np.ndarray]:
         """
@@ -158,10 +340,42 @@ class LiveRVRPredictor:
         print(f"   ✅ Created features for {runway_id}: {features_array.shape}")
         return features_array
     
+    def create_model_features(self, runway_id: str, feature_columns: List[str]) -> Optional[np.ndarray]:
+        """
+        Create the full model input row (calendar, lag, rolling and cross-runway features)
+        
+        Args:
+            runway_id: Runway zone identifier (e.g., 'RWY_09_BEG')
+            feature_columns: Feature names saved with the model
+            
+        Returns:
+            Array of shape (1, len(feature_columns)) or None if insufficient data
+        """
+        data = self.historical_data.get(runway_id, [])
+        if len(data) < self.max_lag + 1:
+            return None
+        
+        recent_values = [entry['value'] for entry in data]
+        latest_values = {
+            zone_to_rvr_column(zone): entries[-1]['value']
+            for zone, entries in self.historical_data.items() if entries
+        }
+        return build_feature_vector(feature_columns, recent_values, data[-1]['timestamp'], latest_values)
+    
+    def _score(self, entry, features: np.ndarray) -> np.ndarray:
+        """Run one registry entry over a feature matrix"""
+        if entry.scaler is not None:
+            features = entry.scaler.transform(features)
+        return np.asarray(entry.model.predict(features), dtype=float)
+    
     def predict_rvr(self, runway_id: str) -> Optional[float]:
         """
         Predict RVR for a specific runway zone
         
+        Routed through the cascade: a saturated recent window returns
+        persistence, clear-ish rows are served by the shallow model, and
+        rows near the map thresholds go to the tuned model.
+        
         Args:
             runway_id: Runway zone identifier (e.g., 'RWY_09_BEG')
             
@@ -175,32 +389,46 @@ class LiveRVRPredictor:
             print(f"   Available models: {list(self.models.keys())}")
             return None
         
-        print(f"   ✅ Model found for {runway_id}")
-        
-        # Create lag features
-        print(f"   Creating lag features...")
-        features = self.create_lag_features(runway_id)
-        if features is None:
-            print(f"   ❌ Insufficient historical data for {runway_id}")
+        data = self.historical_data.get(runway_id, [])
+        if len(data) < self.max_lag + 1:
+            print(f"   ❌ Insufficient historical data for {runway_id}: {len(data)} < {self.max_lag + 1}")
             return None
         
-        print(f"   ✅ Features created: {features.shape}")
-        print(f"   Feature values: {features.flatten()}")
+        window = [item['value'] for item in data[-self.max_lag-1:]]
+        cascade = self.cascade if self.cascade.enabled else None
         
         try:
-            # Scale features if scaler is available
-            if runway_id in self.scalers and self.scalers[runway_id] is not None:
-                print(f"   🔧 Scaling features...")
-                features = self.scalers[runway_id].transform(features)
-                print(f"   ✅ Features scaled: {features.shape}")
-                print(f"   Scaled values: {features.flatten()}")
+            # Resolve the model/scaler pair once so both come from the same load
+            entry = self.registry.get(runway_id)
+            
+            if cascade is not None and cascade.is_saturated(window) and not self.shadow_full_model:
+                # Rule tier needs no features at all
+                prediction, tier = float(window[-1]), TIER_RULE
+                cascade.record(tier)
             else:
-                print(f"   ⚠️ No scaler available for {runway_id}, using raw features")
+                features = self.create_model_features(runway_id, entry.feature_columns)
+                
+                # Memoized model output for an (almost) identical feature vector
+                cache_key = None
+                cached = None
+                if self.prediction_cache is not None and not self.shadow_full_model:
+                    has_cheap = cascade is not None and cascade.has_cheap_model(runway_id)
+                    versions = (entry.version, cascade.cheap_models.indexed_version(runway_id) if has_cheap else None)
+                    cache_key = self.prediction_cache.make_key(runway_id, versions, entry.feature_columns, features)
+                    cached = self.prediction_cache.get(cache_key)
+                
+                if cached is not None:
+                    prediction, tier = cached
+                    if cascade is not None:
+                        cascade.record(tier)
+                else:
+                    predictions, tiers = self.predict_batch(runway_id, features, np.array([window], dtype=float), entry=entry)
+                    prediction, tier = float(predictions[0]), str(tiers[0])
+                    if cache_key is not None:
+                        self.prediction_cache.put(cache_key, (prediction, tier))
             
-            # Make prediction
-            print(f"   🎯 Making prediction...")
-            prediction = self.models[runway_id].predict(features)[0]
-            print(f"   ✅ Prediction for {runway_id}: {prediction:.1f}m")
+            self.last_prediction_tiers[runway_id] = tier
+            print(f"   ✅ Prediction for {runway_id}: {prediction:.1f}m ({tier} tier)")
             return prediction
             
         except Exception as e:
@@ -209,6 +437,62 @@ class LiveRVRPredictor:
             traceback.print_exc()
             return None
     
+    def predict_batch(self, runway_id: str, features: np.ndarray, windows: np.ndarray,
+                      entry=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict many rows for one zone with one model call per cascade tier
+        
+        Args:
+            runway_id: Runway zone identifier (e.g., 'RWY_09_BEG')
+            features: Model input rows, shape (n, len(feature_columns))
+            windows: Recent readings per row (oldest first, ending with the
+                     current one), shape (n, max_lag + 1)
+            entry: Registry entry to use (defaults to the current one)
+            
+        Returns:
+            Tuple of (predictions array, tier name array)
+        """
+        if entry is None:
+            entry = self.registry.get(runway_id)
+        features = np.asarray(features, dtype=float)
+        windows = np.asarray(windows, dtype=float)
+        n = len(features)
+        predictions = np.full(n, np.nan)
+        tiers = np.full(n, TIER_FULL, dtype=object)
+        if n == 0:
+            return predictions, tiers
+        
+        cascade = self.cascade if self.cascade.enabled else None
+        if cascade is not None:
+            rule = cascade.is_saturated(windows)
+            predictions[rule] = windows[rule, -1]
+            tiers[rule] = TIER_RULE
+            
+            todo = np.flatnonzero(~rule)
+            if todo.size and cascade.has_cheap_model(runway_id):
+                cheap = self._score(cascade.cheap_models.get(runway_id), features[todo])
+                keep = ~cascade.near_threshold(np.column_stack([windows[todo], cheap]))
+                predictions[todo[keep]] = cheap[keep]
+                tiers[todo[keep]] = TIER_CHEAP
+        
+        full_rows = tiers == TIER_FULL
+        full = None
+        if self.shadow_full_model:
+            full = self._score(entry, features)
+            predictions[full_rows] = full[full_rows]
+        elif full_rows.any():
+            predictions[full_rows] = self._score(entry, features[full_rows])
+        
+        if cascade is not None:
+            for tier in (TIER_RULE, TIER_CHEAP, TIER_FULL):
+                count = int(np.count_nonzero(tiers == tier))
+                if count:
+                    cascade.record(tier, count)
+            if full is not None:
+                cascade.record_shadow(predictions, full, windows[:, -1])
+        
+        return predictions, tiers
+    
     def predict_all_zones(self) -> Dict[str, float]:
         """
         Predict RVR for all runway zones
@@ -243,11 +527,26 @@ class LiveRVRPredictor:
                 'required_points': self.max_lag + 1,
                 'can_predict': can_predict,
                 'latest_value': self.historical_data.get(runway_id, [{}])[-1].get('value', None) if self.historical_data.get(runway_id) else None,
-                'latest_timestamp': self.historical_data.get(runway_id, [{}])[-1].get('timestamp', None) if self.historical_data.get(runway_id) else None
+                'latest_timestamp': self.historical_data.get(runway_id, [{}])[-1].get('timestamp', None) if self.historical_data.get(runway_id) else None,
+                'last_tier': self.last_prediction_tiers.get(runway_id),
             }
+            if self.prediction_cache is not None:
+                status[runway_id]['cache_hits'] = self.prediction_cache.hits.get(runway_id, 0)
+                status[runway_id]['cache_misses'] = self.prediction_cache.misses.get(runway_id, 0)
         
         return status
     
+    def get_cache_status(self) -> Optional[Dict]:
+        """
+        Get prediction cache totals (None when the cache is disabled)
+        
+        Returns:
+            Dictionary with size, hits, misses, hit rate and quantization
+        """
+        if self.prediction_cache is None:
+            return None
+        return self.prediction_cache.get_stats()
+    
     def simulate_sensor_data(self, duration_minutes: int = 60, interval_seconds: int = 10):
         """
         Simulate sensor data for testing purposes
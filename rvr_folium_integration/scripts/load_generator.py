@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Load generator for prediction_service.py
+
+Opens keep-alive connections to the service on localhost, fires /predict
+(or /latest) requests from many concurrent clients and reports throughput
+and p50/p99 latency, plus the service's micro-batching counters.
+
+Example:
+    python scripts/prediction_service.py &
+    python scripts/load_generator.py --requests 5000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+
+ZONES = [
+    'RWY_09_BEG', 'RWY_09_TDZ', 'RWY_10_TDZ', 'RWY_11_BEG', 'RWY_11_TDZ', 'RWY_27_MID',
+    'RWY_28_BEG', 'RWY_28_MID', 'RWY_28_TDZ', 'RWY_29_BEG', 'RWY_29_MID',
+]
+
+
+async def http_request(reader, writer, host, method, path, payload=None):
+    """Send one request on an open keep-alive connection and return (status, json)"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith('content-length:'):
+            length = int(line.split(':', 1)[1])
+    data = await reader.readexactly(length)
+    return status, json.loads(data)
+
+
+def random_predict_payload():
+    """A /predict body with a plausible 12-reading history"""
+    zone = random.choice(ZONES)
+    base = random.choice([3333.0, 2500.0, 1200.0, 700.0, 350.0])
+    values = [min(3333.0, max(50.0, base + random.gauss(0, base * 0.05))) for _ in range(12)]
+    return {'zone': zone, 'values': values, 'timestamp': '2024-01-05 03:00'}
+
+
+async def client(host, port, endpoint, counter, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter['remaining'] > 0:
+            counter['remaining'] -= 1
+            start = time.perf_counter()
+            if endpoint == 'predict':
+                status, _ = await http_request(reader, writer, host, 'POST', '/predict', random_predict_payload())
+            else:
+                status, _ = await http_request(reader, writer, host, 'GET', '/latest')
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, requests, concurrency, endpoint):
+    counter = {'remaining': requests}
+    latencies, errors = [], []
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(host, port, endpoint, counter, latencies, errors) for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await http_request(reader, writer, host, 'GET', '/stats')
+    writer.close()
+
+    lat_ms = np.array(latencies) * 1000
+    print(f"📊 {len(latencies)} {endpoint} requests, {concurrency} concurrent clients")
+    print(f"   Throughput: {len(latencies) / elapsed:.1f} req/s ({elapsed:.2f}s total)")
+    print(f"   Latency p50: {np.percentile(lat_ms, 50):.2f} ms, p99: {np.percentile(lat_ms, 99):.2f} ms, "
+          f"max: {lat_ms.max():.2f} ms")
+    print(f"   Errors: {len(errors)}")
+    print(f"   Service batches: {stats['batches']} (mean batch size {stats['mean_batch_size']:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the RVR prediction service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--endpoint', choices=['predict', 'latest'], default='predict')
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.requests, args.concurrency, args.endpoint))
+
+
+if __name__ == "__main__":
+    main()
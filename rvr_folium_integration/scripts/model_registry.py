@@ -0,0 +1,378 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from joblib import load as joblib_load
+
+
+MODEL_FILE_PATTERN = "rvr_model_RWY_*.pkl"
+
+
+def parse_runway_id(model_file: Path) -> Optional[str]:
+    """
+    Parse the runway zone identifier from a model filename
+
+    Args:
+        model_file: Path such as saved_models/rvr_model_RWY_09_BEG.pkl
+
+    Returns:
+        Runway zone identifier (e.g., 'RWY_09_BEG') or None if the name does not parse
+    """
+    parts = model_file.stem.split("_")
+    if len(parts) >= 5:
+        return f"RWY_{parts[3]}_{parts[4]}"
+    return None
+
+
+class ModelEntry:
+    """
+    One deserialized model file: the model/scaler/feature_columns triple
+    plus the file version it was loaded from
+    """
+
+    __slots__ = ('runway_id', 'model', 'scaler', 'feature_columns', 'version', 'size_bytes', 'load_seconds')
+
+    def __init__(self, runway_id, model, scaler, feature_columns, version, size_bytes, load_seconds):
+        self.runway_id = runway_id
+        self.model = model
+        self.scaler = scaler
+        self.feature_columns = feature_columns
+        self.version = version
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+
+
+class ModelRegistry:
+    """
+    Index of the trained models in a directory with lazy, memory-bounded loading
+
+    Startup only lists the directory and parses filenames. Models are
+    deserialized on first use (or eagerly in a thread pool via preload())
+    and kept in an LRU cache whose total size is capped by max_memory_mb.
+    Memory is accounted using the pickle size on disk as the estimate.
+    An optional validator runs on every lazily loaded entry before it is
+    cached, so no file serves without passing it.
+    """
+
+    def __init__(self, model_dir: str = "saved_models", max_memory_mb: Optional[float] = None,
+                 max_workers: int = 4, validator: Optional[Callable[[ModelEntry], None]] = None):
+        """
+        Initialize the registry and index the model directory
+
+        Args:
+            model_dir: Directory containing trained models
+            max_memory_mb: Upper bound on loaded model size (None = unbounded)
+            max_workers: Thread pool size used by preload()
+            validator: Called with each entry get() loads; raises to reject it
+        """
+        self.model_dir = Path(model_dir)
+        self.max_memory_bytes = None if max_memory_mb is None else int(max_memory_mb * 1024 * 1024)
+        self.max_workers = max_workers
+        self.validator = validator
+
+        self._lock = threading.RLock()
+        self._index: Dict[str, Dict] = {}
+        self._loaded: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._loaded_bytes = 0
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # File version each zone is known to be serving (or to have served); see changed_models()
+        self._known_versions: Dict[str, tuple] = {}
+        self._rejected_versions: Dict[str, tuple] = {}
+
+        self.stats = {
+            'index_seconds': 0.0,
+            'loads': 0,
+            'load_seconds': 0.0,
+            'evictions': 0,
+            'hits': 0,
+            'misses': 0,
+            'first_load_seconds': None,
+            'preload_seconds': None,
+        }
+        self._created_at = time.perf_counter()
+
+        index = self.refresh_index()
+        # Files present at startup are the baseline; get() validates them on first use
+        self._known_versions = {runway_id: info['version'] for runway_id, info in index.items()}
+
+    def refresh_index(self) -> Dict[str, Dict]:
+        """
+        Re-list the model directory (filenames and stat only, no deserialization)
+
+        Returns:
+            Dictionary of runway_id -> {'path', 'size_bytes', 'version'}
+        """
+        start = time.perf_counter()
+        index = {}
+        if self.model_dir.exists():
+            for model_file in sorted(self.model_dir.glob(MODEL_FILE_PATTERN)):
+                runway_id = parse_runway_id(model_file)
+                if runway_id is None:
+                    print(f"   ❌ Could not parse filename: {model_file.name}")
+                    continue
+                stat = model_file.stat()
+                index[runway_id] = {
+                    'path': model_file,
+                    'size_bytes': stat.st_size,
+                    'version': (stat.st_mtime_ns, stat.st_size),
+                }
+        with self._lock:
+            self._index = index
+            for runway_id in index:
+                self._load_locks.setdefault(runway_id, threading.Lock())
+        self.stats['index_seconds'] = time.perf_counter() - start
+        return index
+
+    @property
+    def runway_ids(self) -> List[str]:
+        """Runway zones available in the directory, in filename order"""
+        return list(self._index.keys())
+
+    def __contains__(self, runway_id) -> bool:
+        return runway_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def is_loaded(self, runway_id: str) -> bool:
+        return runway_id in self._loaded
+
+    def indexed_version(self, runway_id: str):
+        info = self._index.get(runway_id)
+        return info['version'] if info else None
+
+    def load_entry(self, runway_id: str, path: Optional[Path] = None) -> ModelEntry:
+        """
+        Deserialize a model file without touching the cache
+
+        Args:
+            runway_id: Runway zone identifier
+            path: Model file (defaults to the indexed path)
+
+        Returns:
+            ModelEntry for the file
+
+        Raises:
+            KeyError: runway_id is not indexed and no path was given
+            ValueError: the pickle is not in the expected {'model': ...} format
+        """
+        if path is None:
+            path = self._index[runway_id]['path']
+        stat = path.stat()
+        start = time.perf_counter()
+        model_data = joblib_load(path)
+        elapsed = time.perf_counter() - start
+
+        if not (isinstance(model_data, dict) and 'model' in model_data):
+            raise ValueError(f"Invalid model format for {path.name}: {type(model_data).__name__}")
+
+        return ModelEntry(
+            runway_id=runway_id,
+            model=model_data['model'],
+            scaler=model_data.get('scaler'),
+            feature_columns=list(model_data.get('feature_columns', [])),
+            version=(stat.st_mtime_ns, stat.st_size),
+            size_bytes=stat.st_size,
+            load_seconds=elapsed,
+        )
+
+    def get(self, runway_id: str) -> ModelEntry:
+        """
+        Get a model entry, loading it on first use
+
+        Args:
+            runway_id: Runway zone identifier (e.g., 'RWY_09_BEG')
+
+        Returns:
+            ModelEntry with model, scaler and feature_columns
+
+        Raises:
+            KeyError: No model file is indexed for runway_id
+            ValueError: The file failed the validator (raised again without
+                        reloading until the file changes)
+        """
+        with self._lock:
+            entry = self._loaded.get(runway_id)
+            if entry is not None:
+                self._loaded.move_to_end(runway_id)
+                self.stats['hits'] += 1
+                return entry
+            if runway_id not in self._index:
+                raise KeyError(runway_id)
+            load_lock = self._load_locks[runway_id]
+
+        # Per-zone lock so concurrent first uses deserialize the file once
+        with load_lock:
+            with self._lock:
+                entry = self._loaded.get(runway_id)
+                if entry is not None:
+                    self._loaded.move_to_end(runway_id)
+                    self.stats['hits'] += 1
+                    return entry
+                self.stats['misses'] += 1
+                version = self._index[runway_id]['version']
+                if self._rejected_versions.get(runway_id) == version:
+                    raise ValueError(f"model file for {runway_id} failed validation")
+
+            entry = self.load_entry(runway_id)
+            if self.validator is not None:
+                try:
+                    self.validator(entry)
+                except Exception:
+                    with self._lock:
+                        self._rejected_versions[runway_id] = entry.version
+                    raise
+            self._store(entry)
+            return entry
+
+    def _store(self, entry: ModelEntry):
+        """Insert an entry into the LRU cache and evict down to the memory cap"""
+        with self._lock:
+            previous = self._loaded.pop(entry.runway_id, None)
+            if previous is not None:
+                self._loaded_bytes -= previous.size_bytes
+            self._loaded[entry.runway_id] = entry
+            self._loaded_bytes += entry.size_bytes
+            self._known_versions[entry.runway_id] = entry.version
+
+            self.stats['loads'] += 1
+            self.stats['load_seconds'] += entry.load_seconds
+            if self.stats['first_load_seconds'] is None:
+                self.stats['first_load_seconds'] = time.perf_counter() - self._created_at
+
+            if self.max_memory_bytes is not None:
+                # Never evict the entry that was just requested
+                while self._loaded_bytes > self.max_memory_bytes and len(self._loaded) > 1:
+                    evicted_id, evicted = self._loaded.popitem(last=False)
+                    self._loaded_bytes -= evicted.size_bytes
+                    self.stats['evictions'] += 1
+
+    def preload(self, runway_ids: Optional[Iterable[str]] = None) -> Dict[str, ModelEntry]:
+        """
+        Eagerly deserialize models in a thread pool
+
+        Args:
+            runway_ids: Zones to load (defaults to every indexed zone)
+
+        Returns:
+            Dictionary of the entries that loaded successfully
+        """
+        runway_ids = list(runway_ids) if runway_ids is not None else self.runway_ids
+        start = time.perf_counter()
+        loaded = {}
+
+        def _load(runway_id):
+            try:
+                return runway_id, self.get(runway_id)
+            except Exception as e:
+                print(f"   ❌ Error loading model {runway_id}: {e}")
+                return runway_id, None
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            for runway_id, entry in pool.map(_load, runway_ids):
+                if entry is not None:
+                    loaded[runway_id] = entry
+
+        self.stats['preload_seconds'] = time.perf_counter() - start
+        return loaded
+
+    def changed_models(self) -> Dict[str, Dict]:
+        """
+        Re-index the directory and report zones whose file is new or changed
+
+        Every indexed zone is compared, loaded or not, against the version
+        it last served (the startup version for zones never loaded), so new
+        and replaced files can be loaded and validated off the prediction
+        path instead of by a lazy get().
+
+        Returns:
+            Dictionary of runway_id -> index info for zones whose file version differs
+        """
+        index = self.refresh_index()
+        with self._lock:
+            return {
+                runway_id: info for runway_id, info in index.items()
+                if self._known_versions.get(runway_id) != info['version']
+            }
+
+    def swap(self, entry: ModelEntry):
+        """
+        Atomically replace the loaded entry for a zone
+
+        The model/scaler/feature_columns triple travels as one object, so
+        callers holding the old entry keep a consistent set until they
+        fetch again.
+        """
+        self._store(entry)
+
+    def evict(self, runway_id: str):
+        """Drop a loaded model from memory (it stays indexed)"""
+        with self._lock:
+            entry = self._loaded.pop(runway_id, None)
+            if entry is not None:
+                self._loaded_bytes -= entry.size_bytes
+
+    def get_status(self) -> Dict:
+        """
+        Get registry status for reporting
+
+        Returns:
+            Dictionary with index size, loaded models, memory use and timing stats
+        """
+        with self._lock:
+            return {
+                'model_dir': str(self.model_dir),
+                'indexed_models': len(self._index),
+                'loaded_models': list(self._loaded.keys()),
+                'loaded_mb': round(self._loaded_bytes / (1024 * 1024), 3),
+                'max_memory_mb': None if self.max_memory_bytes is None else round(self.max_memory_bytes / (1024 * 1024), 3),
+                'cold_start_ms': round(self.stats['index_seconds'] * 1000, 3),
+                'first_load_ms': None if self.stats['first_load_seconds'] is None else round(self.stats['first_load_seconds'] * 1000, 3),
+                'preload_ms': None if self.stats['preload_seconds'] is None else round(self.stats['preload_seconds'] * 1000, 3),
+                'loads': self.stats['loads'],
+                'hits': self.stats['hits'],
+                'misses': self.stats['misses'],
+                'evictions': self.stats['evictions'],
+            }
+
+
+class RegistryView:
+    """
+    Read-only mapping view over one field of the registry's entries
+
+    Keeps the predictor's `models`, `scalers` and `feature_columns`
+    dictionaries working while loading happens on access.
+    """
+
+    def __init__(self, registry: ModelRegistry, field: str):
+        self._registry = registry
+        self._field = field
+
+    def __getitem__(self, runway_id):
+        return getattr(self._registry.get(runway_id), self._field)
+
+    def __contains__(self, runway_id) -> bool:
+        return runway_id in self._registry
+
+    def __len__(self) -> int:
+        return len(self._registry)
+
+    def __iter__(self):
+        return iter(self._registry.runway_ids)
+
+    def keys(self):
+        return self._registry.runway_ids
+
+    def get(self, runway_id, default=None):
+        if runway_id not in self._registry:
+            return default
+        return self[runway_id]
+
+    def values(self):
+        return [self[runway_id] for runway_id in self._registry.runway_ids]
+
+    def items(self):
+        return [(runway_id, self[runway_id]) for runway_id in self._registry.runway_ids]
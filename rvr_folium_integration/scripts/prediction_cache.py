@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rvr_features import CALENDAR_FEATURES
+
+
+# Quantization step per feature kind; None drops the feature from the key
+DEFAULT_QUANTIZATION = {
+    'calendar': 1.0,  # hour / day_of_week / month / day_of_year, exact
+    'rvr': 1.0,       # lags, rolling means and cross-runway readings (m)
+    'spread': 1.0,    # rolling standard deviations (m)
+}
+
+
+def feature_kind(name: str) -> str:
+    """Classify a feature name for quantization"""
+    if name in CALENDAR_FEATURES:
+        return 'calendar'
+    if '_rolling_std_' in name:
+        return 'spread'
+    return 'rvr'
+
+
+class PredictionCache:
+    """
+    Bounded LRU memo of model outputs keyed by quantized feature vectors
+
+    Keys are (zone, model version, quantized feature tuple), so a swapped
+    model never serves a stale entry; invalidate() additionally frees the
+    old entries when a zone's model is reloaded.
+
+    Calendar features change every step, so with exact calendar keys a
+    steady input still misses all day. Optionally (saturation), rows whose
+    RVR readings are all saturated are keyed without them. This is an
+    approximation: such a row may be served an output computed for another
+    hour or day, on the assumption that the model barely depends on the
+    calendar in clear weather.
+    """
+
+    def __init__(self, maxsize: int = 4096, quantization: Optional[Dict[str, Optional[float]]] = None,
+                 saturation: Optional[float] = None):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of cached predictions
+            quantization: Step per feature kind ('calendar', 'rvr', 'spread');
+                          None for a kind leaves those features out of the key
+            saturation: Opt-in: reading (e.g. RVR_SATURATION) at or above which
+                        every RVR feature counts as saturated and calendar
+                        features leave the key (None = calendar features are
+                        keyed as quantization says)
+        """
+        self.maxsize = maxsize
+        self.quantization = dict(DEFAULT_QUANTIZATION)
+        if quantization:
+            self.quantization.update(quantization)
+        self.saturation = saturation
+
+        self._entries: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+        self._steps: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _quantizer(self, feature_columns: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Per-column steps, the mask of columns in the key, and the RVR and calendar column masks"""
+        cache_key = tuple(feature_columns)
+        quantizer = self._steps.get(cache_key)
+        if quantizer is None:
+            kinds = [feature_kind(name) for name in feature_columns]
+            steps = [self.quantization.get(kind) for kind in kinds]
+            keep = np.array([step is not None for step in steps], dtype=bool)
+            steps = np.array([step if step else 1.0 for step in steps], dtype=float)
+            rvr = np.array([kind == 'rvr' for kind in kinds], dtype=bool)
+            calendar = np.array([kind == 'calendar' for kind in kinds], dtype=bool)
+            quantizer = (steps, keep, rvr, calendar)
+            self._steps[cache_key] = quantizer
+        return quantizer
+
+    def make_key(self, runway_id: str, version, feature_columns: Sequence[str], features: np.ndarray) -> Tuple:
+        """
+        Build the cache key for one feature row
+
+        Args:
+            runway_id: Runway zone identifier
+            version: Model version(s) that would score the row
+            feature_columns: Feature names of the row
+            features: Array of shape (1, n) or (n,)
+
+        Returns:
+            Hashable key
+        """
+        steps, keep, rvr, calendar = self._quantizer(feature_columns)
+        row = np.asarray(features, dtype=float).reshape(-1)
+        if self.saturation is not None and rvr.any() and np.all(row[rvr] >= self.saturation):
+            keep = keep & ~calendar
+        row, steps = row[keep], steps[keep]
+        # NaN (missing feature) maps to a sentinel so it stays distinct from any reading
+        quantized = np.where(np.isnan(row), np.iinfo(np.int64).min, np.round(np.nan_to_num(row) / steps))
+        return (runway_id, version, tuple(quantized.astype(np.int64).tolist()))
+
+    def get(self, key: Tuple) -> Optional[Tuple[float, str]]:
+        runway_id = key[0]
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses[runway_id] = self.misses.get(runway_id, 0) + 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits[runway_id] = self.hits.get(runway_id, 0) + 1
+            return value
+
+    def put(self, key: Tuple, value: Tuple[float, str]):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, runway_id: Optional[str] = None):
+        """Drop cached predictions for one zone (or all zones)"""
+        with self._lock:
+            if runway_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == runway_id]:
+                del self._entries[key]
+
+    def get_stats(self) -> Dict:
+        """Overall size and hit/miss counters"""
+        with self._lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            size = len(self._entries)
+        return {
+            'size': size,
+            'maxsize': self.maxsize,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'quantization': dict(self.quantization),
+            'saturation': self.saturation,
+        }
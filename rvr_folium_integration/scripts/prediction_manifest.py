@@ -0,0 +1,514 @@
+"""
+Manifest of the prediction CSVs in an output directory
+
+predictions_manifest.json records, for every CSV in the directory, its
+kind (day file, latest file, batch output), the time range of its
+Datetime column, its row count and its columns. PredictionWriter and the
+batch paths keep it current as they write, so consumers resolve "the
+latest file" or "the files covering start..end" from the manifest
+instead of listing and stat-ing the directory and opening every file.
+
+The manifest's mtime is set to the directory's mtime after every save.
+A directory whose mtime is newer has had files added, removed or
+replaced since, and only then is it listed again; otherwise discovery
+costs two stats and one small JSON read however many day files the
+directory holds.
+"""
+
+import csv
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+MANIFEST_NAME = "predictions_manifest.json"
+MANIFEST_VERSION = 1
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# (kind, file name pattern); anything else is a plain 'csv'
+FILE_KINDS = (
+    ('latest', 'latest_predictions.csv'),
+    ('day', 'real_time_predictions_*.csv'),
+    ('batch', 'batch_predictions_*.csv'),
+)
+# 'latest' only repeats the newest day-file rows
+RANGE_KINDS = ('day', 'batch', 'csv')
+_DAY_RE = re.compile(r'(\d{4}-\d{2})-\d{2}')
+
+
+def file_kind(name: str) -> str:
+    for kind, pattern in FILE_KINDS:
+        if fnmatch(name, pattern):
+            return kind
+    return 'csv'
+
+
+def time_key(value) -> Optional[str]:
+    """
+    Sortable 'YYYY-mm-dd HH:MM:SS' string for a timestamp, or None
+
+    Args:
+        value: datetime/Timestamp or ISO-format string
+    """
+    if value is None:
+        return None
+    try:
+        if hasattr(value, 'strftime'):
+            return value.strftime(TIME_FORMAT)
+        return datetime.fromisoformat(str(value).strip()).strftime(TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def _datetime_column(columns: List[str]) -> Optional[str]:
+    if 'Datetime' in columns:
+        return 'Datetime'
+    for column in columns:
+        if 'date' in column.lower() or 'time' in column.lower():
+            return column
+    return None
+
+
+def summarize_csv(path) -> Dict:
+    """
+    Columns, datetime column, time range and row count of a CSV
+
+    Reads the header, the first and the last line, and counts newlines;
+    the file is assumed to be in time order (all prediction outputs are).
+
+    Returns:
+        Keyword arguments for PredictionManifest.record
+    """
+    with open(path, 'rb') as f:
+        header = f.readline().decode('utf-8-sig')
+        data_start = f.tell()
+        first = f.readline()
+        f.seek(data_start)
+        rows, last_byte = 0, b'\n'
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            rows += chunk.count(b'\n')
+            last_byte = chunk[-1:]
+        if last_byte != b'\n':
+            rows += 1  # unterminated last line
+        size = f.tell()
+        f.seek(max(data_start, size - 65536))
+        tail = [line for line in f.read().splitlines() if line.strip()]
+
+    columns = next(csv.reader([header]), [])
+    datetime_column = _datetime_column(columns)
+    start = end = None
+    if datetime_column is not None and rows:
+        index = columns.index(datetime_column)
+        times = []
+        for line in (first, tail[-1] if tail else first):
+            fields = next(csv.reader([line.decode('utf-8', errors='replace')]), [])
+            times.append(time_key(fields[index]) if index < len(fields) else None)
+        start, end = times
+    return {'start': start, 'end': end, 'rows': rows, 'columns': columns,
+            'datetime_column': datetime_column}
+
+
+class PredictionManifest:
+    """
+    Index of the prediction CSVs in one directory
+
+    Entries hold kind, start, end (time_key strings), rows, a schema id
+    into the shared column lists, the datetime column, and the size/mtime
+    the entry was taken at. Day-file entries live in one small file per
+    month (predictions_manifest.d/YYYY-MM.json); the top-level file keeps
+    the other entries, a per-month summary (range, rows, files) and the
+    most recently written file, so neither "latest" nor a range lookup
+    reads entries of months outside the range.
+    """
+
+    def __init__(self, directory, name: str = MANIFEST_NAME):
+        """
+        Initialize the manifest (call load() or load_or_build() to read it)
+
+        Args:
+            directory: Directory holding the prediction CSVs
+            name: Manifest file name
+        """
+        self.directory = Path(directory)
+        self.path = self.directory / name
+        self.month_dir = self.directory / f"{Path(name).stem}.d"
+        self.files: Dict[str, Dict] = {}
+        self.months: Dict[str, Dict] = {}
+        self.schemas: List[List[str]] = []
+        self.newest: Optional[str] = None
+        self._month_files: Dict[str, Dict[str, Dict]] = {}
+        self._dirty_months = set()
+        self._version = None
+
+    # ─── Persistence ──────────────────────────────────────────────────────────
+    def load(self) -> bool:
+        """
+        Read the top-level manifest (month files are read on demand)
+
+        Returns:
+            False if it does not exist or is unreadable
+        """
+        try:
+            stat = self.path.stat()
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != MANIFEST_VERSION:
+            return False
+        self.files = data.get('files', {})
+        self.months = data.get('months', {})
+        self.schemas = data.get('schemas', [])
+        self.newest = data.get('newest')
+        self._month_files, self._dirty_months = {}, set()
+        self._version = (stat.st_mtime_ns, stat.st_size)
+        return True
+
+    def refresh(self) -> bool:
+        """Reload if another process rewrote the manifest; True if it did"""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == self._version:
+            return False
+        return self.load()
+
+    def _write_json(self, path: Path, data: Dict):
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def save(self):
+        """Write changed month files and the top-level manifest, stamped with the directory's mtime"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for month in sorted(self._dirty_months):
+            entries = self._month_files[month]
+            if entries:
+                self.month_dir.mkdir(exist_ok=True)
+                self._write_json(self.month_dir / f"{month}.json", {'schemas': self.schemas, 'files': entries})
+                starts = [e['start'] for e in entries.values() if e['start'] is not None]
+                ends = [e['end'] for e in entries.values() if e['end'] is not None]
+                self.months[month] = {'start': min(starts, default=None), 'end': max(ends, default=None),
+                                      'rows': sum(e['rows'] for e in entries.values()), 'files': len(entries),
+                                      'mtime_ns': max(e['mtime_ns'] for e in entries.values())}
+            else:
+                self.months.pop(month, None)
+                (self.month_dir / f"{month}.json").unlink(missing_ok=True)
+        self._dirty_months.clear()
+
+        data = {'version': MANIFEST_VERSION, 'schemas': self.schemas, 'newest': self.newest,
+                'months': dict(sorted(self.months.items())), 'files': self.files}
+        self._write_json(self.path, data)
+        directory_mtime = self.directory.stat().st_mtime_ns
+        os.utime(self.path, ns=(directory_mtime, directory_mtime))
+        stat = self.path.stat()
+        self._version = (stat.st_mtime_ns, stat.st_size)
+
+    def is_stale(self) -> bool:
+        """Whether files were added, removed or replaced since the last save"""
+        try:
+            return self.directory.stat().st_mtime_ns > self.path.stat().st_mtime_ns
+        except OSError:
+            return True
+
+    def load_or_build(self) -> "PredictionManifest":
+        """Load the manifest, re-listing the directory only if it changed since the last save"""
+        loaded = self.load()
+        if not loaded or self.is_stale():
+            if self.sync() or not loaded:
+                self.save()
+        return self
+
+    def sync(self, pattern: str = '*.csv') -> int:
+        """
+        Index CSVs that are new or changed on disk and drop removed ones
+
+        Reads every month file, so it costs a directory listing plus a stat
+        per file; load_or_build only calls it when the directory changed.
+
+        Returns:
+            Number of entries added, updated or removed
+        """
+        for month in list(self.months):
+            self._month(month)
+        known = set(self.files)
+        for entries in self._month_files.values():
+            known.update(entries)
+
+        names, changed = set(), 0
+        for path in self.directory.glob(pattern):
+            if path.name.startswith('.'):
+                continue
+            names.add(path.name)
+            entry = self._entry(path.name)
+            stat = path.stat()
+            if entry is None or (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+                self.index_file(path)
+                changed += 1
+        for name in known - names:
+            self._remove(name)
+            changed += 1
+        return changed
+
+    # ─── Entries ──────────────────────────────────────────────────────────────
+    def _month_key(self, name: str, kind: str) -> Optional[str]:
+        match = _DAY_RE.search(name) if kind == 'day' else None
+        return match.group(1) if match else None
+
+    def _month(self, month: str) -> Dict[str, Dict]:
+        """Day-file entries of a month, read on first use"""
+        entries = self._month_files.get(month)
+        if entries is None:
+            entries = {}
+            try:
+                data = json.loads((self.month_dir / f"{month}.json").read_text())
+                # Month files carry the schema list they were written with
+                for name, entry in data['files'].items():
+                    entry['schema'] = self._schema_id(data['schemas'][entry['schema']])
+                    entries[name] = entry
+            except (OSError, ValueError, KeyError, IndexError):
+                pass
+            self._month_files[month] = entries
+        return entries
+
+    def _entry(self, name: str) -> Optional[Dict]:
+        month = self._month_key(name, file_kind(name))
+        return self._month(month).get(name) if month else self.files.get(name)
+
+    def _remove(self, name: str):
+        month = self._month_key(name, file_kind(name))
+        if month:
+            self._month(month).pop(name, None)
+            self._dirty_months.add(month)
+        else:
+            self.files.pop(name, None)
+        if self.newest == name:
+            self.newest = None
+
+    def _store(self, name: str, entry: Dict) -> Dict:
+        month = self._month_key(name, entry['kind'])
+        if month:
+            self._month(month)[name] = entry
+            self._dirty_months.add(month)
+        else:
+            self.files[name] = entry
+        newest = self._entry(self.newest) if self.newest else None
+        if newest is None or entry['mtime_ns'] >= newest['mtime_ns']:
+            self.newest = name
+        return entry
+
+    def _schema_id(self, columns: Iterable[str]) -> int:
+        columns = list(columns)
+        try:
+            return self.schemas.index(columns)
+        except ValueError:
+            self.schemas.append(columns)
+            return len(self.schemas) - 1
+
+    def record(self, path, kind: Optional[str] = None, start=None, end=None, rows: int = 0,
+               columns: Iterable[str] = (), datetime_column: Optional[str] = 'Datetime') -> Dict:
+        """
+        Set the entry of a file (call save() to persist)
+
+        Args:
+            path: The CSV file (must exist; its size/mtime are recorded)
+            kind: 'day', 'latest', 'batch' or 'csv' (default: from the file name)
+            start: First timestamp in the file
+            end: Last timestamp in the file
+            rows: Data rows
+            columns: Header columns
+            datetime_column: Name of the timestamp column
+        """
+        path = Path(path)
+        stat = path.stat()
+        return self._store(path.name, {
+            'kind': kind or file_kind(path.name),
+            'start': time_key(start),
+            'end': time_key(end),
+            'rows': int(rows),
+            'schema': self._schema_id(columns),
+            'datetime_column': datetime_column,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+        })
+
+    def index_file(self, path, kind: Optional[str] = None) -> Dict:
+        """Set a file's entry from its first/last lines and a newline count"""
+        return self.record(path, kind, **summarize_csv(path))
+
+    def record_frame(self, path, df, kind: Optional[str] = None) -> Dict:
+        """Set the entry of a CSV just written from a DataFrame with a Datetime column"""
+        times = df['Datetime'] if 'Datetime' in df.columns and len(df) else None
+        return self.record(path, kind,
+                           start=times.min() if times is not None else None,
+                           end=times.max() if times is not None else None,
+                           rows=len(df), columns=df.columns)
+
+    def extend(self, path, start=None, end=None, rows: int = 1) -> Dict:
+        """
+        Update the entry of a file that rows were appended to
+
+        Args:
+            path: The CSV file
+            start: Earliest timestamp among the appended rows
+            end: Latest timestamp among the appended rows
+            rows: Number of appended rows
+        """
+        path = Path(path)
+        entry = self._entry(path.name)
+        if entry is None:
+            return self.index_file(path)
+        for key, value, pick in (('start', time_key(start), min), ('end', time_key(end), max)):
+            if value is not None:
+                entry[key] = value if entry[key] is None else pick(entry[key], value)
+        entry['rows'] += rows
+        stat = path.stat()
+        entry['size'], entry['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+        return self._store(path.name, entry)
+
+    # ─── Queries ──────────────────────────────────────────────────────────────
+    def __len__(self) -> int:
+        return len(self.files) + sum(month['files'] for month in self.months.values())
+
+    def columns(self, entry: Dict) -> List[str]:
+        return self.schemas[entry['schema']]
+
+    def current(self, name: str) -> Optional[Dict]:
+        """
+        A file's entry, re-indexed in memory if the file changed since it was taken
+
+        Returns:
+            Entry with 'name' and 'path' added, or None if the file is gone
+        """
+        entry = self._entry(name)
+        path = self.directory / name
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if entry is None or (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            entry = self.index_file(path)
+        return dict(entry, name=name, path=path)
+
+    def select(self, start=None, end=None, kinds: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Entries whose time range overlaps start..end, oldest first
+
+        Only the month files whose summary overlaps the range are read.
+
+        Args:
+            start: Range start (None = open)
+            end: Range end (None = open)
+            kinds: Only these kinds (default: all)
+
+        Returns:
+            Entries with 'name' and 'path' added
+        """
+        start, end = time_key(start), time_key(end)
+
+        def overlaps(item):
+            return not ((start is not None and item['end'] is not None and item['end'] < start) or
+                        (end is not None and item['start'] is not None and item['start'] > end))
+
+        candidates = list(self.files.items())
+        if kinds is None or 'day' in kinds:
+            for month, summary in self.months.items():
+                if overlaps(summary):
+                    candidates += self._month(month).items()
+        selected = [dict(entry, name=name, path=self.directory / name)
+                    for name, entry in candidates
+                    if (kinds is None or entry['kind'] in kinds) and entry['rows'] and overlaps(entry)]
+        return sorted(selected, key=lambda entry: (entry['start'] or '', entry['name']))
+
+    def latest(self) -> Optional[Dict]:
+        """Most recently written file's entry (None if there are none)"""
+        entry = self.current(self.newest) if self.newest else None
+        if entry is None:
+            # The newest file was removed: only the month that holds the next newest is read
+            candidates = [(e['mtime_ns'], name) for name, e in self.files.items()]
+            if self.months:
+                month = max(self.months, key=lambda key: self.months[key].get('mtime_ns', 0))
+                candidates += [(e['mtime_ns'], name) for name, e in self._month(month).items()]
+            for _, name in sorted(candidates, reverse=True):
+                entry = self.current(name)
+                if entry is not None:
+                    self.newest = name
+                    break
+        return entry
+
+    def read_range(self, start=None, end=None, columns: Optional[Iterable[str]] = None,
+                   kinds: Iterable[str] = RANGE_KINDS):
+        """
+        Rows of start..end from the files that cover it
+
+        Files outside the range are never opened, and only the requested
+        columns are parsed. Overlapping rows keep the later file's values.
+
+        Args:
+            start: Range start (None = open)
+            end: Range end (None = open)
+            columns: Columns besides the timestamp (default: all)
+            kinds: File kinds to read
+
+        Returns:
+            DataFrame with a parsed Datetime column, in time order
+        """
+        import pandas as pd
+
+        frames = []
+        for selected in self.select(start, end, kinds):
+            entry = self.current(selected['name'])
+            if entry is None or entry['datetime_column'] is None:
+                continue
+            datetime_column = entry['datetime_column']
+            usecols = None
+            if columns is not None:
+                available = self.columns(entry)
+                usecols = [datetime_column] + [c for c in columns if c in available and c != datetime_column]
+            df = pd.read_csv(entry['path'], usecols=usecols)
+            df = df.rename(columns={datetime_column: 'Datetime'})
+            df['Datetime'] = pd.to_datetime(df['Datetime'], errors='coerce')
+            mask = df['Datetime'].notna()
+            if start is not None:
+                mask &= df['Datetime'] >= pd.Timestamp(start)
+            if end is not None:
+                mask &= df['Datetime'] <= pd.Timestamp(end)
+            frames.append(df.loc[mask])
+        if not frames:
+            return pd.DataFrame(columns=['Datetime'] + list(columns or []))
+        df = pd.concat(frames, ignore_index=True)
+        return df.drop_duplicates('Datetime', keep='last').sort_values('Datetime').reset_index(drop=True)
+
+
+def main():
+    """Build or refresh the manifest of prediction directories"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Index prediction CSVs in predictions_manifest.json")
+    parser.add_argument('directories', nargs='*', default=['data/real_time_predictions'])
+    args = parser.parse_args()
+
+    for directory in args.directories:
+        started = time.perf_counter()
+        manifest = PredictionManifest(directory)
+        manifest.load()
+        changed = manifest.sync()
+        manifest.save()
+        print(f"📇 {manifest.path}: {len(manifest)} files ({changed} re-indexed) "
+              f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Local asyncio HTTP/JSON service around LiveRVRPredictor
+
+Endpoints:
+    GET  /health
+    GET  /latest[?zone=RWY_09_BEG]            latest row of latest_predictions.csv
+    POST /predict                             {"zone", "values", "timestamp"?, "latest"?}
+    GET  /range?start=...&end=...[&zone=...]  rows of the prediction CSVs in a time range
+    GET  /stats                               request and micro-batch counters
+
+Concurrent /predict requests for the same zone that arrive within
+batch_window_ms are coalesced into one batched model call.
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from live_rvr_predictor import LiveRVRPredictor
+from prediction_manifest import RANGE_KINDS, PredictionManifest
+from rvr_features import build_feature_vector, zone_to_rvr_column
+
+
+class ServiceError(Exception):
+    """Request error reported to the client with an HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_timestamp(value, name: str) -> pd.Timestamp:
+    """Parse a client-supplied timestamp, raising ServiceError(400) if it is not one"""
+    try:
+        timestamp = pd.Timestamp(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ServiceError(400, f"'{name}' is not a valid timestamp: {value!r}")
+    if pd.isna(timestamp):
+        raise ServiceError(400, f"'{name}' is not a valid timestamp: {value!r}")
+    if timestamp.tzinfo is not None:
+        # Prediction files hold naive local times; an offset cannot be compared with them
+        raise ServiceError(400, f"'{name}' must be a local time without a UTC offset: {value!r}")
+    return timestamp
+
+
+class ZoneBatcher:
+    """
+    Collects /predict requests for one zone and scores them together
+    """
+
+    def __init__(self, service: "PredictionService", runway_id: str):
+        self.service = service
+        self.runway_id = runway_id
+        self.pending: List[Tuple[Dict, asyncio.Future]] = []
+        self.flush_handle = None
+
+    def submit(self, request: Dict) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((request, future))
+        if len(self.pending) >= self.service.max_batch_size:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.service.batch_window_ms / 1000.0, self._flush)
+        return future
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        requests = [request for request, _ in batch]
+        try:
+            predictions, tiers = await asyncio.to_thread(self.service.score_batch, self.runway_id, requests)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.service.stats['batches'] += 1
+        self.service.stats['batched_requests'] += len(batch)
+        for (_, future), prediction, tier in zip(batch, predictions, tiers):
+            if not future.done():
+                future.set_result((float(prediction), str(tier)))
+
+
+class PredictionService:
+    """
+    Asyncio HTTP/JSON front end for the predictor and the prediction CSVs
+    """
+
+    def __init__(self, predictor: Optional[LiveRVRPredictor] = None,
+                 output_dir: str = "data/real_time_predictions",
+                 host: str = "127.0.0.1", port: int = 8765,
+                 batch_window_ms: float = 5.0, max_batch_size: int = 256):
+        """
+        Initialize the service
+
+        Args:
+            predictor: Predictor to score /predict requests (created with preloaded models if None)
+            output_dir: Directory with latest_predictions.csv and daily prediction files
+            host: Interface to bind
+            port: TCP port to bind
+            batch_window_ms: How long the first request of a batch waits for company
+            max_batch_size: Flush a zone's batch early at this many requests
+        """
+        # A long-running server pays the model loading up front, not on the first requests
+        self.predictor = predictor if predictor is not None else LiveRVRPredictor(preload=True)
+        self.output_dir = Path(output_dir)
+        self.host = host
+        self.port = port
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+
+        self._batchers: Dict[str, ZoneBatcher] = {}
+        self._csv_cache: Dict[Path, Tuple[Tuple[int, int], pd.DataFrame]] = {}
+        self.manifest = PredictionManifest(self.output_dir)
+        self._server = None
+        self.stats = {'requests': 0, 'errors': 0, 'batches': 0, 'batched_requests': 0}
+
+    # ─── Data access ──────────────────────────────────────────────────────────
+    def _read_csv_cached(self, path: Path) -> pd.DataFrame:
+        """Read a prediction CSV, re-parsing only when its size/mtime change"""
+        stat = path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._csv_cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        df = pd.read_csv(path)
+        df['Datetime'] = pd.to_datetime(df['Datetime'], errors='coerce')
+        self._csv_cache[path] = (version, df)
+        return df
+
+    def latest(self, zone: Optional[str] = None) -> Dict:
+        path = self.output_dir / "latest_predictions.csv"
+        if not path.exists():
+            raise ServiceError(404, "no latest_predictions.csv yet")
+        df = self._read_csv_cached(path)
+        if df.empty:
+            raise ServiceError(404, "latest_predictions.csv is empty")
+        row = df.iloc[-1]
+        predictions = {
+            column[:-len('_predicted')]: float(row[column])
+            for column in df.columns if column.endswith('_predicted') and pd.notna(row[column])
+        }
+        if zone is not None:
+            if zone not in predictions:
+                raise ServiceError(404, f"no prediction for {zone}")
+            predictions = {zone: predictions[zone]}
+        return {'Datetime': str(row['Datetime']), 'predictions': predictions}
+
+    def prediction_files(self, start=None, end=None) -> List[Path]:
+        """Daily and batch prediction files overlapping start..end, from the manifest"""
+        self.manifest.refresh()
+        if self.manifest.is_stale():
+            self.manifest.load_or_build()
+        return [entry['path'] for entry in self.manifest.select(start, end, kinds=RANGE_KINDS)]
+
+    def time_range(self, start, end, zone: Optional[str] = None, limit: int = 10000) -> Dict:
+        frames = []
+        for path in self.prediction_files(start, end):
+            df = self._read_csv_cached(path)
+            mask = (df['Datetime'] >= start) & (df['Datetime'] <= end)
+            if mask.any():
+                frames.append(df.loc[mask])
+        if not frames:
+            return {'rows': []}
+        df = pd.concat(frames).drop_duplicates('Datetime', keep='last').sort_values('Datetime').head(limit)
+        columns = ['Datetime'] + [c for c in df.columns if c.endswith('_predicted')]
+        if zone is not None:
+            columns = ['Datetime', f"{zone}_predicted"]
+            if columns[1] not in df.columns:
+                raise ServiceError(404, f"no prediction column for {zone}")
+        out = df[columns].copy()
+        out['Datetime'] = out['Datetime'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        return {'rows': out.to_dict(orient='records')}
+
+    def score_batch(self, runway_id: str, requests: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build feature rows for a batch of /predict requests and score them in one call
+
+        Runs on a worker thread.
+        """
+        entry = self.predictor.registry.get(runway_id)
+        window_size = self.predictor.max_lag + 1
+        features = np.vstack([
+            build_feature_vector(entry.feature_columns, request['values'], request['timestamp'], request['latest'])
+            for request in requests
+        ])
+        windows = np.array([request['values'][-window_size:] for request in requests], dtype=float)
+        return self.predictor.predict_batch(runway_id, features, windows, entry=entry)
+
+    async def predict(self, body: Dict) -> Dict:
+        if not isinstance(body, dict):
+            raise ServiceError(400, "body must be a JSON object")
+        zone = body.get('zone')
+        if not isinstance(zone, str) or zone not in self.predictor.registry:
+            raise ServiceError(404, f"no model for zone {zone!r}")
+        values = body.get('values')
+        window_size = self.predictor.max_lag + 1
+        if not isinstance(values, list) or len(values) < window_size:
+            raise ServiceError(400, f"'values' must list at least {window_size} readings, oldest first")
+        try:
+            values = [float(v) for v in values]
+        except (TypeError, ValueError):
+            raise ServiceError(400, "'values' must be numeric")
+
+        latest = {}
+        if not isinstance(body.get('latest') or {}, dict):
+            raise ServiceError(400, "'latest' must map zones or columns to readings")
+        for key, value in (body.get('latest') or {}).items():
+            try:
+                column = zone_to_rvr_column(key) if key.startswith('RWY_') else key
+            except ValueError:
+                raise ServiceError(400, f"'latest' key {key!r} is not a zone like RWY_09_BEG")
+            try:
+                latest[column] = float(value)
+            except (TypeError, ValueError):
+                raise ServiceError(400, f"'latest' reading for {key!r} must be numeric")
+        timestamp = parse_timestamp(body['timestamp'], 'timestamp') if body.get('timestamp') else pd.Timestamp.now()
+
+        batcher = self._batchers.get(zone)
+        if batcher is None:
+            batcher = self._batchers[zone] = ZoneBatcher(self, zone)
+        prediction, tier = await batcher.submit({'values': values, 'timestamp': timestamp, 'latest': latest})
+        return {'zone': zone, 'prediction': prediction, 'tier': tier}
+
+    # ─── HTTP ─────────────────────────────────────────────────────────────────
+    async def route(self, method: str, target: str, body: bytes) -> Dict:
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if method == 'GET' and url.path == '/health':
+            return {'status': 'ok', 'zones': self.predictor.runway_zones}
+        if method == 'GET' and url.path == '/latest':
+            return await asyncio.to_thread(self.latest, query.get('zone'))
+        if method == 'GET' and url.path == '/range':
+            if 'start' not in query or 'end' not in query:
+                raise ServiceError(400, "'start' and 'end' are required")
+            start, end = parse_timestamp(query['start'], 'start'), parse_timestamp(query['end'], 'end')
+            try:
+                limit = int(query.get('limit', 10000))
+            except ValueError:
+                raise ServiceError(400, "'limit' must be an integer")
+            return await asyncio.to_thread(self.time_range, start, end, query.get('zone'), limit)
+        if method == 'GET' and url.path == '/stats':
+            stats = dict(self.stats)
+            stats['mean_batch_size'] = stats['batched_requests'] / stats['batches'] if stats['batches'] else 0.0
+            return stats
+        if method == 'POST' and url.path == '/predict':
+            try:
+                payload = json.loads(body or b'{}')
+            except json.JSONDecodeError:
+                raise ServiceError(400, "body must be JSON")
+            return await self.predict(payload)
+        raise ServiceError(404, f"no route for {method} {url.path}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection (keep-alive aware)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+                self.stats['requests'] += 1
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # The body's extent is unknown, so the connection cannot be reused
+                    self.stats['errors'] += 1
+                    await self._respond(writer, 400, {'error': "'Content-Length' must be a non-negative integer"},
+                                        keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = 200, await self.route(method, target, body)
+                except ServiceError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                if status != 200:
+                    self.stats['errors'] += 1
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict, keep_alive: bool):
+        """Write one JSON response"""
+        data = json.dumps(payload, default=str).encode('utf-8')
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found'}.get(status, 'Internal Server Error')
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+        )
+        await writer.drain()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"🌐 RVR prediction service listening on http://{self.host}:{self.port}")
+        print(f"   Micro-batch window: {self.batch_window_ms} ms (max {self.max_batch_size} per zone)")
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+def main():
+    """Run the prediction service"""
+    parser = argparse.ArgumentParser(description="Local RVR prediction service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--batch-window-ms', type=float, default=5.0)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--output-dir', default='data/real_time_predictions')
+    args = parser.parse_args()
+
+    service = PredictionService(output_dir=args.output_dir, host=args.host, port=args.port,
+                                batch_window_ms=args.batch_window_ms, max_batch_size=args.max_batch_size)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        print(f"\n⏹️ Prediction service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from rvr_backfill import PREDICTION_ZONES
+
+
+def _frozen_array(values) -> np.ndarray:
+    array = np.array(values, dtype=float)
+    array.setflags(write=False)
+    return array
+
+
+class PredictionSnapshot(NamedTuple):
+    """
+    Immutable view of one completed update cycle
+
+    A new snapshot is built after every published cycle and swapped in
+    with a single reference assignment, so a reader on another thread
+    always sees one whole cycle: the tuple itself, its arrays (read-only)
+    and its stats mappings (read-only copies) are never mutated after
+    construction.
+    """
+    sequence: int
+    timestamp: object
+    published_at: float
+    zones: Tuple[str, ...]
+    predictions: np.ndarray
+    currents: np.ndarray
+    cycle_stats: Mapping
+    stage_timings_ms: Mapping
+
+    def as_record(self) -> Dict:
+        """The snapshot as a prediction record (same columns as the CSV outputs)"""
+        record = {'Datetime': self.timestamp}
+        record.update({f"{zone}_predicted": float(value) for zone, value in zip(self.zones, self.predictions)})
+        record.update({f"{zone}_current": float(value) for zone, value in zip(self.zones, self.currents)})
+        return record
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.published_at
+
+
+def build_snapshot(sequence: int, record: Dict, cycle_stats: Dict,
+                   stage_timings: Optional[Dict] = None,
+                   zones: Tuple[str, ...] = tuple(PREDICTION_ZONES)) -> PredictionSnapshot:
+    """
+    Freeze a prediction record and the cycle counters into a snapshot
+
+    Args:
+        sequence: Monotonic snapshot number
+        record: Prediction record (Datetime, {zone}_predicted, {zone}_current)
+        cycle_stats: Cycle counters at publish time (copied)
+        stage_timings: Stage timings in ms at publish time (copied)
+        zones: Zone order of the predictions/currents arrays
+
+    Returns:
+        PredictionSnapshot
+    """
+    return PredictionSnapshot(
+        sequence=sequence,
+        timestamp=record.get('Datetime'),
+        published_at=time.time(),
+        zones=tuple(zones),
+        predictions=_frozen_array([record.get(f"{zone}_predicted", np.nan) for zone in zones]),
+        currents=_frozen_array([record.get(f"{zone}_current", np.nan) for zone in zones]),
+        cycle_stats=MappingProxyType(dict(cycle_stats)),
+        stage_timings_ms=MappingProxyType(dict(stage_timings or {})),
+    )
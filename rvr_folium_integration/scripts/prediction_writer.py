@@ -0,0 +1,210 @@
+import csv
+import io
+import os
+import tempfile
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from prediction_manifest import PredictionManifest, time_key
+
+
+class PredictionWriter:
+    """
+    Append-only writer for the daily real-time prediction CSVs
+
+    The current day file stays open in append mode and each record costs
+    one buffered line write, independent of how many rows the file already
+    holds. The header is written once when a file is created; an existing
+    day file (e.g. after a restart) is continued with its own column order.
+    The file rotates when the wall-clock date changes.
+
+    latest_predictions.csv is republished after every write with only the
+    newest `latest_rows` rows, via a temp file and an atomic rename, so
+    readers never see a partially written file.
+
+    Both files are kept in the directory's predictions_manifest.json
+    (time range, rows, columns), saved once per append, so readers can
+    find them without listing the directory.
+    """
+
+    def __init__(self, output_dir, prefix: str = "real_time_predictions",
+                 latest_name: str = "latest_predictions.csv", latest_rows: int = 144,
+                 flush_every: int = 1, manifest: bool = True):
+        """
+        Initialize the writer
+
+        Args:
+            output_dir: Directory for the day files and the latest file
+            prefix: Day file name prefix ({prefix}_{YYYY-mm-dd}.csv)
+            latest_name: Name of the atomically published latest file
+            latest_rows: Number of newest rows kept in the latest file
+            flush_every: Flush the day file every this many records
+            manifest: Maintain predictions_manifest.json in output_dir
+        """
+        self.output_dir = Path(output_dir)
+        self.prefix = prefix
+        self.latest_path = self.output_dir / latest_name
+        self.latest_rows = latest_rows
+        self.flush_every = max(1, flush_every)
+
+        self.columns: Optional[List[str]] = None
+        self.current_date: Optional[str] = None
+        self.current_path: Optional[Path] = None
+        self._file = None
+        self._pending = 0
+        self._recent = deque(maxlen=latest_rows)
+        self._recent_times = deque(maxlen=latest_rows)
+        # Appended rows not yet recorded in the manifest: (count, earliest, latest)
+        self._unrecorded = (0, None, None)
+        self.manifest = None
+        if manifest:
+            self.manifest = PredictionManifest(self.output_dir)
+            self.manifest.load()
+        self.stats = {'rows_written': 0, 'rotations': 0, 'latest_publishes': 0}
+
+    @property
+    def latest_row_count(self) -> int:
+        return len(self._recent)
+
+    def day_path(self, date_str: str) -> Path:
+        return self.output_dir / f"{self.prefix}_{date_str}.csv"
+
+    def _format_row(self, record: Dict) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerow(
+            ['' if record.get(col) is None else record.get(col) for col in self.columns]
+        )
+        return buffer.getvalue()
+
+    def _open_day_file(self, date_str: str, record: Dict):
+        """Open (or continue) the day file, writing the header only for a new file"""
+        self.close()
+        path = self.day_path(date_str)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        needs_newline = False
+        if path.exists() and path.stat().st_size > 0:
+            with open(path, 'r', newline='') as f:
+                header = f.readline()
+                # Seed the latest window from the tail of the existing file
+                if self.columns is None or not self._recent:
+                    for line in f:
+                        if line.strip():
+                            self._recent.append(line if line.endswith('\n') else line + '\n')
+                            self._recent_times.append(time_key(line.split(',', 1)[0]))
+            self.columns = next(csv.reader([header]))
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+            print(f"   📁 Appending to existing file: {path.name}")
+            self._file = open(path, 'a', newline='')
+            if needs_newline:
+                self._file.write('\n')
+        else:
+            if self.columns is None:
+                self.columns = list(record.keys())
+            print(f"   📁 Creating new file: {path.name}")
+            self._file = open(path, 'w', newline='')
+            csv.writer(self._file, lineterminator='\n').writerow(self.columns)
+
+        if self.manifest is not None:
+            # Pick up files added by hand since the last save, then this file as it is now
+            self._file.flush()
+            if self.manifest.is_stale():
+                self.manifest.sync()
+            self.manifest.index_file(path, 'day')
+
+        if self.current_date is not None and self.current_date != date_str:
+            self.stats['rotations'] += 1
+        self.current_date = date_str
+        self.current_path = path
+        self._pending = 0
+
+    def append(self, record: Dict, now: Optional[datetime] = None) -> Path:
+        """
+        Append one prediction record and republish the latest file
+
+        Args:
+            record: Mapping of column name to value (Datetime first)
+            now: Wall-clock time used for day-file selection (default: now)
+
+        Returns:
+            Path of the day file the record was written to
+        """
+        date_str = (now or datetime.now()).strftime("%Y-%m-%d")
+        if self._file is None or date_str != self.current_date:
+            self._open_day_file(date_str, record)
+
+        line = self._format_row(record)
+        self._file.write(line)
+        self._recent.append(line)
+        timestamp = time_key(record.get('Datetime'))
+        self._recent_times.append(timestamp)
+        count, earliest, latest = self._unrecorded
+        if timestamp is not None:
+            earliest = timestamp if earliest is None else min(earliest, timestamp)
+            latest = timestamp if latest is None else max(latest, timestamp)
+        self._unrecorded = (count + 1, earliest, latest)
+        self._pending += 1
+        self.stats['rows_written'] += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+        self.publish_latest()
+        if self.manifest is not None:
+            self._save_manifest()
+        return self.current_path
+
+    def _save_manifest(self):
+        """Save the manifest, re-taking this writer's files if another process saved in between"""
+        if self.manifest.refresh():
+            if self._file is not None:
+                self._file.flush()
+                self._pending = 0
+                self._unrecorded = (0, None, None)
+                self.manifest.index_file(self.current_path, 'day')
+            if self.latest_path.exists():
+                self.manifest.index_file(self.latest_path, 'latest')
+        self.manifest.save()
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+            self._pending = 0
+            count, earliest, latest = self._unrecorded
+            if self.manifest is not None and count:
+                self.manifest.extend(self.current_path, earliest, latest, rows=count)
+            self._unrecorded = (0, None, None)
+
+    def publish_latest(self):
+        """Atomically replace the latest file with the newest rows"""
+        if self.columns is None:
+            return
+        header = self._format_row({col: col for col in self.columns})
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{self.latest_path.name}.", suffix=".tmp",
+                                        dir=self.output_dir)
+        try:
+            with os.fdopen(fd, 'w', newline='') as f:
+                f.write(header)
+                f.writelines(self._recent)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.latest_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.stats['latest_publishes'] += 1
+        if self.manifest is not None:
+            times = [t for t in self._recent_times if t is not None]
+            self.manifest.record(self.latest_path, 'latest', start=min(times, default=None),
+                                 end=max(times, default=None), rows=len(self._recent), columns=self.columns)
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            if self.manifest is not None:
+                self._save_manifest()
+            self._file.close()
+            self._file = None
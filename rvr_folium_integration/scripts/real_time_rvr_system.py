@@ -1,3 +1,4 @@
+import asyncio
 import pandas as pd
 import numpy as np
 import os
@@ -11,6 +12,16 @@ warnings.filterwarnings('ignore')
 
 # Import the live predictor
 from live_rvr_predictor import LiveRVRPredictor
+from prediction_cache import DEFAULT_QUANTIZATION
+from rvr_features import RVR_SATURATION, parse_rvr_datetime, range_end, rvr_column_to_zone
+from rvr_tail_reader import CSVTailReader
+from source_fingerprint import ChangeDetector, file_fingerprint, files_fingerprint, row_fingerprint
+from source_watcher import SourceWatcher
+from cycle_scheduler import CycleScheduler, cadence_period
+from prediction_writer import PredictionWriter
+from prediction_snapshot import build_snapshot
+from rvr_map_payload import IncrementalMapPayload
+from rvr_backfill import backfill_predictions, load_rvr_logs, run_parallel_backfill, valid_rvr_values
 
 class RealTimeRVRSystem:
     """
@@ -25,28 +36,111 @@ class RealTimeRVRSystem:
                  rvr_logs_dir="data/raw/rvr_logs",
                  weather_dir="data/raw/weather",
                  output_dir="data/real_time_predictions",
-                 update_interval=60):  # Update every 60 seconds
+                 update_interval=60,  # Update every 60 seconds
+                 model_dir="saved_models",
+                 preload_models=False,
+                 max_model_memory_mb=None,
+                 watch_models=True,
+                 model_watch_interval=30,
+                 prediction_cache_size=0,
+                 cache_quantization=None,
+                 cache_saturation=None,
+                 event_driven=False,
+                 event_debounce=0.2,
+                 latest_rows=144,
+                 warm_start_history=True,
+                 state_path=None,
+                 snapshot_interval=300,
+                 bootstrap_rows=1000,
+                 async_pipeline=False,
+                 align_to_cadence=True,
+                 schedule_offset=0.0,
+                 cycle_deadline=None,
+                 overrun_policy='coalesce',
+                 shed_weather_under_load=False,
+                 map_sidecar=None):
         
+        self._start_time = time.perf_counter()
         self.rvr_logs_dir = Path(rvr_logs_dir)
         self.weather_dir = Path(weather_dir)
         self.output_dir = Path(output_dir)
         self.update_interval = update_interval
+        self.watch_models = watch_models
+        self.model_watch_interval = model_watch_interval
+        self.event_driven = event_driven
+        self.event_debounce = event_debounce
+        
+        # Warm start: seed lag buffers from a history snapshot or the RVR log
+        self.warm_start_history = warm_start_history
+        self.state_path = Path(state_path) if state_path else self.output_dir / "predictor_state.npz"
+        self.snapshot_interval = snapshot_interval
+        self.bootstrap_rows = bootstrap_rows
+        self.warm_start_info = None
+        self.first_valid_prediction_seconds = None
+        self._last_snapshot = None
         
         # Create output directory
         self.output_dir.mkdir(exist_ok=True)
+        self.prediction_writer = PredictionWriter(self.output_dir, latest_rows=latest_rows)
+        # Copy of the writer's counters for status readers, refreshed after each publish
+        self._writer_stats = dict(self.prediction_writer.stats)
         
         # Initialize the live predictor
         print("🚀 Initializing Live RVR Predictor...")
-        self.predictor = LiveRVRPredictor()
+        self.predictor = LiveRVRPredictor(model_dir=model_dir,
+                                          preload=preload_models,
+                                          max_model_memory_mb=max_model_memory_mb,
+                                          prediction_cache_size=prediction_cache_size,
+                                          cache_quantization=cache_quantization,
+                                          cache_saturation=cache_saturation)
         
         # Initialize data storage
         self.latest_rvr_data = None
+        self.latest_rvr_frame = None
+        self._weather_cache = {}
+        
+        # Source change detection: skip cycles when no input moved
+        self.change_detector = ChangeDetector()
+        self.cycle_stats = {'executed': 0, 'skipped': 0, 'last_skip_reason': None,
+                            'event_triggered': 0, 'timer_triggered': 0,
+                            'last_trigger_latency_ms': None}
+        self.source_watcher = None
+        
+        # Overlapped asyncio pipeline (load / predict / publish) and its stage timings
+        self.async_pipeline = async_pipeline
+        self.stage_timings = {}
+        self._loop = None
+        self._publish_task = None
+        self._publish_lock = threading.Lock()
+        # Guards cycle_stats/stage_timings: status readers copy them while the loop thread writes
+        self._stats_lock = threading.Lock()
+        
+        # Deadline-aware scheduling: ticks on wall-clock boundaries of the data cadence
+        if align_to_cadence:
+            period, offset = cadence_period(update_interval), schedule_offset
+        else:
+            period, offset = update_interval, time.time() + schedule_offset
+        self.scheduler = CycleScheduler(period, offset=offset, deadline=cycle_deadline,
+                                        overrun_policy=overrun_policy)
+        self.shed_weather_under_load = shed_weather_under_load
+        self.cycle_stats['weather_refresh_shed'] = 0
+        self.rvr_tail_rows = 100
+        self._rvr_tail_readers = {}
         self.latest_weather_data = {}
         self.prediction_history = []
+        self.last_cascade_report = None
         
         # Threading for continuous updates
         self.running = False
         self.update_thread = None
+        self._stop_event = threading.Event()
+        
+        # Incremental map: append each published record to the map's data sidecar
+        self.map_payload = IncrementalMapPayload(map_sidecar) if map_sidecar else None
+        
+        # Latest completed cycle, replaced (never mutated) by a single reference swap
+        self._snapshot = None
+        self._snapshot_sequence = 0
         
         print(f"✅ Real-time RVR system initialized")
         print(f"   RVR logs directory: {self.rvr_logs_dir}")
@@ -54,6 +148,84 @@ class RealTimeRVRSystem:
         print(f"   Output directory: {self.output_dir}")
         print(f"   Update interval: {self.update_interval} seconds")
     
+    def warm_start(self):
+        """
+        Seed the predictor's lag/rolling buffers before the first cycle
+        
+        Restores the last history snapshot and replays log rows newer than
+        it, or rebuilds the buffers from the newest rows of the RVR log when
+        no snapshot covers the gap. The newest row is left for the first
+        update cycle, which then predicts with a full history instead of
+        falling back for max_lag + 1 cycles.
+        """
+        print(f"\n♨️ Warm-starting predictor history...")
+        started = time.perf_counter()
+        
+        rvr_files = list(self.rvr_logs_dir.glob("RVR_2024.csv"))
+        if not rvr_files:
+            print(f"   ❌ No RVR 2024 data found in {self.rvr_logs_dir}")
+            return None
+        try:
+            frame = CSVTailReader(rvr_files[0], max_rows=self.bootstrap_rows).read()
+        except Exception as e:
+            print(f"   ❌ Error reading RVR history: {e}")
+            return None
+        if frame.empty:
+            return None
+        
+        latest_timestamp = frame['Datetime'].iloc[-1]
+        history_rows = frame.iloc[:-1]
+        valid_values = valid_rvr_values(history_rows)
+        
+        # Buffers rebuilt from the log: the last history_size valid readings per zone
+        store_history = {}
+        for column in valid_values.columns:
+            readings = valid_values[column].dropna().iloc[-self.predictor.history_size:]
+            if len(readings):
+                store_history[rvr_column_to_zone(column)] = [
+                    {'timestamp': timestamp, 'value': float(value)}
+                    for timestamp, value in zip(history_rows['Datetime'][readings.index], readings)
+                ]
+        
+        source = 'rvr_store'
+        snapshot_newest = self.predictor.load_history_snapshot(self.state_path) if self.state_path.exists() else None
+        if snapshot_newest is not None and len(history_rows) and snapshot_newest >= history_rows['Datetime'].iloc[0]:
+            source = 'snapshot'
+            # The first cycle ingests the newest row itself
+            for entries in self.predictor.historical_data.values():
+                entries[:] = [entry for entry in entries if entry['timestamp'] < latest_timestamp]
+            newer = (history_rows['Datetime'] > snapshot_newest).to_numpy()
+            for timestamp, (_, values) in zip(history_rows['Datetime'][newer], valid_values[newer].iterrows()):
+                sensor_data = {rvr_column_to_zone(column): float(value) for column, value in values.dropna().items()}
+                self.predictor.update_sensor_data(sensor_data, timestamp)
+            # A snapshot taken soon after a cold start may hold fewer readings than the log
+            for zone, entries in store_history.items():
+                if len(self.predictor.historical_data.get(zone, [])) < len(entries):
+                    self.predictor.historical_data[zone] = entries
+                    source = 'snapshot+rvr_store'
+        else:
+            self.predictor.historical_data = store_history
+        
+        zones_ready = sum(1 for entries in self.predictor.historical_data.values()
+                          if len(entries) >= self.predictor.max_lag + 1)
+        self.warm_start_info = {
+            'source': source,
+            'zones_ready': zones_ready,
+            'seconds': round(time.perf_counter() - started, 4),
+        }
+        print(f"   ✅ Seeded history from {source}: {zones_ready} zones ready "
+              f"({self.warm_start_info['seconds'] * 1000:.1f} ms)")
+        return self.warm_start_info
+    
+    def save_state_snapshot(self):
+        """Write the predictor's lag/rolling buffers for the next warm start"""
+        try:
+            size = self.predictor.save_history_snapshot(self.state_path)
+            self._last_snapshot = time.monotonic()
+            print(f"   💾 Saved history snapshot ({size} bytes)")
+        except Exception as e:
+            print(f"   ⚠️ Could not save history snapshot: {e}")
+    
     def load_latest_rvr_data(self):
         """Load the most recent RVR data from CSV files"""
         print(f"\n📊 Loading latest RVR data...")
@@ -68,19 +240,14 @@ class RealTimeRVRSystem:
         print(f"   📁 Loading: {rvr_file.name}")
         
         try:
-            # Load RVR data
-            rvr_df = pd.read_csv(rvr_file)
+            # Parse only the newest rows; later cycles read just the appended bytes
+            reader = self._rvr_tail_readers.get(rvr_file)
+            if reader is None:
+                reader = self._rvr_tail_readers[rvr_file] = CSVTailReader(rvr_file, max_rows=self.rvr_tail_rows)
+            rvr_df = reader.read()
+            self.latest_rvr_frame = rvr_df
             
-            # Parse datetime in yyyy-mm-dd HH:MM format
-            rvr_df['Datetime'] = pd.to_datetime(rvr_df['Datetime'], format='%Y-%m-%d %H:%M', errors='coerce')
-            
-            # If parsing fails, try d/m/Y H:M as fallback
-            if rvr_df['Datetime'].isnull().all():
-                rvr_df['Datetime'] = pd.to_datetime(rvr_df['Datetime'], format='%d/%m/%Y %H:%M', errors='coerce')
-            
-            rvr_df = rvr_df.dropna(subset=['Datetime'])
-            
-            print(f"   📅 Date range: {rvr_df['Datetime'].min()} to {rvr_df['Datetime'].max()}")
+            print(f"   📅 Tail range: {rvr_df['Datetime'].min()} to {rvr_df['Datetime'].max()} ({len(rvr_df)} rows)")
             
             # Get the latest data point
             latest_rvr = rvr_df.iloc[-1]
@@ -93,6 +260,41 @@ class RealTimeRVRSystem:
             print(f"   ❌ Error loading RVR data: {e}")
             return None
     
+    def _load_weather_file(self, weather_file):
+        """
+        Latest row of one weather workbook, cached until the file changes
+        
+        Returns:
+            Tuple of (runway, latest row or None)
+        """
+        # Extract runway from filename
+        runway = weather_file.stem.split('_')[0]  # e.g., 'RUNWAY11'
+        try:
+            # Workbooks that have not changed since the last read keep their cached row
+            fingerprint = file_fingerprint(weather_file)
+            cached = self._weather_cache.get(weather_file)
+            if cached is not None and cached[0] == fingerprint:
+                print(f"   ⏭️ {runway}: unchanged, using cached row")
+                return runway, cached[1]
+            
+            print(f"   📊 Loading weather for {runway}...")
+            
+            # Load Excel file
+            weather_df = pd.read_excel(weather_file)
+            print(f"   ✅ Loaded {runway}: {weather_df.shape}")
+            
+            # Get the latest data point
+            latest_weather = None
+            if len(weather_df) > 0:
+                latest_weather = weather_df.iloc[-1]
+                print(f"   🕐 Latest {runway} timestamp: {latest_weather.get('Datetime', 'N/A')}")
+            self._weather_cache[weather_file] = (fingerprint, latest_weather)
+            return runway, latest_weather
+            
+        except Exception as e:
+            print(f"   ❌ Error loading {weather_file.name}: {e}")
+            return runway, None
+    
     def load_latest_weather_data(self):
         """Load the most recent weather data from Excel files"""
         print(f"\n🌤️ Loading latest weather data...")
@@ -102,30 +304,25 @@ class RealTimeRVRSystem:
         print(f"   📁 Found {len(weather_files)} weather files for 2024")
         
         weather_data = {}
-        
         for weather_file in weather_files:
-            try:
-                # Extract runway from filename
-                runway = weather_file.stem.split('_')[0]  # e.g., 'RUNWAY11'
-                print(f"   📊 Loading weather for {runway}...")
-                
-                # Load Excel file
-                weather_df = pd.read_excel(weather_file)
-                print(f"   ✅ Loaded {runway}: {weather_df.shape}")
-                
-                # Get the latest data point
-                if len(weather_df) > 0:
-                    latest_weather = weather_df.iloc[-1]
-                    weather_data[runway] = latest_weather
-                    print(f"   🕐 Latest {runway} timestamp: {latest_weather.get('Datetime', 'N/A')}")
-                
-            except Exception as e:
-                print(f"   ❌ Error loading {weather_file.name}: {e}")
+            runway, latest_weather = self._load_weather_file(weather_file)
+            if latest_weather is not None:
+                weather_data[runway] = latest_weather
         
         self.latest_weather_data = weather_data
         print(f"   📊 Loaded weather data for {len(weather_data)} runways")
         return weather_data
     
+    async def load_latest_weather_data_async(self):
+        """Read every weather workbook concurrently in worker threads"""
+        weather_files = list(self.weather_dir.glob("*_2024.xlsx"))
+        results = await asyncio.gather(*[
+            asyncio.to_thread(self._load_weather_file, weather_file) for weather_file in weather_files
+        ])
+        self.latest_weather_data = {runway: row for runway, row in results if row is not None}
+        print(f"   📊 Loaded weather data for {len(self.latest_weather_data)} runways")
+        return self.latest_weather_data
+    
     def prepare_sensor_data_for_prediction(self):
         """Prepare sensor data in the format expected by the live predictor"""
         print(f"\n🔧 Preparing sensor data for prediction...")
@@ -160,10 +357,12 @@ class RealTimeRVRSystem:
                 value = self.latest_rvr_data[rvr_col]
                 
                 # Handle different types of missing/invalid data
-                if pd.notna(value) and value != 3333.0 and value != '' and str(value).strip() != '':
+                # Saturated readings (3333 m, above the reporting range) are kept:
+                # the models were trained on them and the cascade short-circuits on them
+                if pd.notna(value) and value != '' and str(value).strip() != '':
                     try:
                         float_value = float(value)
-                        if float_value > 0 and float_value < 3333.0:  # Valid RVR range
+                        if float_value > 0 and float_value <= RVR_SATURATION:  # Valid RVR range
                             sensor_data[runway_zone] = float_value
                             print(f"   📍 {runway_zone}: {float_value:.1f}m")
                         else:
@@ -177,10 +376,11 @@ class RealTimeRVRSystem:
         if not sensor_data:
             print(f"   🔍 No valid sensor data in latest row, searching for recent valid data...")
             try:
-                # Load the full RVR file and find recent valid data
-                rvr_file = list(self.rvr_logs_dir.glob("RVR_2024.csv"))[0]
-                rvr_df = pd.read_csv(rvr_file)
-                rvr_df['Datetime'] = pd.to_datetime(rvr_df['Datetime'], format='%d/%m/%Y %H:%M')
+                # Search the tail rows already loaded by load_latest_rvr_data
+                rvr_df = self.latest_rvr_frame
+                if rvr_df is None:
+                    rvr_file = list(self.rvr_logs_dir.glob("RVR_2024.csv"))[0]
+                    rvr_df = CSVTailReader(rvr_file, max_rows=self.rvr_tail_rows).read()
                 
                 # Look for the last 100 rows for valid data
                 for idx in range(len(rvr_df) - 1, max(0, len(rvr_df) - 100), -1):
@@ -188,10 +388,10 @@ class RealTimeRVRSystem:
                     for rvr_col, runway_zone in rvr_column_mapping.items():
                         if rvr_col in row.index and runway_zone not in sensor_data:
                             value = row[rvr_col]
-                            if pd.notna(value) and value != 3333.0 and value != '' and str(value).strip() != '':
+                            if pd.notna(value) and value != '' and str(value).strip() != '':
                                 try:
                                     float_value = float(value)
-                                    if float_value > 0 and float_value < 3333.0:
+                                    if float_value > 0 and float_value <= RVR_SATURATION:
                                         sensor_data[runway_zone] = float_value
                                         print(f"   📍 {runway_zone}: {float_value:.1f}m (from row {idx})")
                                         break  # Found valid data for this zone
@@ -228,6 +428,7 @@ class RealTimeRVRSystem:
         
         # Generate predictions for all zones
         predictions = {}
+        model_predictions = 0
         
         for runway_zone in self.predictor.runway_zones:
             print(f"\n   🎯 Predicting for {runway_zone}...")
@@ -235,6 +436,7 @@ class RealTimeRVRSystem:
             
             if prediction is not None:
                 predictions[runway_zone] = prediction
+                model_predictions += 1
                 print(f"   ✅ {runway_zone}: {prediction:.1f}m")
             else:
                 # Use current sensor value if available, otherwise default
@@ -242,6 +444,10 @@ class RealTimeRVRSystem:
                 predictions[runway_zone] = current_value
                 print(f"   ⚠️ {runway_zone}: Using current value {current_value:.1f}m")
         
+        if model_predictions and self.first_valid_prediction_seconds is None:
+            self.first_valid_prediction_seconds = time.perf_counter() - self._start_time
+            print(f"   ⏱️ First model prediction {self.first_valid_prediction_seconds:.2f}s after startup")
+        
         print(f"\n   📊 Generated predictions for {len(predictions)} zones")
         return predictions, timestamp
     
@@ -302,163 +508,594 @@ class RealTimeRVRSystem:
         return record
     
     def save_predictions_to_csv(self, prediction_record):
-        """Save predictions to CSV file for map visualization"""
+        """Append predictions to the day CSV and republish latest_predictions.csv"""
         print(f"\n💾 Saving predictions to CSV...")
         
-        # Create filename with current date
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        csv_filename = f"real_time_predictions_{current_date}.csv"
-        csv_path = self.output_dir / csv_filename
-        
-        # Check if file exists
-        if csv_path.exists():
-            # Append to existing file
-            print(f"   📁 Appending to existing file: {csv_filename}")
-            existing_df = pd.read_csv(csv_path)
-            new_df = pd.DataFrame([prediction_record])
-            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        else:
-            # Create new file
-            print(f"   📁 Creating new file: {csv_filename}")
-            combined_df = pd.DataFrame([prediction_record])
+        csv_path = self.prediction_writer.append(prediction_record)
+        print(f"   ✅ Appended record to {csv_path}")
+        print(f"   ✅ Updated latest predictions file ({self.prediction_writer.latest_row_count} rows)")
         
-        # Save to CSV
-        combined_df.to_csv(csv_path, index=False)
-        print(f"   ✅ Saved {len(combined_df)} records to {csv_path}")
+        return csv_path
+    
+    def _skip_cycle(self, reason):
+        """Record a cycle whose predict/write stages were skipped"""
+        with self._stats_lock:
+            self.cycle_stats['skipped'] += 1
+            self.cycle_stats['last_skip_reason'] = reason
+        print(f"   ⏭️ Skipping update cycle: {reason}")
+    
+    def _count(self, key, amount=1):
+        """Increment a cycle counter"""
+        with self._stats_lock:
+            self.cycle_stats[key] += amount
+    
+    def _record_stage(self, stage, started):
+        """Store a stage duration (ms) measured from a perf_counter start"""
+        with self._stats_lock:
+            self.stage_timings[stage] = round((time.perf_counter() - started) * 1000, 2)
+    
+    def _stats_copy(self):
+        """Consistent copies of (cycle_stats, stage_timings)"""
+        with self._stats_lock:
+            return dict(self.cycle_stats), dict(self.stage_timings)
+    
+    def _sources_changed(self, force):
+        """Stat fingerprints of the RVR and weather files, and whether either moved"""
+        rvr_stat = files_fingerprint(self.rvr_logs_dir.glob("RVR_2024.csv"))
+        weather_stat = files_fingerprint(self.weather_dir.glob("*_2024.xlsx"))
+        changed = force or self.change_detector.changed('rvr_files', rvr_stat) \
+            or self.change_detector.changed('weather_files', weather_stat)
+        return rvr_stat, weather_stat, changed
+    
+    def _predict_latest(self, force):
+        """
+        Predict for the latest RVR row unless it was already ingested
         
-        # Also create a latest predictions file for immediate access
-        latest_csv_path = self.output_dir / "latest_predictions.csv"
-        combined_df.to_csv(latest_csv_path, index=False)
-        print(f"   ✅ Updated latest predictions file")
+        Returns:
+            Tuple of (prediction record, predictions, timestamp) or None
+        """
+        # A rewritten file without a new or corrected row must not push a
+        # duplicate into the lag history; a corrected row (same Datetime,
+        # different values) replaces its history entry
+        latest_row = row_fingerprint(self.latest_rvr_data)
+        if not force and not self.change_detector.changed('rvr_latest', latest_row):
+            self._skip_cycle(f"latest RVR row unchanged ({latest_row[0] if latest_row else None})")
+            return None
         
+        started = time.perf_counter()
+        prediction_result = self.generate_predictions()
+        if prediction_result is None:
+            print(f"   ❌ Failed to generate predictions")
+            return None
+        predictions, timestamp = prediction_result
+        prediction_record = self.create_prediction_record(predictions, timestamp)
+        self._record_stage('predict', started)
+        
+        self.change_detector.commit('rvr_latest', latest_row)
+        self._count('executed')
+        
+        if self.snapshot_interval is not None and (
+                self._last_snapshot is None or time.monotonic() - self._last_snapshot >= self.snapshot_interval):
+            self.save_state_snapshot()
+        return prediction_record, predictions, timestamp
+    
+    def _publish(self, prediction_record, predictions, timestamp):
+        """Write the record to the CSV outputs and the in-memory history"""
+        with self._publish_lock:
+            started = time.perf_counter()
+            csv_path = self.save_predictions_to_csv(prediction_record)
+            self.prediction_history.append({
+                'timestamp': timestamp,
+                'predictions': predictions,
+                'csv_path': csv_path
+            })
+            
+            # Keep only last 100 predictions in memory
+            if len(self.prediction_history) > 100:
+                self.prediction_history = self.prediction_history[-100:]
+            self._append_to_map(prediction_record)
+            self._record_stage('publish', started)
+            with self._stats_lock:
+                self._writer_stats = dict(self.prediction_writer.stats)
+            
+            self._snapshot_sequence += 1
+            self._snapshot = build_snapshot(self._snapshot_sequence, prediction_record, *self._stats_copy())
         return csv_path
     
-    def update_system(self):
-        """Perform one complete update cycle"""
+    def _append_to_map(self, prediction_record):
+        """Append the record to the map sidecar, creating the sidecar and map shell if needed"""
+        if self.map_payload is None:
+            return
+        try:
+            # Re-read header and high-water mark: the map script may have rebuilt the sidecar
+            if not self.map_payload.load():
+                from generate_rvr_map import OUTPUT_FILE, update_incremental_map
+                update_incremental_map(None, str(self.map_payload.path.with_name(OUTPUT_FILE)),
+                                       sidecar=self.map_payload.path)
+                self.map_payload.load()
+            self.map_payload.append_record(prediction_record)
+        except Exception as e:
+            print(f"   ⚠️ Could not update map sidecar: {e}")
+    
+    def get_latest_snapshot(self):
+        """
+        Latest published cycle as an immutable PredictionSnapshot
+        
+        Safe to call from any thread without locking: the reference is
+        swapped atomically after each cycle and the snapshot is never
+        modified, so readers never block the updater.
+        
+        Returns:
+            PredictionSnapshot, or None before the first cycle completes
+        """
+        return self._snapshot
+    
+    def update_system(self, force=False, refresh_weather=True):
+        """
+        Perform one complete update cycle
+        
+        Args:
+            force: Run the predict/write stages even if no input changed
+            refresh_weather: Re-read changed weather workbooks (False keeps the
+                             previous weather rows to protect the RVR deadline)
+        """
         print(f"\n🔄 Starting update cycle at {datetime.now()}")
+        cycle_started = time.perf_counter()
         
         try:
-            # Step 1: Load latest data
+            # Step 0: Swap in any retrained models validated since the last cycle
+            self.predictor.apply_pending_model_updates()
+            
+            # Step 1: Fingerprint sources (stat only) and skip if nothing moved
+            rvr_stat, weather_stat, changed = self._sources_changed(force)
+            if not changed:
+                self._skip_cycle("source files unchanged")
+                return
+            
+            # Step 2: Load latest data (only changed workbooks are re-read)
+            started = time.perf_counter()
             self.load_latest_rvr_data()
-            self.load_latest_weather_data()
+            self._record_stage('load_rvr', started)
+            if refresh_weather:
+                started = time.perf_counter()
+                self.load_latest_weather_data()
+                self._record_stage('load_weather', started)
+                self.change_detector.commit('weather_files', weather_stat)
+            else:
+                self._shed_weather_refresh()
+            self.change_detector.commit('rvr_files', rvr_stat)
             
-            # Step 2: Generate predictions
-            prediction_result = self.generate_predictions()
-            if prediction_result is None:
-                print(f"   ❌ Failed to generate predictions")
+            # Steps 3-4: Generate predictions and the prediction record
+            result = self._predict_latest(force)
+            if result is None:
                 return
             
-            predictions, timestamp = prediction_result
+            # Steps 5-6: Save to CSV and store in history
+            self._publish(*result)
+            self._record_stage('cycle', cycle_started)
             
-            # Step 3: Create prediction record
-            prediction_record = self.create_prediction_record(predictions, timestamp)
+            print(f"   ✅ Update cycle completed successfully")
             
-            # Step 4: Save to CSV
-            csv_path = self.save_predictions_to_csv(prediction_record)
+        except Exception as e:
+            print(f"   ❌ Error in update cycle: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    async def update_system_async(self, force=False, refresh_weather=True):
+        """
+        Perform one update cycle as an overlapped asyncio pipeline
+        
+        The RVR log and every weather workbook are read concurrently in
+        worker threads. Prediction starts as soon as the RVR snapshot is
+        ready; the models take no weather features, so the workbooks only
+        refresh latest_weather_data. The record is published in a worker
+        thread that keeps running into the next cycle's reads, with
+        publishes kept in cycle order.
+        
+        Args:
+            force: Run the predict/write stages even if no input changed
+            refresh_weather: Re-read changed weather workbooks
+        """
+        print(f"\n🔄 Starting pipelined update cycle at {datetime.now()}")
+        cycle_started = time.perf_counter()
+        
+        try:
+            self.predictor.apply_pending_model_updates()
             
-            # Step 5: Store in history
-            self.prediction_history.append({
-                'timestamp': timestamp,
-                'predictions': predictions,
-                'csv_path': csv_path
-            })
+            rvr_stat, weather_stat, changed = self._sources_changed(force)
+            if not changed:
+                self._skip_cycle("source files unchanged")
+                return
             
-            # Keep only last 100 predictions in memory
-            if len(self.prediction_history) > 100:
-                self.prediction_history = self.prediction_history[-100:]
+            weather_task = None
+            if refresh_weather:
+                weather_task = asyncio.create_task(
+                    self._timed_stage('load_weather', self.load_latest_weather_data_async()))
+            else:
+                self._shed_weather_refresh()
             
-            print(f"   ✅ Update cycle completed successfully")
+            started = time.perf_counter()
+            await asyncio.to_thread(self.load_latest_rvr_data)
+            self._record_stage('load_rvr', started)
+            self.change_detector.commit('rvr_files', rvr_stat)
+            
+            result = await asyncio.to_thread(self._predict_latest, force)
+            if result is not None:
+                self._publish_task = asyncio.create_task(self._publish_in_order(self._publish_task, result))
+                self._record_stage('prediction_ready', cycle_started)
+            
+            if weather_task is not None:
+                await weather_task
+                self.change_detector.commit('weather_files', weather_stat)
+            self._record_stage('cycle', cycle_started)
+            print(f"   ✅ Pipelined update cycle completed")
             
         except Exception as e:
             print(f"   ❌ Error in update cycle: {e}")
             import traceback
             traceback.print_exc()
     
+    async def _timed_stage(self, stage, coroutine):
+        started = time.perf_counter()
+        try:
+            return await coroutine
+        finally:
+            self._record_stage(stage, started)
+    
+    async def _publish_in_order(self, previous, result):
+        """Publish after the previous cycle's publish has finished"""
+        if previous is not None:
+            try:
+                await previous
+            except Exception:
+                pass  # already reported by that task
+        try:
+            await asyncio.to_thread(self._publish, *result)
+        except Exception as e:
+            print(f"   ❌ Error publishing predictions: {e}")
+            raise
+    
+    def _shed_weather_refresh(self):
+        """Keep the previous weather rows this cycle; the workbooks are picked up once load eases"""
+        self._count('weather_refresh_shed')
+        print(f"   ⏭️ Under load: skipping weather refresh this cycle")
+    
+    def _run_cycle(self, refresh_weather=True):
+        """Run one update cycle in the configured mode"""
+        if self._loop is not None:
+            self._loop.run_until_complete(self.update_system_async(refresh_weather=refresh_weather))
+        else:
+            self.update_system(refresh_weather=refresh_weather)
+    
     def start_real_time_updates(self):
-        """Start continuous real-time updates"""
+        """
+        Start continuous real-time updates
+        
+        In event-driven mode a cycle runs as soon as new data lands in the
+        RVR or weather directories (after a short debounce); update_interval
+        then only bounds staleness when no events arrive.
+        """
         print(f"\n🚀 Starting real-time RVR prediction system...")
-        print(f"   Update interval: {self.update_interval} seconds")
-        print(f"   Press Ctrl+C to stop")
+        if self.event_driven:
+            print(f"   Mode: event-driven (max staleness {self.scheduler.period:.0f} seconds)")
+        else:
+            print(f"   Update interval: {self.scheduler.period:.0f} seconds (wall-clock aligned, "
+                  f"deadline {self.scheduler.deadline:g}s)")
+        if threading.current_thread() is threading.main_thread():
+            print(f"   Press Ctrl+C to stop")
         
-        self.running = True
+        if threading.current_thread() is not self.update_thread:
+            self._stop_event.clear()
+        # A stop() that lands before the background thread gets here still wins
+        self.running = not self._stop_event.is_set()
+        
+        # Pick up retrained models without restarting
+        if self.watch_models:
+            self.predictor.start_model_watcher(self.model_watch_interval)
+        
+        if self.event_driven:
+            self.source_watcher = SourceWatcher([self.rvr_logs_dir, self.weather_dir],
+                                                debounce=self.event_debounce)
+            self.source_watcher.start()
+        
+        if self.warm_start_history:
+            self.warm_start()
+        
+        if self.async_pipeline:
+            self._loop = asyncio.new_event_loop()
         
         # Perform initial update
-        self.update_system()
+        self._run_cycle()
         
-        # Start continuous updates
+        # Start continuous updates on wall-clock ticks (file events may run cycles in between)
         while self.running:
             try:
-                time.sleep(self.update_interval)
-                if self.running:
-                    self.update_system()
+                tick = self.scheduler.next_tick()
+                waiter = self.source_watcher.wait if self.source_watcher is not None else self._stop_event.wait
+                triggered = self.scheduler.wait_until(tick, waiter)
+                if not self.running:
+                    break
+                if triggered:
+                    self._run_event_cycle()
+                else:
+                    self._run_scheduled_cycle(tick)
             except KeyboardInterrupt:
                 print(f"\n⏹️ Stopping real-time updates...")
                 self.running = False
                 break
             except Exception as e:
                 print(f"   ❌ Error in update loop: {e}")
-                time.sleep(10)  # Wait before retrying
+                self._stop_event.wait(10)  # Wait before retrying
         
+        if self.source_watcher is not None:
+            self.source_watcher.stop()
+            self.source_watcher = None
+        if self._loop is not None:
+            # Let the last background publish finish before closing the writer
+            if self._publish_task is not None:
+                self._loop.run_until_complete(asyncio.gather(self._publish_task, return_exceptions=True))
+                self._publish_task = None
+            self._loop.close()
+            self._loop = None
+        self.predictor.stop_model_watcher()
+        self.prediction_writer.close()
+        if self.snapshot_interval is not None and self.cycle_stats['executed']:
+            self.save_state_snapshot()
         print(f"   ✅ Real-time updates stopped")
     
+    def start(self):
+        """
+        Run the update loop in a background thread and return immediately
+        
+        Lets the system be embedded in another service: the caller keeps its
+        own thread and reads results through get_latest_snapshot().
+        
+        Returns:
+            The update thread
+        """
+        if self.update_thread is not None and self.update_thread.is_alive():
+            return self.update_thread
+        self._stop_event.clear()
+        self.running = True  # visible to callers before the thread gets scheduled
+        self.update_thread = threading.Thread(target=self.start_real_time_updates,
+                                              name="rvr-update-loop", daemon=True)
+        self.update_thread.start()
+        return self.update_thread
+    
+    def stop(self, timeout=30):
+        """
+        Stop the background update loop
+        
+        Wakes the loop out of its wait between cycles; a cycle in progress
+        finishes and is published before the thread exits.
+        
+        Args:
+            timeout: Longest to wait for the thread to finish (seconds)
+        
+        Returns:
+            True if the update thread has stopped
+        """
+        self.running = False
+        self._stop_event.set()
+        watcher = self.source_watcher
+        if watcher is not None:
+            watcher.stop()
+        thread = self.update_thread
+        if thread is None or thread is threading.current_thread():
+            return True
+        thread.join(timeout)
+        if thread.is_alive():
+            return False
+        self.update_thread = None
+        return True
+    
+    def _run_scheduled_cycle(self, tick):
+        """Run the cycle for a scheduler tick and account for its deadline"""
+        lateness = self.scheduler.start_cycle(tick)
+        if lateness > 1.0:
+            print(f"   ⏰ Cycle starting {lateness:.1f}s late")
+        refresh_weather = not (self.shed_weather_under_load and self.scheduler.under_load)
+        started = time.time()
+        self._run_cycle(refresh_weather=refresh_weather)
+        self._count('timer_triggered')
+        if self.scheduler.finish_cycle(tick, started):
+            print(f"   ⏰ Cycle missed its {self.scheduler.deadline:g}s deadline "
+                  f"({self.scheduler.stats['last_duration_s']:.1f}s)")
+    
+    def _run_event_cycle(self):
+        """Run an update cycle triggered by new files and record its latency"""
+        started = time.monotonic()
+        executed_before = self.cycle_stats['executed']
+        self._run_cycle()
+        self._count('event_triggered')
+        if self.cycle_stats['executed'] > executed_before:
+            # Debounce wait plus the cycle itself: data landing -> prediction written
+            latency = (time.monotonic() - started + self.event_debounce) * 1000
+            with self._stats_lock:
+                self.cycle_stats['last_trigger_latency_ms'] = round(latency, 1)
+            print(f"   ⚡ Event-triggered prediction ~{latency:.0f} ms after data landed")
+    
     def get_system_status(self):
-        """Get current system status"""
+        """
+        Get current system status
+        
+        Safe to call from another thread while the loop runs: the last cycle
+        comes from the published snapshot, and counters and timings are
+        copied under the lock the loop thread takes to update them. The
+        publish lock is never taken, so a slow CSV write cannot stall it.
+        """
+        snapshot = self._snapshot
+        cycle_stats, stage_timings = self._stats_copy()
+        with self._stats_lock:
+            writer_stats = self._writer_stats
         status = {
             'running': self.running,
-            'last_update': None,
+            'background_thread': self.update_thread is not None and self.update_thread.is_alive(),
+            'last_update': snapshot.timestamp if snapshot is not None else None,
+            'snapshot_sequence': snapshot.sequence if snapshot is not None else 0,
             'prediction_count': len(self.prediction_history),
             'available_models': len(self.predictor.models),
+            'model_cold_start_ms': self.predictor.get_model_registry_status()['cold_start_ms'],
+            'model_reloads': len(self.predictor.model_reloads),
             'runway_zones': self.predictor.runway_zones,
             'output_directory': str(self.output_dir),
             'latest_rvr_data': self.latest_rvr_data is not None,
-            'weather_data_count': len(self.latest_weather_data)
+            'weather_data_count': len(self.latest_weather_data),
+            'cascade': self.predictor.cascade.get_report(),
+            'prediction_cache': self.predictor.get_cache_status(),
+            'cycles_executed': cycle_stats['executed'],
+            'cycles_skipped': cycle_stats['skipped'],
+            'last_skip_reason': cycle_stats['last_skip_reason'],
+            'update_mode': 'event-driven' if self.event_driven else 'interval',
+            'source_watch_mode': self.source_watcher.mode if self.source_watcher else None,
+            'event_triggered_cycles': cycle_stats['event_triggered'],
+            'timer_triggered_cycles': cycle_stats['timer_triggered'],
+            'last_trigger_latency_ms': cycle_stats['last_trigger_latency_ms'],
+            'prediction_writer': writer_stats,
+            'warm_start': self.warm_start_info,
+            'time_to_first_valid_prediction_s': self.first_valid_prediction_seconds,
+            'pipeline': 'asyncio' if self.async_pipeline else 'serial',
+            'stage_timings_ms': stage_timings,
+            'scheduler': self.scheduler.get_status(),
+            'weather_refresh_shed': cycle_stats['weather_refresh_shed'],
         }
         
-        if self.prediction_history:
-            status['last_update'] = self.prediction_history[-1]['timestamp']
-        
         return status
     
-    def batch_predict_for_time_range(self, start_time, end_time, freq='10min'):
+    def batch_predict_for_time_range(self, start_time, end_time, freq='10min', evaluate_cascade=False):
         """
         Generate predictions for a range of timestamps and save to a single CSV.
         Args:
             start_time: Start datetime (inclusive)
             end_time: End datetime (inclusive)
             freq: Frequency string for time steps (default '10min')
+            evaluate_cascade: Also score the full model on rows served by cheaper
+                              cascade tiers and report the accuracy delta
         """
         print(f"\n🚀 Batch prediction from {start_time} to {end_time} every {freq}...")
+        self.predictor.cascade.reset_stats()
+        self.predictor.shadow_full_model = evaluate_cascade
         # Load full RVR data
         rvr_file = list(self.rvr_logs_dir.glob("RVR_2024.csv"))[0]
         rvr_df = pd.read_csv(rvr_file)
-        # Parse datetime in yyyy-mm-dd HH:MM format
-        rvr_df['Datetime'] = pd.to_datetime(rvr_df['Datetime'], format='%Y-%m-%d %H:%M', errors='coerce')
-        # If parsing fails, try d/m/Y H:M as fallback
-        if rvr_df['Datetime'].isnull().all():
-            rvr_df['Datetime'] = pd.to_datetime(rvr_df['Datetime'], format='%d/%m/%Y %H:%M', errors='coerce')
+        # Parse datetime in yyyy-mm-dd HH:MM format, falling back to d/m/Y H:M
+        rvr_df['Datetime'] = parse_rvr_datetime(rvr_df['Datetime'])
         # Drop rows with invalid dates
         rvr_df = rvr_df.dropna(subset=['Datetime'])
         # Filter to desired range
         mask = (rvr_df['Datetime'] >= start_time) & (rvr_df['Datetime'] <= end_time)
         rvr_df = rvr_df.loc[mask].reset_index(drop=True)
         print(f"   Filtered to {len(rvr_df)} rows in range.")
-        all_records = []
-        for idx, row in rvr_df.iterrows():
-            self.latest_rvr_data = row
-            predictions, timestamp = self.generate_predictions()
-            record = self.create_prediction_record(predictions, timestamp)
-            # Ensure Datetime is in yyyy-mm-dd HH:MM format
-            record['Datetime'] = pd.to_datetime(record['Datetime']).strftime('%Y-%m-%d %H:%M')
-            all_records.append(record)
-            if (idx+1) % 100 == 0:
-                print(f"   Processed {idx+1} rows...")
+        # One feature-matrix pass and one model call per zone and cascade tier
+        started = time.perf_counter()
+        batch_df = backfill_predictions(self.predictor, rvr_df)
+        print(f"   Scored {len(batch_df)} rows in {time.perf_counter() - started:.2f}s")
         batch_csv = self.output_dir / f"batch_predictions_{start_time:%Y%m%d}_{end_time:%Y%m%d}.csv"
-        pd.DataFrame(all_records).to_csv(batch_csv, index=False)
+        batch_df.to_csv(batch_csv, index=False)
+        self._index_output(batch_csv, batch_df)
         print(f"   ✅ Batch predictions saved to {batch_csv}")
+        self.predictor.shadow_full_model = False
+        self.last_cascade_report = self.predictor.cascade.get_report()
+        print(self.predictor.cascade.format_report(self.last_cascade_report))
         return batch_csv
+    
+    def backfill_range(self, start_time, end_time, workers=None, fresh=False):
+        """
+        Backfill a (multi-year) range from all RVR logs in parallel month shards
+        
+        Shards are checkpointed under output_dir, so an interrupted run
+        resumes where it stopped; the merged CSV matches
+        batch_predict_for_time_range for the same range.
+        
+        Args:
+            start_time: Start datetime (inclusive)
+            end_time: End datetime (inclusive); a date alone covers that whole day
+            workers: Worker processes (default: CPU count)
+            fresh: Rescore every shard, ignoring earlier checkpoints
+        """
+        start_time, end_time = pd.Timestamp(start_time), range_end(end_time)
+        print(f"\n🚀 Parallel backfill from {start_time} to {end_time}...")
+        started = time.perf_counter()
+        rvr_df = load_rvr_logs(self.rvr_logs_dir)
+        batch_csv, tier_counts = run_parallel_backfill(
+            rvr_df, start_time, end_time, self.output_dir,
+            model_dir=str(self.predictor.model_dir), workers=workers,
+            history_size=self.predictor.history_size, fresh=fresh,
+        )
+        self._index_output(batch_csv)
+        cascade = self.predictor.cascade
+        cascade.reset_stats()
+        for tier, count in tier_counts.items():
+            cascade.record(tier, count)
+        self.last_cascade_report = cascade.get_report()
+        print(f"   ✅ Backfill saved to {batch_csv} ({time.perf_counter() - started:.2f}s)")
+        print(cascade.format_report(self.last_cascade_report))
+        return batch_csv
+    
+    def _index_output(self, path, df=None):
+        """Record a batch output file in the predictions manifest"""
+        manifest = self.prediction_writer.manifest
+        if manifest is None:
+            return
+        if df is not None:
+            manifest.record_frame(path, df, 'batch')
+        else:
+            manifest.index_file(path, 'batch')
+        manifest.save()
+
+def parse_cache_quantization(text):
+    """Parse 'kind=step,...' (step 'none' drops the kind from the key) for --cache-quantization"""
+    import argparse
+    
+    quantization = {}
+    for item in filter(None, text.split(',')):
+        kind, _, step = item.partition('=')
+        kind = kind.strip()
+        if kind not in DEFAULT_QUANTIZATION:
+            raise argparse.ArgumentTypeError(f"unknown feature kind {kind!r}; expected one of {sorted(DEFAULT_QUANTIZATION)}")
+        try:
+            quantization[kind] = None if step.strip().lower() == 'none' else float(step)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"step for {kind!r} must be a number or 'none'")
+    return quantization
 
 def main():
     """Main function to run the real-time RVR system"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Real-time RVR prediction system")
+    parser.add_argument('--event-driven', action='store_true',
+                        help="Run a cycle as soon as new data lands (interval becomes max staleness)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Overlap loading, prediction and publishing with asyncio")
+    parser.add_argument('--map-sidecar', default=None,
+                        help="Append each cycle to this map sidecar (see generate_rvr_map.py --incremental)")
+    parser.add_argument('--prediction-cache', type=int, default=0, metavar='SIZE',
+                        help="Memoize model outputs in a cache of this many entries (0 = off)")
+    parser.add_argument('--cache-quantization', type=parse_cache_quantization, default=None,
+                        metavar='KIND=STEP[,...]',
+                        help="Cache key step per feature kind (calendar, rvr, spread); 'none' drops the kind, "
+                             "e.g. rvr=10,calendar=none")
+    parser.add_argument('--cache-saturated-calendar', action='store_true',
+                        help="Key rows whose RVR readings are all saturated without calendar features "
+                             "(approximate: reuses outputs across hours of the day)")
+    subparsers = parser.add_subparsers(dest='command')
+    backfill_parser = subparsers.add_parser('backfill', aliases=['batch'],
+                                            help="Backfill predictions for a historical range")
+    backfill_parser.add_argument('start', nargs='?', default='2024-01-01', help="Start datetime (inclusive)")
+    backfill_parser.add_argument('end', nargs='?', default='2024-01-07', help="End datetime (inclusive); a date alone covers that whole day")
+    backfill_parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    backfill_parser.add_argument('--output-dir', default="data/real_time_predictions")
+    backfill_parser.add_argument('--fresh', action='store_true', help="Ignore completed shards from earlier runs")
+    args = parser.parse_args()
+    
+    if args.command in ('backfill', 'batch'):
+        # Example: python scripts/real_time_rvr_system.py backfill 2022-01-01 2024-12-31 --workers 8
+        system = RealTimeRVRSystem(output_dir=args.output_dir, watch_models=False)
+        system.backfill_range(args.start, args.end,
+                              workers=args.workers, fresh=args.fresh)
+        return
+    
     print("=" * 60)
     print("🌐 REAL-TIME RVR PREDICTION SYSTEM")
     print("=" * 60)
@@ -470,7 +1107,13 @@ def main():
     print("=" * 60)
     
     # Initialize the system
-    system = RealTimeRVRSystem(update_interval=60)  # Update every minute
+    system = RealTimeRVRSystem(update_interval=60,  # Update every minute
+                               event_driven=args.event_driven,
+                               async_pipeline=args.pipeline,
+                               map_sidecar=args.map_sidecar,
+                               prediction_cache_size=args.prediction_cache,
+                               cache_quantization=args.cache_quantization,
+                               cache_saturation=RVR_SATURATION if args.cache_saturated_calendar else None)
     
     # Show initial status
     status = system.get_system_status()
@@ -488,19 +1131,5 @@ def main():
         import traceback
         traceback.print_exc()
 
-    import sys
-    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
-        # Example: python scripts/real_time_rvr_system.py batch 2024-01-01 2024-01-02
-        if len(sys.argv) >= 4:
-            start = pd.to_datetime(sys.argv[2])
-            end = pd.to_datetime(sys.argv[3])
-        else:
-            # Default: one week in 2024
-            start = pd.to_datetime('2024-01-01')
-            end = pd.to_datetime('2024-01-07')
-        system = RealTimeRVRSystem()
-        system.batch_predict_for_time_range(start, end)
-        return
-
 if __name__ == "__main__":
     main() 
\ No newline at end of file
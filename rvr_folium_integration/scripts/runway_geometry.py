@@ -0,0 +1,151 @@
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+RUNWAYS_FILE = Path(__file__).resolve().parent.parent / 'data' / 'runways.json'
+DEFAULT_AIRPORT = 'VIDP'
+
+# WGS84 ellipsoid (the default of geopy's geodesic)
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+
+def destination(lat, lon, bearing, distance, tolerance: float = 1e-12,
+                max_iterations: int = 100) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Points reached by travelling distance along a geodesic on the WGS84 ellipsoid
+
+    Vincenty's direct formula on NumPy arrays; inputs broadcast against
+    each other, and all points iterate together until every one has
+    converged (a handful of iterations for runway-scale distances).
+    Agrees with geopy's geodesic().destination to well under a millimetre.
+
+    Args:
+        lat: Start latitudes (degrees)
+        lon: Start longitudes (degrees)
+        bearing: Initial true bearings (degrees)
+        distance: Distances (m)
+        tolerance: Convergence of the angular distance on the sphere (radians)
+        max_iterations: Iteration cap
+
+    Returns:
+        (latitudes, longitudes, final bearings) in degrees
+    """
+    lat, lon, bearing, distance = np.broadcast_arrays(*(np.asarray(v, dtype=float)
+                                                        for v in (lat, lon, bearing, distance)))
+    alpha1 = np.radians(bearing)
+    sin_alpha1, cos_alpha1 = np.sin(alpha1), np.cos(alpha1)
+
+    # Reduced latitude
+    tan_u1 = (1 - WGS84_F) * np.tan(np.radians(lat))
+    cos_u1 = 1 / np.sqrt(1 + tan_u1 ** 2)
+    sin_u1 = tan_u1 * cos_u1
+    sigma1 = np.arctan2(tan_u1, cos_alpha1)
+    sin_alpha = cos_u1 * sin_alpha1
+    cos2_alpha = 1 - sin_alpha ** 2
+    u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    big_a = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    big_b = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+
+    sigma_0 = distance / (WGS84_B * big_a)
+    sigma = sigma_0
+    for _ in range(max_iterations):
+        cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+        sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+        delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        previous, sigma = sigma, sigma_0 + delta_sigma
+        if not np.any(np.abs(sigma - previous) > tolerance):
+            break
+
+    cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+    sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+    tmp = sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_alpha1
+    lat2 = np.arctan2(sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_alpha1,
+                      (1 - WGS84_F) * np.sqrt(sin_alpha ** 2 + tmp ** 2))
+    lam = np.arctan2(sin_sigma * sin_alpha1, cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_alpha1)
+    c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+    big_l = lam - (1 - c) * WGS84_F * sin_alpha * (
+        sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+    lon2 = (np.radians(lon) + big_l + 3 * np.pi) % (2 * np.pi) - np.pi
+    alpha2 = np.arctan2(sin_alpha, -tmp)
+    return np.degrees(lat2), np.degrees(lon2), np.degrees(alpha2) % 360
+
+
+def load_airport(code: str = DEFAULT_AIRPORT, path=RUNWAYS_FILE) -> Dict:
+    """
+    An airport's definition from the runways data file
+
+    Each airport has a map center, zone offsets along the runway (metres
+    from the threshold, or "N%" of the runway length) and runways with
+    their threshold ('beg'), true heading and length; a runway may list
+    extra 'sensors' as name -> [metres along, metres right of centreline].
+
+    Args:
+        code: Airport key in the file (ICAO code)
+        path: JSON data file
+
+    Returns:
+        Airport dict with 'beg' and 'center' as tuples
+    """
+    airports = json.loads(Path(path).read_text())
+    if code not in airports:
+        raise KeyError(f"No airport {code!r} in {path}; known: {sorted(airports)}")
+    airport = airports[code]
+    airport['center'] = tuple(airport['center'])
+    for runway in airport['runways'].values():
+        runway['beg'] = tuple(runway['beg'])
+    return airport
+
+
+def zone_distance(spec, length_m: np.ndarray) -> np.ndarray:
+    """Metres from the threshold for a zone offset (metres, or "N%" of the runway length)"""
+    if isinstance(spec, str) and spec.endswith('%'):
+        return length_m * float(spec[:-1]) / 100
+    return np.full_like(length_m, float(spec))
+
+
+def zone_positions(runways: Dict, zones: Dict, names: Optional[Iterable[str]] = None) -> Dict[str, Tuple[float, float]]:
+    """
+    Positions of every zone of every runway, plus listed sensors, in one vectorized pass
+
+    Args:
+        runways: Runway definitions (beg, heading, length_m, optional sensors)
+        zones: Zone name -> offset along the runway (metres or "N%")
+        names: Only these zones, in this order (default: all of zones)
+
+    Returns:
+        Dictionary of RWY_{runway}_{zone} -> (lat, lon), grouped by runway,
+        followed by the sensors
+    """
+    names = list(zones if names is None else names)
+    ids = list(runways)
+    beg = np.array([runways[rwy]['beg'] for rwy in ids], dtype=float).reshape(-1, 2)
+    heading = np.array([runways[rwy]['heading'] for rwy in ids], dtype=float)
+    length = np.array([runways[rwy]['length_m'] for rwy in ids], dtype=float)
+
+    # runways x zones, flattened so each runway's zones stay together
+    keys = [f'RWY_{rwy}_{name}' for rwy in ids for name in names]
+    along = np.stack([zone_distance(zones[name], length) for name in names], axis=1).ravel()
+    index = np.repeat(np.arange(len(ids)), len(names))
+    cross = np.zeros(len(keys))
+
+    sensors = [(i, f'RWY_{rwy}_{name}', offsets) for i, rwy in enumerate(ids)
+               for name, offsets in runways[rwy].get('sensors', {}).items()]
+    if sensors:
+        keys += [key for _, key, _ in sensors]
+        index = np.r_[index, [i for i, _, _ in sensors]]
+        along = np.r_[along, [offsets[0] for _, _, offsets in sensors]]
+        cross = np.r_[cross, [offsets[1] for _, _, offsets in sensors]]
+
+    lat, lon, bearing = destination(beg[index, 0], beg[index, 1], heading[index], along)
+    offset = cross != 0
+    if offset.any():
+        # Sensors beside the centreline: at right angles to the runway's local bearing
+        lat[offset], lon[offset], _ = destination(lat[offset], lon[offset], bearing[offset] + 90, cross[offset])
+    return {key: (float(lat[i]), float(lon[i])) for i, key in enumerate(keys)}
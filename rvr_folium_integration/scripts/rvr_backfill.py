@@ -0,0 +1,328 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_registry import ModelRegistry
+from rvr_features import RVR_SATURATION, build_history_feature_matrix, parse_rvr_datetime, zone_to_rvr_column
+
+
+# Zones written to prediction CSVs, in column order
+PREDICTION_ZONES = (
+    'RWY_09_BEG', 'RWY_09_TDZ', 'RWY_10_TDZ', 'RWY_11_BEG', 'RWY_11_TDZ', 'RWY_27_MID',
+    'RWY_28_BEG', 'RWY_28_MID', 'RWY_28_TDZ', 'RWY_29_BEG', 'RWY_29_MID',
+)
+DEFAULT_RVR = 1000.0
+
+MANIFEST_NAME = "manifest.json"
+
+
+def valid_rvr_values(rvr_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    RVR readings the live system accepts (0 < value <= 3333), NaN elsewhere
+
+    Args:
+        rvr_df: RVR log frame
+
+    Returns:
+        DataFrame with one column per prediction zone's RVR column
+    """
+    columns = [zone_to_rvr_column(zone) for zone in PREDICTION_ZONES]
+    values = rvr_df.reindex(columns=columns).apply(pd.to_numeric, errors='coerce')
+    return values.where((values > 0) & (values <= RVR_SATURATION))
+
+
+def backfill_predictions(predictor, rvr_df: pd.DataFrame, output_start=None) -> pd.DataFrame:
+    """
+    Score every row of an RVR log frame with one model pass per zone
+
+    Produces the rows the real-time system would write if the log were
+    replayed through it one row at a time from an empty history: zones with
+    fewer than max_lag + 1 valid readings fall back to the current reading
+    (or 1000), and current columns show 1000 for missing or saturated
+    readings. The predictor's live history is not touched.
+
+    Args:
+        predictor: LiveRVRPredictor supplying models and the cascade
+        rvr_df: RVR log frame with a parsed Datetime column, oldest first
+
+    Returns:
+        DataFrame with Datetime, {zone}_predicted and {zone}_current columns
+    """
+    rvr_df = rvr_df.reset_index(drop=True)
+    timestamps = rvr_df['Datetime']
+    valid_values = valid_rvr_values(rvr_df)
+    window_size = predictor.max_lag + 1
+    if output_start is None:
+        keep = np.ones(len(rvr_df), dtype=bool)
+    else:
+        keep = (timestamps >= pd.Timestamp(output_start)).to_numpy()
+
+    output = {'Datetime': timestamps.dt.strftime('%Y-%m-%d %H:%M').to_numpy()}
+    predicted = {}
+    for zone in PREDICTION_ZONES:
+        rvr_column = zone_to_rvr_column(zone)
+        # Fallback when no prediction is possible: the current reading, else the default
+        values = valid_values[rvr_column].fillna(DEFAULT_RVR).to_numpy(dtype=float, copy=True)
+
+        if zone in predictor.models:
+            entry = predictor.registry.get(zone)
+            features, windows, history = build_history_feature_matrix(
+                valid_values, timestamps, rvr_column, entry.feature_columns,
+                history_size=predictor.history_size, window_size=window_size,
+            )
+            rows = np.flatnonzero((history >= window_size) & keep)
+            if rows.size:
+                scores, _ = predictor.predict_batch(zone, features[rows], windows[rows], entry=entry)
+                values[rows] = scores
+        predicted[zone] = values
+
+    for zone in PREDICTION_ZONES:
+        output[f'{zone}_predicted'] = predicted[zone]
+    for zone in PREDICTION_ZONES:
+        rvr_column = zone_to_rvr_column(zone)
+        if rvr_column not in rvr_df.columns:
+            output[f'{zone}_current'] = np.full(len(rvr_df), DEFAULT_RVR)
+            continue
+        raw = pd.to_numeric(rvr_df[rvr_column], errors='coerce').to_numpy(dtype=float)
+        output[f'{zone}_current'] = np.where(np.isnan(raw) | (raw == RVR_SATURATION), DEFAULT_RVR, raw)
+
+    return pd.DataFrame(output)[keep].reset_index(drop=True)
+
+
+def load_rvr_logs(rvr_logs_dir, pattern: str = "RVR_*.csv") -> pd.DataFrame:
+    """
+    Load every yearly RVR log into one frame
+
+    Args:
+        rvr_logs_dir: Directory with RVR_{year}.csv files
+        pattern: Glob for the log files
+
+    Returns:
+        Frame sorted by Datetime (invalid dates and duplicate timestamps dropped)
+    """
+    frames = []
+    for rvr_file in sorted(Path(rvr_logs_dir).glob(pattern)):
+        df = pd.read_csv(rvr_file)
+        df['Datetime'] = parse_rvr_datetime(df['Datetime'])
+        frames.append(df.dropna(subset=['Datetime']))
+    if not frames:
+        raise FileNotFoundError(f"No {pattern} files in {rvr_logs_dir}")
+    rvr_df = pd.concat(frames, ignore_index=True)
+    rvr_df = rvr_df.sort_values('Datetime', kind='mergesort').drop_duplicates('Datetime', keep='last')
+    return rvr_df.reset_index(drop=True)
+
+
+def month_shards(rvr_df: pd.DataFrame) -> List[Tuple[str, int, int]]:
+    """
+    Split a time-sorted frame into calendar-month shards
+
+    Returns:
+        List of (shard key 'YYYY-MM', first row, end row) in time order
+    """
+    months = rvr_df['Datetime'].dt.strftime('%Y-%m').to_numpy()
+    shards = []
+    start = 0
+    for i in range(1, len(months) + 1):
+        if i == len(months) or months[i] != months[start]:
+            shards.append((str(months[start]), start, i))
+            start = i
+    return shards
+
+
+def warmup_row(reading_positions: List[np.ndarray], first_row: int, history_size: int) -> int:
+    """
+    Earliest row a shard must include so its histories match a single run
+
+    Each zone needs its last history_size valid readings before the shard
+    (or all of them, if it has fewer since the start of the range); the
+    newest of those also supplies the cross-runway features.
+
+    Args:
+        reading_positions: Row indices of valid readings, one array per zone
+        first_row: First row of the shard
+        history_size: Readings kept per zone by the live predictor
+
+    Returns:
+        Row index to start the shard's input frame from
+    """
+    start = first_row
+    for positions in reading_positions:
+        before = int(np.searchsorted(positions, first_row))
+        if before >= history_size:
+            start = min(start, int(positions[before - history_size]))
+        elif before:
+            return 0
+    return start
+
+
+def _frame_digest(frame: pd.DataFrame) -> str:
+    return hashlib.sha1(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def _model_versions(model_dir) -> Dict[str, Dict]:
+    """Indexed (mtime, size) of the full and cascade models, without loading them"""
+    versions = {}
+    for label, directory in (('full', Path(model_dir)), ('cheap', Path(model_dir) / "cascade")):
+        registry = ModelRegistry(directory)
+        versions[label] = {zone: list(registry.indexed_version(zone)) for zone in registry.runway_ids}
+    return versions
+
+
+def _write_json_atomic(path: Path, data: Dict):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Per-process predictor, created once by the pool initializer
+_worker_predictor = None
+
+
+def _init_worker(model_dir: str):
+    """Load every model once per worker process, single-threaded"""
+    global _worker_predictor
+    from live_rvr_predictor import LiveRVRPredictor
+
+    _worker_predictor = LiveRVRPredictor(model_dir=model_dir, preload=True)
+    cheap_models = _worker_predictor.cascade.cheap_models
+    cheap_models.preload()
+    models = list(_worker_predictor.models.values())
+    models += [cheap_models.get(zone).model for zone in cheap_models.runway_ids]
+    for model in models:
+        # Parallelism comes from the process pool
+        if hasattr(model, 'set_params'):
+            model.set_params(n_jobs=1)
+
+
+def _score_shard(key: str, frame: pd.DataFrame, output_start, shard_path: str) -> Dict:
+    """Score one shard in a worker and write its CSV atomically"""
+    started = time.perf_counter()
+    cascade = _worker_predictor.cascade
+    cascade.reset_stats()
+    shard_df = backfill_predictions(_worker_predictor, frame, output_start=output_start)
+    tmp_path = f"{shard_path}.tmp"
+    shard_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, shard_path)
+    return {
+        'key': key,
+        'rows': len(shard_df),
+        'tier_counts': dict(cascade.tier_counts),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def run_parallel_backfill(rvr_df: pd.DataFrame, start_time, end_time, output_dir,
+                          model_dir: str = "saved_models", workers: Optional[int] = None,
+                          history_size: int = 12, fresh: bool = False) -> Tuple[Path, Dict]:
+    """
+    Backfill a (multi-year) range in month shards on a process pool
+
+    Each shard carries the warmup rows its histories need, so the merged
+    output is identical to one backfill_predictions call over the range.
+    Finished shards are recorded in a manifest next to their CSVs; a rerun
+    skips shards whose input rows and model files are unchanged. The merge
+    concatenates shard files in time order, so the result does not depend
+    on which worker finished first.
+
+    Args:
+        rvr_df: RVR log frame with a parsed Datetime column, oldest first
+        start_time: Start datetime (inclusive)
+        end_time: End datetime (inclusive)
+        output_dir: Directory for the shard folder and the merged CSV
+        model_dir: Directory with the saved models
+        workers: Worker processes (default: CPU count)
+        history_size: Readings kept per zone by the live predictor
+        fresh: Ignore the manifest and rescore every shard
+
+    Returns:
+        Tuple of (merged CSV path, summed cascade tier counts)
+    """
+    start_time, end_time = pd.Timestamp(start_time), pd.Timestamp(end_time)
+    output_dir = Path(output_dir)
+    shard_dir = output_dir / f"backfill_{start_time:%Y%m%d}_{end_time:%Y%m%d}"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = shard_dir / MANIFEST_NAME
+
+    mask = (rvr_df['Datetime'] >= start_time) & (rvr_df['Datetime'] <= end_time)
+    range_df = rvr_df.loc[mask].reset_index(drop=True)
+    if range_df.empty:
+        raise ValueError(f"No RVR rows between {start_time} and {end_time}")
+    valid_values = valid_rvr_values(range_df)
+    reading_positions = [np.flatnonzero(valid_values[column].notna().to_numpy())
+                         for column in valid_values.columns]
+    shards = month_shards(range_df)
+
+    versions = _model_versions(model_dir)
+    manifest = {'start': str(start_time), 'end': str(end_time), 'model_versions': versions, 'shards': {}}
+    if manifest_path.exists() and not fresh:
+        previous = json.loads(manifest_path.read_text())
+        if previous.get('model_versions') == versions:
+            manifest['shards'] = previous.get('shards', {})
+        else:
+            print("   ⚠️ Model files changed since the last run; rescoring every shard")
+
+    print(f"   {len(range_df)} rows in {len(shards)} month shards")
+    tasks = []
+    for key, first, end in shards:
+        warm = warmup_row(reading_positions, first, history_size)
+        frame = range_df.iloc[warm:end]
+        digest = _frame_digest(frame)
+        shard_path = shard_dir / f"shard_{key}.csv"
+        done = manifest['shards'].get(key)
+        if done and done.get('input_digest') == digest and shard_path.exists():
+            continue
+        manifest['shards'].pop(key, None)
+        tasks.append((key, frame, range_df['Datetime'].iloc[first], str(shard_path), digest, end - warm))
+
+    print(f"   {len(shards) - len(tasks)} shards already complete, {len(tasks)} to score")
+    if tasks:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                                 initargs=(str(model_dir),)) as pool:
+            futures = {
+                pool.submit(_score_shard, key, frame, output_start, shard_path): (key, digest, input_rows)
+                for key, frame, output_start, shard_path, digest, input_rows in tasks
+            }
+            for future in as_completed(futures):
+                key, digest, input_rows = futures[future]
+                result = future.result()
+                manifest['shards'][key] = {
+                    'file': f"shard_{key}.csv",
+                    'rows': result['rows'],
+                    'input_rows': input_rows,
+                    'input_digest': digest,
+                    'tier_counts': result['tier_counts'],
+                    'seconds': result['seconds'],
+                }
+                _write_json_atomic(manifest_path, manifest)
+                print(f"   ✅ Shard {key}: {result['rows']} rows in {result['seconds']:.2f}s")
+
+    # Drop shards left over from an earlier, wider range
+    keys = [key for key, _, _ in shards]
+    manifest['shards'] = {key: manifest['shards'][key] for key in keys}
+    _write_json_atomic(manifest_path, manifest)
+
+    merged_path = output_dir / f"batch_predictions_{start_time:%Y%m%d}_{end_time:%Y%m%d}.csv"
+    tmp_path = merged_path.with_name(f".{merged_path.name}.tmp")
+    with open(tmp_path, 'wb') as merged:
+        for i, key in enumerate(keys):
+            with open(shard_dir / manifest['shards'][key]['file'], 'rb') as shard:
+                header = shard.readline()
+                if i == 0:
+                    merged.write(header)
+                merged.write(shard.read())
+    os.replace(tmp_path, merged_path)
+
+    tier_counts = {}
+    for key in keys:
+        for tier, count in manifest['shards'][key]['tier_counts'].items():
+            tier_counts[tier] = tier_counts.get(tier, 0) + count
+    return merged_path, tier_counts
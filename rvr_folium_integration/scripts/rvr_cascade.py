@@ -0,0 +1,242 @@
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from model_registry import ModelRegistry
+from rvr_features import RVR_SATURATION
+
+
+# Tiers in order of cost
+TIER_RULE = 'rule'
+TIER_CHEAP = 'cheap'
+TIER_FULL = 'full'
+TIERS = (TIER_RULE, TIER_CHEAP, TIER_FULL)
+
+# Map colour thresholds (green/orange/red/darkred boundaries)
+RVR_THRESHOLDS = (800.0, 500.0, 200.0)
+
+CHEAP_MODEL_DIR = "saved_models/cascade"
+
+
+class PredictionCascade:
+    """
+    Cheap-first routing of RVR predictions
+
+    - rule:  every reading in the recent window is saturated (3333 m), so
+             the prediction is persistence of the latest reading
+    - cheap: a shallow model scores the row; its answer is kept unless a
+             recent reading or the cheap prediction is near a map threshold
+    - full:  the tuned model, used near thresholds or when no cheap model exists
+    """
+
+    def __init__(self, cheap_model_dir: str = CHEAP_MODEL_DIR, thresholds: Sequence[float] = RVR_THRESHOLDS,
+                 threshold_margin: float = 100.0, saturation: float = RVR_SATURATION,
+                 enabled: bool = True):
+        """
+        Initialize the cascade
+
+        Args:
+            cheap_model_dir: Directory with shallow models (same file layout as saved_models)
+            thresholds: RVR values (m) the map colours by
+            threshold_margin: Distance (m) from a threshold that escalates to the full model
+            saturation: Reading that means "above the reporting range"
+            enabled: When False every row goes to the full model
+        """
+        self.enabled = enabled
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.threshold_margin = threshold_margin
+        self.saturation = saturation
+        self.cheap_models = ModelRegistry(cheap_model_dir)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clear tier counters and shadow comparison accumulators"""
+        self.tier_counts = {tier: 0 for tier in TIERS}
+        self._shadow_abs_diff = []
+        self._shadow_errors = {'cascade': [], 'full': []}
+
+    def has_cheap_model(self, runway_id: str) -> bool:
+        return runway_id in self.cheap_models
+
+    def is_saturated(self, recent_values) -> np.ndarray:
+        """
+        Whether each window is entirely at saturation
+
+        Args:
+            recent_values: Window of readings, shape (n,) or (rows, n)
+
+        Returns:
+            Boolean scalar or array per row
+        """
+        values = np.asarray(recent_values, dtype=float)
+        return np.all(values >= self.saturation, axis=-1)
+
+    def near_threshold(self, values) -> np.ndarray:
+        """
+        Whether any value is within threshold_margin of a map threshold
+
+        Args:
+            values: Readings/predictions, shape (n,) or (rows, n)
+
+        Returns:
+            Boolean scalar or array per row
+        """
+        values = np.asarray(values, dtype=float)
+        distance = np.abs(values[..., None] - self.thresholds)
+        return np.any(distance <= self.threshold_margin, axis=(-2, -1))
+
+    def record(self, tier: str, count: int = 1):
+        self.tier_counts[tier] += count
+
+    def record_shadow(self, served, full, observed=None):
+        """
+        Record a comparison of served predictions against the full model
+
+        Args:
+            served: Predictions returned by the cascade
+            full: Full model predictions for the same rows
+            observed: Observed readings for the same rows (optional)
+        """
+        served = np.atleast_1d(np.asarray(served, dtype=float))
+        full = np.atleast_1d(np.asarray(full, dtype=float))
+        self._shadow_abs_diff.append(np.abs(served - full))
+        if observed is not None:
+            observed = np.atleast_1d(np.asarray(observed, dtype=float))
+            valid = np.isfinite(observed)
+            self._shadow_errors['cascade'].append(np.abs(served[valid] - observed[valid]))
+            self._shadow_errors['full'].append(np.abs(full[valid] - observed[valid]))
+
+    def get_report(self) -> Dict:
+        """
+        Summarize tier usage and accuracy against the full model
+
+        Returns:
+            Dictionary with per-tier counts/fractions and, when shadow scoring
+            ran, the mean/max absolute difference to the full model and the
+            MAE of both against observed readings
+        """
+        total = sum(self.tier_counts.values())
+        report = {
+            'rows': total,
+            'tier_counts': dict(self.tier_counts),
+            'tier_fractions': {tier: (count / total if total else 0.0) for tier, count in self.tier_counts.items()},
+        }
+        if self._shadow_abs_diff:
+            diff = np.concatenate(self._shadow_abs_diff)
+            report['vs_full_mean_abs_diff'] = float(diff.mean()) if diff.size else 0.0
+            report['vs_full_max_abs_diff'] = float(diff.max()) if diff.size else 0.0
+        if self._shadow_errors['full']:
+            cascade_err = np.concatenate(self._shadow_errors['cascade'])
+            full_err = np.concatenate(self._shadow_errors['full'])
+            if full_err.size:
+                report['cascade_mae'] = float(cascade_err.mean())
+                report['full_mae'] = float(full_err.mean())
+                report['mae_delta'] = report['cascade_mae'] - report['full_mae']
+        return report
+
+    def format_report(self, report: Optional[Dict] = None) -> str:
+        """Human-readable cascade report"""
+        report = report or self.get_report()
+        lines = [f"📊 Cascade report ({report['rows']} predictions)"]
+        for tier in TIERS:
+            lines.append(f"   {tier:>5}: {report['tier_counts'][tier]:>7} ({report['tier_fractions'][tier] * 100:5.1f}%)")
+        if 'vs_full_mean_abs_diff' in report:
+            lines.append(f"   vs full model: mean |diff| {report['vs_full_mean_abs_diff']:.2f}m, "
+                         f"max |diff| {report['vs_full_max_abs_diff']:.2f}m")
+        if 'mae_delta' in report:
+            lines.append(f"   MAE vs observed: cascade {report['cascade_mae']:.2f}m, full {report['full_mae']:.2f}m "
+                         f"(delta {report['mae_delta']:+.2f}m)")
+        return "\n".join(lines)
+
+
+def train_cheap_models(model_dir: str = "saved_models", output_dir: str = CHEAP_MODEL_DIR,
+                       rvr_logs_dir: str = "data/raw/rvr_logs", max_depth: int = 2, n_estimators: int = 30):
+    """
+    Fit one shallow XGBoost model per zone on the same features as the tuned model
+
+    Args:
+        model_dir: Directory with the tuned models (source of feature_columns)
+        output_dir: Where the shallow models are saved
+        rvr_logs_dir: Directory with RVR_*.csv logs
+        max_depth: Tree depth of the shallow models
+        n_estimators: Number of trees of the shallow models
+    """
+    import pandas as pd
+    from joblib import dump as joblib_dump
+    from xgboost import XGBRegressor
+
+    from rvr_features import build_training_frame, parse_rvr_datetime, zone_to_rvr_column
+
+    rvr_files = sorted(Path(rvr_logs_dir).glob("RVR_*.csv"))
+    if not rvr_files:
+        print(f"   ❌ No RVR logs found in {rvr_logs_dir}")
+        return
+
+    frames = []
+    for rvr_file in rvr_files:
+        df = pd.read_csv(rvr_file)
+        df['Datetime'] = parse_rvr_datetime(df['Datetime'])
+        frames.append(df.dropna(subset=['Datetime']))
+    rvr_df = pd.concat(frames, ignore_index=True).sort_values('Datetime').reset_index(drop=True)
+    print(f"📊 Training shallow cascade models on {len(rvr_df)} RVR rows")
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    registry = ModelRegistry(model_dir)
+
+    for runway_id in registry.runway_ids:
+        target_column = zone_to_rvr_column(runway_id)
+        if target_column not in rvr_df.columns:
+            print(f"   ⚠️ {runway_id}: no {target_column} column in RVR logs")
+            continue
+        feature_columns = registry.get(runway_id).feature_columns
+        X = build_training_frame(rvr_df, target_column, feature_columns)
+        y = rvr_df[target_column]
+        mask = y.notna()
+        if mask.sum() < 100:
+            print(f"   ⚠️ {runway_id}: only {mask.sum()} labelled rows, skipping")
+            continue
+
+        model = XGBRegressor(max_depth=max_depth, n_estimators=n_estimators, learning_rate=0.3,
+                             random_state=42, n_jobs=-1, verbosity=0)
+        model.fit(X[mask].values, y[mask].values)
+        joblib_dump({
+            'model': model,
+            'scaler': None,
+            'feature_columns': list(feature_columns),
+            'runway': target_column,
+        }, output_path / f"rvr_model_{runway_id}.pkl")
+        print(f"   ✅ {runway_id}: shallow model on {int(mask.sum())} rows")
+
+
+def main():
+    """
+    Cascade utilities
+
+    python scripts/rvr_cascade.py train
+    python scripts/rvr_cascade.py report [START END]
+    """
+    command = sys.argv[1] if len(sys.argv) > 1 else 'report'
+
+    if command == 'train':
+        train_cheap_models()
+        return
+
+    if command == 'report':
+        import pandas as pd
+        from real_time_rvr_system import RealTimeRVRSystem
+
+        start = pd.to_datetime(sys.argv[2]) if len(sys.argv) > 2 else pd.to_datetime('2024-01-01')
+        end = pd.to_datetime(sys.argv[3]) if len(sys.argv) > 3 else pd.to_datetime('2024-01-07')
+        system = RealTimeRVRSystem(watch_models=False)
+        system.batch_predict_for_time_range(start, end, evaluate_cascade=True)
+        return
+
+    print(f"Unknown command: {command}")
+    print(main.__doc__)
+
+
+if __name__ == "__main__":
+    main()
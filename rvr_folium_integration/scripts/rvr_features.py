@@ -0,0 +1,253 @@
+import re
+from datetime import date, datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# RVR sensors report 3333 m when visibility is above the reporting range
+RVR_SATURATION = 3333.0
+
+# Feature layout used by XGBst_updated.create_features
+CALENDAR_FEATURES = ('hour', 'day_of_week', 'month', 'day_of_year')
+LAG_PERIODS = (1, 2, 3)
+ROLLING_WINDOWS = (3, 6, 12)
+
+_LAG_RE = re.compile(r'^(?P<column>.+)_lag_(?P<lag>\d+)$')
+_ROLLING_RE = re.compile(r'^(?P<column>.+)_rolling_(?P<stat>mean|std)_(?P<window>\d+)$')
+
+
+def zone_to_rvr_column(runway_id: str) -> str:
+    """'RWY_09_BEG' -> 'RWY 09 (BEG)'"""
+    _, runway, zone = runway_id.split('_')
+    return f"RWY {runway} ({zone})"
+
+
+def rvr_column_to_zone(column: str) -> str:
+    """'RWY 09 (BEG)' -> 'RWY_09_BEG'"""
+    return column.replace(' (', '_').replace(')', '').replace(' ', '_')
+
+
+def parse_rvr_datetime(values: pd.Series) -> pd.Series:
+    """
+    Parse RVR log timestamps, accepting yyyy-mm-dd HH:MM and dd/mm/yyyy HH:MM
+
+    Args:
+        values: Raw Datetime column
+
+    Returns:
+        Series of datetimes (NaT where neither format matches)
+    """
+    parsed = pd.to_datetime(values, format='%Y-%m-%d %H:%M', errors='coerce')
+    if parsed.isnull().all():
+        parsed = pd.to_datetime(values, format='%d/%m/%Y %H:%M', errors='coerce')
+    return parsed
+
+
+def range_end(end) -> Optional[pd.Timestamp]:
+    """
+    Inclusive end of a time range (map archive, backfill)
+
+    A date without a time of day ('2024-01-05', or a datetime.date) means
+    the whole of that day, not its first instant.
+
+    Args:
+        end: Range end (string, date, datetime or None)
+
+    Returns:
+        Last instant to include, or None for an open range
+    """
+    if end is None:
+        return None
+    timestamp = pd.Timestamp(end)
+    date_only = (isinstance(end, str) and not any(c in end for c in ':T ')) or \
+        (isinstance(end, date) and not isinstance(end, datetime))
+    if date_only:
+        return timestamp.normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return timestamp
+
+
+def calendar_features(timestamp) -> Dict[str, float]:
+    """Calendar features for one timestamp, as computed from a pandas datetime column"""
+    ts = pd.Timestamp(timestamp)
+    return {
+        'hour': ts.hour,
+        'day_of_week': ts.dayofweek,
+        'month': ts.month,
+        'day_of_year': ts.dayofyear,
+    }
+
+
+def build_feature_vector(feature_columns: Sequence[str], recent_values: Sequence[float], timestamp,
+                         latest_values: Dict[str, float]) -> np.ndarray:
+    """
+    Build one model input row from a zone's recent readings
+
+    Mirrors XGBst_updated.create_features for the newest reading: lag_k is
+    the k-th reading before it, rolling statistics cover the window ending
+    at it, and other runways contribute their latest reading.
+
+    Args:
+        feature_columns: Feature names saved with the model
+        recent_values: Target zone readings, oldest first, ending with the current one
+        timestamp: Timestamp of the current reading
+        latest_values: Latest reading per RVR column (e.g., {'RWY 10 (TDZ)': 3333.0})
+
+    Returns:
+        Array of shape (1, len(feature_columns)); unavailable features are NaN
+    """
+    values = np.asarray(recent_values, dtype=float)
+    calendar = calendar_features(timestamp)
+    row = np.full(len(feature_columns), np.nan)
+
+    for i, name in enumerate(feature_columns):
+        if name in calendar:
+            row[i] = calendar[name]
+            continue
+
+        match = _LAG_RE.match(name)
+        if match:
+            lag = int(match.group('lag'))
+            if len(values) > lag:
+                row[i] = values[-lag - 1]
+            continue
+
+        match = _ROLLING_RE.match(name)
+        if match:
+            window = int(match.group('window'))
+            if len(values) >= window:
+                window_values = values[-window:]
+                if match.group('stat') == 'mean':
+                    row[i] = window_values.mean()
+                else:
+                    row[i] = window_values.std(ddof=1)
+            continue
+
+        value = latest_values.get(name)
+        if value is not None:
+            row[i] = value
+
+    return row.reshape(1, -1)
+
+
+def build_training_frame(rvr_df: pd.DataFrame, target_column: str,
+                         feature_columns: Sequence[str]) -> pd.DataFrame:
+    """
+    Build the feature frame for one target runway the way the training script does
+
+    Lags and rolling windows are row-based over the full frame, as in
+    XGBst_updated.create_features.
+
+    Args:
+        rvr_df: RVR log frame with a parsed Datetime column
+        target_column: RVR column being modelled (e.g., 'RWY 09 (BEG)')
+        feature_columns: Feature names saved with the model
+
+    Returns:
+        DataFrame with exactly feature_columns, indexed like rvr_df
+    """
+    features = pd.DataFrame(index=rvr_df.index)
+    dt = rvr_df['Datetime'].dt
+    features['hour'] = dt.hour
+    features['day_of_week'] = dt.dayofweek
+    features['month'] = dt.month
+    features['day_of_year'] = dt.dayofyear
+
+    target = rvr_df[target_column]
+    for lag in LAG_PERIODS:
+        features[f'{target_column}_lag_{lag}'] = target.shift(lag)
+    for window in ROLLING_WINDOWS:
+        features[f'{target_column}_rolling_mean_{window}'] = target.rolling(window).mean()
+        features[f'{target_column}_rolling_std_{window}'] = target.rolling(window).std()
+
+    for name in feature_columns:
+        if name not in features.columns:
+            features[name] = rvr_df[name] if name in rvr_df.columns else np.nan
+
+    return features[list(feature_columns)]
+
+
+def build_history_feature_matrix(valid_values: pd.DataFrame, timestamps: pd.Series, target_column: str,
+                                 feature_columns: Sequence[str], history_size: int = 12,
+                                 window_size: int = LAG_PERIODS[-1] + 1
+                                 ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the live predictor's input row for every row of a log in one pass
+
+    Equivalent to replaying the rows through LiveRVRPredictor.update_sensor_data
+    and calling build_feature_vector after each one: a zone's history only
+    grows on rows where its reading is valid, lags and rolling windows run
+    over that history (capped at history_size readings), calendar features
+    come from the newest reading's timestamp, and cross-runway features use
+    the latest valid reading of the other columns.
+
+    Args:
+        valid_values: RVR columns with invalid readings set to NaN
+        timestamps: Datetime per row, aligned with valid_values
+        target_column: RVR column being predicted (e.g., 'RWY 09 (BEG)')
+        feature_columns: Feature names saved with the model
+        history_size: Readings kept per zone by the live predictor
+        window_size: Readings per cascade window (max_lag + 1)
+
+    Returns:
+        Tuple of (features (n, len(feature_columns)), windows (n, window_size),
+        history length per row); rows with a history shorter than
+        window_size have NaN windows
+    """
+    n = len(valid_values)
+    target = valid_values[target_column]
+    present = target.notna().to_numpy()
+    readings = target.to_numpy(dtype=float)[present]
+    reading_times = pd.DatetimeIndex(timestamps.to_numpy()[present])
+    count = np.cumsum(present)
+    history = np.minimum(count, history_size)
+    last = count - 1  # index into readings of the newest reading per row (-1 before the first)
+    has_reading = count > 0
+    safe_last = np.where(has_reading, last, 0)
+
+    features = np.full((n, len(feature_columns)), np.nan)
+    calendar = {}
+    if len(readings):
+        calendar = {
+            'hour': reading_times.hour,
+            'day_of_week': reading_times.dayofweek,
+            'month': reading_times.month,
+            'day_of_year': reading_times.dayofyear,
+        }
+
+    for i, name in enumerate(feature_columns):
+        if name in CALENDAR_FEATURES:
+            if len(readings):
+                features[has_reading, i] = np.asarray(calendar[name], dtype=float)[safe_last[has_reading]]
+            continue
+
+        match = _LAG_RE.match(name)
+        if match:
+            lag = int(match.group('lag'))
+            rows = history > lag
+            features[rows, i] = readings[last[rows] - lag]
+            continue
+
+        match = _ROLLING_RE.match(name)
+        if match:
+            window = int(match.group('window'))
+            rows = history >= window
+            if rows.any():
+                stacked = np.lib.stride_tricks.sliding_window_view(readings, window)
+                if match.group('stat') == 'mean':
+                    stat = stacked.mean(axis=1)
+                else:
+                    stat = stacked.std(axis=1, ddof=1)
+                features[rows, i] = stat[last[rows] - window + 1]
+            continue
+
+        if name in valid_values.columns:
+            features[:, i] = valid_values[name].ffill().to_numpy(dtype=float)
+
+    windows = np.full((n, window_size), np.nan)
+    rows = history >= window_size
+    if rows.any():
+        windows[rows] = np.lib.stride_tricks.sliding_window_view(readings, window_size)[last[rows] - window_size + 1]
+
+    return features, windows, history
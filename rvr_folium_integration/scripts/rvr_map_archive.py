@@ -0,0 +1,235 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from rvr_features import range_end
+from rvr_map_payload import RVR_THRESHOLDS, ZONE_TO_COLUMN, classify_rvr, zone_value_columns
+from rvr_map_pyramid import aggregate_level
+
+
+ARCHIVE_MODES = ('slider', 'compact', 'surface')
+DAY_SECONDS = 86400
+DAY_FILE = "rvr_map_{day}.html"
+
+
+def prediction_matrix(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    The map's prediction columns of a frame as one float matrix
+
+    Args:
+        df: DataFrame with a parsed Datetime column, oldest first
+
+    Returns:
+        (epoch seconds per row, rows x columns float64 values with NaN kept,
+        column names) for the ZONE_TO_COLUMN columns present in df
+    """
+    columns = [column for column in dict.fromkeys(ZONE_TO_COLUMN.values()) if column in df.columns]
+    seconds = ((df['Datetime'] - pd.Timestamp('1970-01-01')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    values = df[columns].to_numpy(dtype=np.float64) if columns else np.empty((len(df), 0))
+    return seconds, values, columns
+
+
+def day_bounds(seconds: np.ndarray) -> List[Tuple[str, int, int]]:
+    """
+    Row range of every calendar day (wall clock, as stored)
+
+    Args:
+        seconds: Row times (epoch seconds, sorted)
+
+    Returns:
+        List of (YYYY-mm-dd, first row, end row)
+    """
+    days = seconds // DAY_SECONDS
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else np.empty(0, dtype=int)
+    ends = np.r_[starts[1:], len(days)]
+    return [(str(np.datetime64(int(days[first]), 'D')), int(first), int(end))
+            for first, end in zip(starts.tolist(), ends.tolist())]
+
+
+# Per-process view of the shared matrix, set up once by the pool initializer
+_worker = None
+
+
+def _init_worker(matrix_dir: str, columns: List[str], positions: Dict, mode: str):
+    """Memory-map the shared prediction matrix read-only in a worker process"""
+    global _worker
+    _worker = {
+        'seconds': np.load(os.path.join(matrix_dir, 'seconds.npy'), mmap_mode='r'),
+        'values': np.load(os.path.join(matrix_dir, 'values.npy'), mmap_mode='r'),
+        'columns': columns,
+        'positions': positions,
+        'mode': mode,
+    }
+
+
+def _render_day(day: str, first: int, end: int, output_path: str) -> Dict:
+    """Render one day's map from the shared matrix and write it atomically"""
+    from generate_rvr_map import build_map
+
+    started = time.perf_counter()
+    df = pd.DataFrame(np.asarray(_worker['values'][first:end]), columns=_worker['columns'])
+    df.insert(0, 'Datetime', pd.to_datetime(np.asarray(_worker['seconds'][first:end]), unit='s'))
+    # The per-map progress log would interleave across workers
+    with contextlib.redirect_stdout(io.StringIO()):
+        m = build_map(df, df.iloc[-1], 'Datetime', _worker['positions'], mode=_worker['mode'], hours_ahead=None)
+    tmp_path = f"{output_path}.tmp"
+    m.save(tmp_path)
+    os.replace(tmp_path, output_path)
+    return {'day': day, 'rows': end - first, 'seconds': round(time.perf_counter() - started, 3)}
+
+
+def day_summaries(seconds: np.ndarray, values: np.ndarray, columns: List[str], positions: Dict) -> Dict[str, Dict]:
+    """
+    Worst RVR and steps below each threshold per day, over the map zones
+
+    Missing zones and values count as DEFAULT_RVR, as on the maps.
+
+    Returns:
+        Dict of YYYY-mm-dd -> {'steps', 'min', 'below': {threshold: steps}}
+    """
+    frame = pd.DataFrame(values, columns=columns)
+    zone_values = np.array(zone_value_columns(frame, list(positions.keys())), dtype=float)
+    # A step counts as below a threshold when any zone is
+    worst = zone_values.min(axis=0, keepdims=True)
+    level = aggregate_level(seconds, worst, DAY_SECONDS)
+    return {
+        str(np.datetime64(int(bucket), 'D')): {
+            'steps': int(level['count'][i]),
+            'min': float(level['min'][0, i]),
+            'below': {int(threshold): int(level['below'][t, 0, i]) for t, threshold in enumerate(RVR_THRESHOLDS)},
+        }
+        for i, bucket in enumerate(level['buckets'].tolist())
+    }
+
+
+def write_index(output_dir: Path, summaries: Dict[str, Dict], mode: str) -> Path:
+    """
+    Archive index page: one row per day with a link to its map
+
+    Returns:
+        Path of index.html
+    """
+    header = ''.join(f"<th>Steps &lt; {threshold} m</th>" for threshold in RVR_THRESHOLDS)
+    rows = []
+    for day, summary in sorted(summaries.items()):
+        color = str(classify_rvr(summary['min'])[0])
+        below = ''.join(f"<td>{summary['below'][int(threshold)]}</td>" for threshold in RVR_THRESHOLDS)
+        rows.append(
+            f"<tr><td><a href=\"{DAY_FILE.format(day=day)}\">{day}</a></td><td>{summary['steps']}</td>"
+            f"<td style=\"color: {color}; font-weight: bold;\">{summary['min']:.0f} m</td>{below}</tr>"
+        )
+    days = sorted(summaries)
+    title = f"RVR map archive: {days[0]} to {days[-1]}" if days else "RVR map archive"
+    html = f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+    body {{ font-family: sans-serif; margin: 20px; }}
+    table {{ border-collapse: collapse; }}
+    th, td {{ border: 1px solid #ccc; padding: 4px 10px; text-align: right; }}
+    th:first-child, td:first-child {{ text-align: left; }}
+</style>
+</head>
+<body>
+<h2>{title}</h2>
+<p>{len(days)} daily {mode} maps. Worst RVR is the lowest value over all zones that day, colored as on the maps.</p>
+<table>
+<tr><th>Day</th><th>Steps</th><th>Worst RVR</th>{header}</tr>
+{chr(10).join(rows)}
+</table>
+<p>Generated {datetime.now():%Y-%m-%d %H:%M:%S}</p>
+</body>
+</html>
+"""
+    index_path = output_dir / "index.html"
+    index_path.write_text(html, encoding='utf-8')
+    return index_path
+
+
+def render_archive(start=None, end=None, output_dir="rvr_map_archive", mode: str = 'slider',
+                   source_file: Optional[str] = None, workers: Optional[int] = None,
+                   verbose: bool = False) -> Path:
+    """
+    Render one static map per day of start..end on a process pool
+
+    The range is read once (from the files the prediction manifests list
+    for it, or from source_file) and saved as .npy files that every worker
+    memory-maps read-only, so workers neither re-read CSVs nor receive a
+    pickled copy of the data; each task only carries a day's row range.
+    Runway positions are computed once and passed once per worker.
+
+    Args:
+        start: Range start (None = first prediction)
+        end: Range end, inclusive; a date alone covers that whole day (None = last prediction)
+        output_dir: Directory for the day maps and index.html
+        mode: 'slider' (TimestampedGeoJson), 'compact' (JS-recolored markers) or
+              'surface' (compact plus an interpolated RVR surface)
+        source_file: Prediction CSV to use instead of the manifests
+        workers: Worker processes (default: CPU count)
+        verbose: Print the file search and diagnostics
+
+    Returns:
+        Path of the index page
+    """
+    from generate_rvr_map import load_prediction_range, load_predictions, runway_positions
+
+    if mode not in ARCHIVE_MODES:
+        raise ValueError(f"Unknown archive mode {mode!r}; expected one of {ARCHIVE_MODES}")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    end = range_end(end)
+
+    if source_file:
+        df, _, datetime_col = load_predictions(source_file, verbose=verbose)
+        if datetime_col is None:
+            raise ValueError(f"No parseable datetime column in {source_file}")
+        df = df.rename(columns={datetime_col: 'Datetime'})
+        df = df[df['Datetime'].notna()]
+        if start is not None:
+            df = df[df['Datetime'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['Datetime'] <= end]
+        df = df.drop_duplicates('Datetime', keep='last').sort_values('Datetime')
+    else:
+        df, _, _ = load_prediction_range(start, end, verbose=verbose)
+    if df is None or df.empty:
+        raise ValueError(f"No predictions between {start or 'the start'} and {end or 'the end'}")
+
+    positions = runway_positions()
+    seconds, values, columns = prediction_matrix(df)
+    del df
+    days = day_bounds(seconds)
+    workers = min(workers or os.cpu_count() or 1, len(days))
+    print(f"   {len(seconds)} rows over {len(days)} days, {workers} worker(s)")
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix='.matrix_') as matrix_dir:
+        np.save(os.path.join(matrix_dir, 'seconds.npy'), seconds)
+        np.save(os.path.join(matrix_dir, 'values.npy'), values)
+        initargs = (matrix_dir, columns, positions, mode)
+        tasks = [(day, first, end, str(output_dir / DAY_FILE.format(day=day))) for day, first, end in days]
+        if workers == 1:
+            _init_worker(*initargs)
+            results = (_render_day(*task) for task in tasks)
+            for result in results:
+                print(f"   ✅ {result['day']}: {result['rows']} steps in {result['seconds']:.2f}s")
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                futures = [pool.submit(_render_day, *task) for task in tasks]
+                for future in as_completed(futures):
+                    result = future.result()
+                    print(f"   ✅ {result['day']}: {result['rows']} steps in {result['seconds']:.2f}s")
+    print(f"   Rendered {len(days)} day maps in {time.perf_counter() - started:.2f}s")
+
+    return write_index(output_dir, day_summaries(seconds, values, columns, positions), mode)
@@ -0,0 +1,147 @@
+"""
+Leaflet layers for the compact and live RVR maps
+
+Kept apart from rvr_map_payload so that building or appending payloads
+(generate_rvr_map.py --incremental, RealTimeRVRSystem) never imports
+folium or branca; only rendering a map shell does.
+"""
+
+from typing import Dict, List, Optional
+
+from branca.element import MacroElement
+from jinja2 import Template
+
+from rvr_map_payload import (COMPACT_LAYER_TEMPLATE, DEFAULT_RVR, LIVE_LAYER_TEMPLATE, RVR_COLORS,
+                             RVR_STATUSES, RVR_THRESHOLDS, ZONE_TO_COLUMN, classify_rvr, payload_to_json)
+
+
+class CompactRVRLayer(MacroElement):
+    """
+    Fixed zone markers recolored from a compact payload by a time slider
+
+    The markers are ordinary folium CircleMarkers; this element adds a
+    slider control whose handler restyles them from the payload, which is
+    either embedded in the page or fetched from a sidecar URL (a sidecar
+    needs the page to be served over HTTP rather than opened as a file).
+    """
+
+    _template = Template(COMPACT_LAYER_TEMPLATE)
+
+    def __init__(self, marker_names: List[str], payload_json: Optional[str] = None,
+                 sidecar_url: Optional[str] = None, frame_ms: int = 500,
+                 refresh_seconds: Optional[float] = None):
+        super().__init__()
+        self._name = 'CompactRVRLayer'
+        self.marker_names = marker_names
+        self.payload_json = payload_json
+        self.sidecar_url = sidecar_url
+        self.frame_ms = frame_ms
+        self.refresh_seconds = refresh_seconds
+        self.colors = RVR_COLORS.tolist()
+        self.statuses = RVR_STATUSES.tolist()
+
+
+def add_zone_markers(m, zone_names: List[str], coords: List, values: Optional[List] = None) -> List[str]:
+    """
+    Add one fixed CircleMarker per zone, for a script layer to restyle
+
+    Args:
+        m: folium.Map
+        zone_names: Zone names
+        coords: [lat, lon] per zone
+        values: Initial RVR value per zone (default: DEFAULT_RVR)
+
+    Returns:
+        JS variable names of the markers, in zone order
+    """
+    import folium
+
+    if values is None:
+        values = [DEFAULT_RVR] * len(zone_names)
+    colors, _ = classify_rvr(values)
+    marker_names = []
+    for zone_name, (lat, lon), value, color in zip(zone_names, coords, values, colors.tolist()):
+        marker = folium.CircleMarker(
+            location=[lat, lon],
+            radius=15,
+            popup=folium.Popup(zone_name, max_width=300),
+            color='black',
+            weight=3,
+            fillColor=color,
+            fillOpacity=0.8,
+            tooltip=f"{zone_name}: {value:.0f}m"
+        )
+        marker.add_to(m)
+        marker_names.append(marker.get_name())
+    return marker_names
+
+
+def add_compact_layer(m, payload: Dict, sidecar_url: Optional[str] = None,
+                      refresh_seconds: Optional[float] = None):
+    """
+    Add fixed zone markers and the compact time slider to a folium map
+
+    Markers start at the newest time step. With sidecar_url the payload is
+    fetched at page load instead of being embedded in the HTML.
+
+    Args:
+        m: folium.Map
+        payload: Payload from build_compact_payload (its geometry is always used)
+        sidecar_url: URL of the payload sidecar (.json, .json.gz or .ndjson), relative to the page
+        refresh_seconds: Re-fetch the sidecar this often to pick up appended steps
+
+    Returns:
+        The CompactRVRLayer element
+    """
+    latest = None
+    if payload['offsets']:
+        latest = [zone_values[-1] for zone_values in payload['values']]
+    marker_names = add_zone_markers(m, payload['zones'], payload['coords'], latest)
+
+    layer = CompactRVRLayer(marker_names,
+                            payload_json=None if sidecar_url else payload_to_json(payload),
+                            sidecar_url=sidecar_url, refresh_seconds=refresh_seconds)
+    layer.add_to(m)
+    return layer
+
+
+class LiveRVRLayer(MacroElement):
+    """
+    Fixed zone markers restyled from server-sent events
+
+    Markers map to prediction zones through ZONE_TO_COLUMN; each event
+    only lists the prediction zones whose values changed.
+    """
+
+    _template = Template(LIVE_LAYER_TEMPLATE)
+
+    def __init__(self, marker_names: List[str], zone_names: List[str], events_url: str = '/events'):
+        super().__init__()
+        self._name = 'LiveRVRLayer'
+        self.marker_names = marker_names
+        self.zones = zone_names
+        self.sources = [ZONE_TO_COLUMN.get(zone, '')[:-len('_predicted')] for zone in zone_names]
+        self.events_url = events_url
+        self.thresholds = RVR_THRESHOLDS.tolist()
+        self.colors = RVR_COLORS.tolist()
+        self.statuses = RVR_STATUSES.tolist()
+        self.default_value = DEFAULT_RVR
+
+
+def add_live_layer(m, runway_positions: Dict, events_url: str = '/events'):
+    """
+    Add fixed zone markers fed by live_map_server.py's event stream
+
+    Args:
+        m: folium.Map
+        runway_positions: Dictionary of zone name -> (lat, lon)
+        events_url: URL of the server-sent event stream
+
+    Returns:
+        The LiveRVRLayer element
+    """
+    zone_names = list(runway_positions.keys())
+    marker_names = add_zone_markers(m, zone_names, [list(p) for p in runway_positions.values()])
+    layer = LiveRVRLayer(marker_names, zone_names, events_url=events_url)
+    layer.add_to(m)
+    return layer
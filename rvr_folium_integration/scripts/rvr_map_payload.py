@@ -0,0 +1,543 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Zone to column mapping
+ZONE_TO_COLUMN = {
+    'RWY_09_TDZ': 'RWY_09_TDZ_predicted',
+    'RWY_09_MID': 'RWY_09_BEG_predicted',  # Using BEG as MID
+    'RWY_10_TDZ': 'RWY_10_TDZ_predicted',
+    'RWY_10_MID': 'RWY_10_TDZ_predicted',  # Using TDZ as MID since no MID column
+    'RWY_11_TDZ': 'RWY_11_TDZ_predicted',
+    'RWY_11_MID': 'RWY_11_BEG_predicted',  # Using BEG as MID
+    'RWY_27_TDZ': 'RWY_27_MID_predicted',  # Using MID as TDZ
+    'RWY_27_MID': 'RWY_27_MID_predicted',
+    'RWY_28_TDZ': 'RWY_28_TDZ_predicted',
+    'RWY_28_MID': 'RWY_28_MID_predicted',
+    'RWY_29_TDZ': 'RWY_29_BEG_predicted',  # Using BEG as TDZ
+    'RWY_29_MID': 'RWY_29_MID_predicted',
+}
+DEFAULT_RVR = 1000  # Shown when a zone has no prediction
+
+# RVR color coding: bin edges (m) and the color/status of each bin
+RVR_THRESHOLDS = np.array([200, 500, 800])
+RVR_COLORS = np.array(['darkred', 'red', 'orange', 'green'])
+RVR_STATUSES = np.array(['Very Poor', 'Poor', 'Moderate', 'Good'])
+
+PAYLOAD_VERSION = 1
+EPOCH = pd.Timestamp('1970-01-01')
+
+
+def rvr_classes(values) -> np.ndarray:
+    """Index of each value's color bin (0 = darkred ... 3 = green)"""
+    return np.searchsorted(RVR_THRESHOLDS, np.asarray(values, dtype=float), side='right')
+
+
+def classify_rvr(values):
+    """
+    Bin RVR values into map colors and status labels
+
+    Args:
+        values: Array-like of RVR values (m), any shape
+
+    Returns:
+        (colors, statuses) string arrays of the same shape
+    """
+    bins = rvr_classes(values)
+    return RVR_COLORS[bins], RVR_STATUSES[bins]
+
+
+def zone_value_columns(df: pd.DataFrame, zone_names: List[str]) -> List[List]:
+    """
+    Predicted value of every zone at every row, one list per zone
+
+    Each zone's column is looked up once; missing columns and NaN values
+    become DEFAULT_RVR. Values keep their column's Python type, as
+    row-wise access would.
+
+    Args:
+        df: DataFrame with prediction data
+        zone_names: Zone names in output order
+
+    Returns:
+        List of per-zone value lists (len(df) values each)
+    """
+    columns = []
+    for zone_name in zone_names:
+        column_name = ZONE_TO_COLUMN.get(zone_name)
+        if column_name is None or column_name not in df.columns:
+            columns.append([DEFAULT_RVR] * len(df))
+            continue
+        series = df[column_name]
+        missing = series.isna().tolist()
+        columns.append([DEFAULT_RVR if is_missing else value
+                        for value, is_missing in zip(series.tolist(), missing)])
+    return columns
+
+
+def round_rvr_values(values: List) -> List:
+    """
+    round(value, 1) for a list of values, vectorized
+
+    np.round agrees with Python's correctly rounded round() except when
+    value * 10 lies within floating-point error of a half, so only those
+    values (and ints, which round() returns unchanged) go through round().
+
+    Args:
+        values: List of int/float RVR values
+
+    Returns:
+        List of rounded values, equal to [round(v, 1) for v in values]
+    """
+    numeric = np.array(values, dtype=float)
+    rounded = np.round(numeric, 1).tolist()
+    scaled = numeric * 10
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.flatnonzero(near_half).tolist():
+        rounded[index] = round(values[index], 1)
+    return [value if type(value) is int else rounded_value
+            for value, rounded_value in zip(values, rounded)]
+
+
+def select_time_window(df: pd.DataFrame, hours_ahead: Optional[float] = 12) -> pd.DataFrame:
+    """
+    Rows shown on the slider: hours_ahead hours from the earliest timestamp
+
+    Args:
+        df: DataFrame with a parsed Datetime column
+        hours_ahead: Window length in hours (None for all rows)
+
+    Returns:
+        Filtered copy of df
+    """
+    if hours_ahead is None:
+        print(f"   Using all {len(df)} time steps")
+        return df.copy()
+    # Use the earliest timestamp in the data as the reference point
+    reference_time = df['Datetime'].min()
+    print(f"   Reference time from data: {reference_time}")
+    # Get data for the next 12 hours from reference time
+    end_time = reference_time + timedelta(hours=hours_ahead)
+    mask = (df['Datetime'] >= reference_time) & (df['Datetime'] <= end_time)
+    filtered_df = df[mask].copy()
+    if filtered_df.empty:
+        print(f"   ⚠️ No data found for the next {hours_ahead} hours")
+        print(f"   Using first {hours_ahead}*6 rows of available data")
+        filtered_df = df.head(int(hours_ahead * 6)).copy()  # 6 records per hour (10-minute intervals)
+    return filtered_df
+
+
+def epoch_seconds(timestamps) -> np.ndarray:
+    """Naive timestamps as whole seconds since the epoch (wall clock kept as-is)"""
+    return ((pd.DatetimeIndex(timestamps) - EPOCH) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+
+def build_compact_payload(df: pd.DataFrame, runway_positions: Dict) -> Dict:
+    """
+    Compact zone x time payload for the map
+
+    Zone coordinates are stored once, the time axis as second offsets from
+    the first timestamp, and each zone's values (rounded to 0.1 m, as in
+    the GeoJSON features) with a string of color-bin digits so the page
+    colors exactly as the Python classifier does.
+
+    Args:
+        df: DataFrame with a parsed Datetime column (rows in display order)
+        runway_positions: Dictionary of zone name -> (lat, lon)
+
+    Returns:
+        JSON-serializable payload dict
+    """
+    zone_names = list(runway_positions.keys())
+    seconds = epoch_seconds(df['Datetime'])
+    t0 = int(seconds[0]) if len(seconds) else 0
+
+    values = zone_value_columns(df, zone_names)
+    classes = rvr_classes(values) if values else np.empty((0, 0), dtype=int)
+    return {
+        'version': PAYLOAD_VERSION,
+        'zones': zone_names,
+        'coords': [[lat, lon] for lat, lon in runway_positions.values()],
+        't0': t0,
+        'offsets': (seconds - t0).tolist(),
+        'values': [round_rvr_values(zone_values) for zone_values in values],
+        'classes': [''.join(map(str, row)) for row in classes.tolist()],
+    }
+
+
+def payload_to_json(payload: Dict) -> str:
+    return json.dumps(payload, separators=(',', ':'))
+
+
+def write_payload_sidecar(payload: Dict, path) -> Path:
+    """
+    Write the payload next to the map (gzip-compressed when path ends in .gz)
+
+    Returns:
+        Path of the sidecar file
+    """
+    path = Path(path)
+    data = payload_to_json(payload).encode()
+    if path.suffix == '.gz':
+        data = gzip.compress(data, mtime=0)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    return path
+
+
+# Slider + recoloring script; its text is part of the map shell fingerprint
+COMPACT_LAYER_TEMPLATE = """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var markers = [{% for name in this.marker_names %}{{ name }}{% if not loop.last %}, {% endif %}{% endfor %}];
+            var colors = {{ this.colors|tojson }};
+            var statuses = {{ this.statuses|tojson }};
+            var payload = null;
+            var timer = null;
+            var overlay = null;  // interpolated surface image, for payloads that carry one
+
+            function timeLabel(step) {
+                var d = new Date((payload.t0 + payload.offsets[step]) * 1000);
+                return d.toISOString().replace('T', ' ').slice(0, 19);
+            }
+
+            function show(step) {
+                var time = timeLabel(step);
+                for (var z = 0; z < markers.length; z++) {
+                    var value = payload.values[z][step];
+                    var cls = +payload.classes[z][step];
+                    var text = payload.zones[z] + ': ' + Math.round(value) + 'm';
+                    if (payload.filled && payload.filled[z][step] === '1') { text += ' (interpolated)'; }
+                    markers[z].setStyle({fillColor: colors[cls]});
+                    markers[z].setTooltipContent(text);
+                    markers[z].setPopupContent(
+                        '<div style="min-width: 200px;"><h4 style="margin: 5px 0; color: ' + colors[cls] + ';">' +
+                        payload.zones[z] + '</h4><p><strong>Predicted RVR:</strong> ' + Math.round(value) +
+                        'm</p><p><strong>Status:</strong> ' + statuses[cls] +
+                        '</p><p><strong>Time:</strong> ' + time + '</p></div>');
+                }
+                if (overlay) { overlay.setUrl(payload.surface.frames[step]); }
+                label.textContent = time;
+            }
+
+            // Append-only sidecar: a header line, then [offset, value per zone..., class digits] per step
+            function parseLines(text) {
+                var lines = text.split('\\n');
+                var header = JSON.parse(lines[0]);
+                var data = {zones: header.zones, coords: header.coords, t0: header.t0,
+                            offsets: [], values: [], classes: []};
+                var classes = [];
+                for (var z = 0; z < header.zones.length; z++) { data.values.push([]); classes.push([]); }
+                for (var i = 1; i < lines.length; i++) {
+                    if (!lines[i]) { continue; }
+                    var row;
+                    try { row = JSON.parse(lines[i]); } catch (e) { continue; }  // line still being written
+                    data.offsets.push(row[0]);
+                    var digits = row[row.length - 1];
+                    for (var z = 0; z < header.zones.length; z++) {
+                        data.values[z].push(row[z + 1]);
+                        classes[z].push(digits[z]);
+                    }
+                }
+                data.classes = classes.map(function(c) { return c.join(''); });
+                return data;
+            }
+
+            var control = L.control({position: 'bottomleft'});
+            var slider, label, button;
+            control.onAdd = function() {
+                var div = L.DomUtil.create('div', 'leaflet-bar rvr-slider');
+                div.style.cssText = 'background: white; padding: 6px 10px; font: 12px sans-serif;';
+                button = L.DomUtil.create('button', '', div);
+                button.textContent = '▶';
+                slider = L.DomUtil.create('input', '', div);
+                slider.type = 'range';
+                slider.min = 0;
+                slider.max = 0;
+                slider.style.cssText = 'width: 420px; vertical-align: middle; margin: 0 8px;';
+                label = L.DomUtil.create('span', '', div);
+                label.textContent = 'Loading...';
+                L.DomEvent.disableClickPropagation(div);
+                L.DomEvent.disableScrollPropagation(div);
+                return div;
+            };
+            control.addTo(map);
+
+            slider.addEventListener('input', function() { if (payload) { show(+slider.value); } });
+            button.addEventListener('click', function() {
+                if (timer) { clearInterval(timer); timer = null; button.textContent = '▶'; return; }
+                if (!payload || !payload.offsets.length) { return; }
+                button.textContent = '❚❚';
+                timer = setInterval(function() {
+                    slider.value = (+slider.value + 1) % payload.offsets.length;
+                    show(+slider.value);
+                }, {{ this.frame_ms }});
+            });
+
+            // New data keeps the slider where it is, unless it was following the newest step
+            function setData(data) {
+                var following = payload === null || +slider.value >= payload.offsets.length - 1;
+                payload = data;
+                var last = payload.offsets.length - 1;
+                if (last < 0) { label.textContent = 'No data'; return; }
+                slider.max = last;
+                if (following) { slider.value = last; }
+                if (payload.surface && !overlay) {
+                    // Between the tiles and the zone markers
+                    map.createPane('rvrSurface').style.zIndex = 350;
+                    overlay = L.imageOverlay(payload.surface.frames[0], payload.surface.bounds,
+                                             {pane: 'rvrSurface', interactive: false}).addTo(map);
+                }
+                show(+slider.value);
+            }
+
+            {% if this.sidecar_url %}
+            var url = {{ this.sidecar_url|tojson }};
+            function load() {
+                return fetch(url, {cache: 'no-store'}).then(function(response) {
+                    if (url.slice(-3) === '.gz') {
+                        return new Response(response.body.pipeThrough(new DecompressionStream('gzip'))).json();
+                    }
+                    if (url.slice(-7) === '.ndjson') {
+                        return response.text().then(parseLines);
+                    }
+                    return response.json();
+                }).then(setData);
+            }
+            load();
+            {% if this.refresh_seconds %}
+            setInterval(load, {{ this.refresh_seconds * 1000 }});
+            {% endif %}
+            {% else %}
+            setData({{ this.payload_json }});
+            {% endif %}
+        })();
+        {% endmacro %}
+"""
+
+
+def shell_fingerprint(*parts) -> str:
+    """
+    Fingerprint of everything baked into the static map HTML
+
+    Args:
+        parts: JSON-serializable geometry/style inputs (zones, coordinates,
+               runway markers, sidecar URL, ...); the layer template is
+               always included
+
+    Returns:
+        Hex digest; the shell needs regenerating when it changes
+    """
+    digest = hashlib.sha256(COMPACT_LAYER_TEMPLATE.encode())
+    digest.update(json.dumps([parts, RVR_THRESHOLDS.tolist(), RVR_COLORS.tolist(), RVR_STATUSES.tolist()],
+                             sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class IncrementalMapPayload:
+    """
+    Append-only map payload sidecar with a high-water mark
+
+    The sidecar is newline-delimited JSON: a header line with the zones,
+    their coordinates and t0, then one line per time step holding the
+    second offset from t0, each zone's value (rounded to 0.1 m) and a
+    string of color-bin digits. The high-water mark is the timestamp of
+    the last line, read from the end of the file, so appending new rows
+    costs the same however long the sidecar already is. Rows at or before
+    the high-water mark are ignored.
+    """
+
+    def __init__(self, path, runway_positions: Optional[Dict] = None):
+        """
+        Initialize the payload
+
+        Args:
+            path: Sidecar file (e.g. rvr_map_data.ndjson)
+            runway_positions: Zone name -> (lat, lon) for a new sidecar
+                              (default: geometry from the existing header)
+        """
+        self.path = Path(path)
+        self.zones: Optional[List[str]] = None
+        self.coords: Optional[List[List[float]]] = None
+        self.t0: Optional[int] = None
+        self.high_water_mark: Optional[pd.Timestamp] = None
+        if runway_positions is not None:
+            self.zones = list(runway_positions.keys())
+            self.coords = [[lat, lon] for lat, lon in runway_positions.values()]
+
+    def load(self) -> bool:
+        """
+        Read the header and high-water mark of an existing sidecar
+
+        Returns:
+            False if the sidecar does not exist or has no valid header
+        """
+        if not self.path.exists():
+            return False
+        with open(self.path, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                return False
+            header_end = f.tell()
+            size = os.fstat(f.fileno()).st_size
+            f.seek(max(header_end, size - 4096))
+            tail = f.read().decode('utf-8', errors='ignore')
+        self.zones, self.coords, self.t0 = header['zones'], header['coords'], header['t0']
+        self.high_water_mark = None
+        for line in reversed(tail.splitlines()):
+            try:
+                offset = json.loads(line)[0]
+            except (ValueError, IndexError, TypeError, KeyError):
+                continue  # partial first/last line
+            self.high_water_mark = EPOCH + pd.Timedelta(seconds=self.t0 + offset)
+            break
+        return True
+
+    def matches_geometry(self, runway_positions: Dict) -> bool:
+        return (self.zones == list(runway_positions.keys()) and
+                self.coords == [[lat, lon] for lat, lon in runway_positions.values()])
+
+    def reset(self, t0: int = 0):
+        """Start an empty sidecar (header only) with this instance's geometry"""
+        header = {'version': PAYLOAD_VERSION, 'zones': self.zones, 'coords': self.coords, 't0': int(t0)}
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps(header, separators=(',', ':')) + '\n')
+        tmp_path.replace(self.path)
+        self.t0 = int(t0)
+        self.high_water_mark = None
+
+    def append_frame(self, df: pd.DataFrame) -> int:
+        """
+        Append rows newer than the high-water mark
+
+        Args:
+            df: DataFrame with a parsed Datetime column and predicted columns
+
+        Returns:
+            Number of time steps appended
+        """
+        if df.empty:
+            return 0
+        times = pd.DatetimeIndex(df['Datetime'])
+        keep = times.notna()
+        if self.high_water_mark is not None:
+            keep &= times > self.high_water_mark
+        # Only strictly increasing timestamps, so the mark can be read from the last line
+        running_max = pd.Series(times.where(keep)).cummax().shift()
+        keep &= ~(times <= running_max).to_numpy()
+        new_rows = df[keep]
+        if new_rows.empty:
+            return 0
+        if self.t0 is None or not self.path.exists():
+            self.reset(int(epoch_seconds(new_rows['Datetime'][:1])[0]))
+
+        offsets = (epoch_seconds(new_rows['Datetime']) - self.t0).tolist()
+        values = zone_value_columns(new_rows, self.zones)
+        rounded = [round_rvr_values(zone_values) for zone_values in values]
+        classes = [''.join(map(str, column)) for column in rvr_classes(values).T.tolist()]
+        lines = [json.dumps([offset, *step_values, digits], separators=(',', ':')) + '\n'
+                 for offset, step_values, digits in zip(offsets, zip(*rounded), classes)]
+        with open(self.path, 'a') as f:
+            f.writelines(lines)
+        self.high_water_mark = pd.Timestamp(new_rows['Datetime'].iloc[-1])
+        return len(lines)
+
+    def append_record(self, record: Dict) -> int:
+        """Append one prediction record (Datetime plus {zone}_predicted columns)"""
+        row = pd.DataFrame([record])
+        row['Datetime'] = pd.to_datetime(row['Datetime'])
+        return self.append_frame(row)
+
+    def payload(self) -> Dict:
+        """Header-only payload (geometry, no time steps) for building the map shell"""
+        return {'version': PAYLOAD_VERSION, 'zones': self.zones, 'coords': self.coords,
+                't0': self.t0 or 0, 'offsets': [], 'values': [[] for _ in self.zones],
+                'classes': ['' for _ in self.zones]}
+
+
+# Live layer: zone values pushed by live_map_server.py over server-sent events
+LIVE_LAYER_TEMPLATE = """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var markers = [{% for name in this.marker_names %}{{ name }}{% if not loop.last %}, {% endif %}{% endfor %}];
+            var zones = {{ this.zones|tojson }};
+            var sources = {{ this.sources|tojson }};
+            var thresholds = {{ this.thresholds|tojson }};
+            var colors = {{ this.colors|tojson }};
+            var statuses = {{ this.statuses|tojson }};
+            var fallback = {{ this.default_value|tojson }};
+            var values = {}, currents = {}, time = null;
+
+            var control = L.control({position: 'bottomleft'});
+            var label;
+            control.onAdd = function() {
+                var div = L.DomUtil.create('div', 'leaflet-bar rvr-live');
+                div.style.cssText = 'background: white; padding: 6px 10px; font: 12px sans-serif;';
+                label = L.DomUtil.create('span', '', div);
+                label.textContent = 'Connecting...';
+                return div;
+            };
+            control.addTo(map);
+
+            function binOf(value) {
+                var cls = 0;
+                for (var i = 0; i < thresholds.length; i++) { if (value >= thresholds[i]) { cls = i + 1; } }
+                return cls;
+            }
+
+            function render(changed) {
+                for (var z = 0; z < markers.length; z++) {
+                    var source = sources[z];
+                    if (changed && !(source in changed)) { continue; }
+                    // No value (never sent, or sent as null): fallback color, labelled as no data
+                    var known = source in values;
+                    var value = known ? values[source] : fallback;
+                    var cls = binOf(value);
+                    var text = known ? Math.round(value) + 'm' : 'no data';
+                    var current = source in currents ? '<p><strong>Current RVR:</strong> ' +
+                        Math.round(currents[source]) + 'm</p>' : '';
+                    markers[z].setStyle({fillColor: colors[cls]});
+                    markers[z].setTooltipContent(zones[z] + ': ' + text);
+                    markers[z].setPopupContent(
+                        '<div style="min-width: 200px;"><h4 style="margin: 5px 0; color: ' + colors[cls] + ';">' +
+                        zones[z] + '</h4><p><strong>Predicted RVR:</strong> ' + text + '</p>' +
+                        current + '<p><strong>Status:</strong> ' + statuses[cls] +
+                        '</p><p><strong>Time:</strong> ' + time + '</p></div>');
+                }
+            }
+
+            function merge(target, changes) {
+                for (var key in changes) {
+                    if (changes[key] === null) { delete target[key]; } else { target[key] = changes[key]; }
+                }
+            }
+
+            // Each message carries only the zones whose values changed (null = value lost);
+            // 'full' resets the state
+            var events = new EventSource({{ this.events_url|tojson }});
+            events.onmessage = function(event) {
+                var message = JSON.parse(event.data);
+                if (message.full) { values = {}; currents = {}; }
+                merge(values, message.values);
+                merge(currents, message.currents || {});
+                var timeChanged = message.time !== time;
+                time = message.time;
+                render(message.full || timeChanged ? null : message.values);
+                label.textContent = 'Live: ' + time;
+            };
+            events.onerror = function() { label.textContent = 'Reconnecting... (last: ' + time + ')'; };
+        })();
+        {% endmacro %}
+"""
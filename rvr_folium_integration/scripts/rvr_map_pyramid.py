@@ -0,0 +1,342 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement
+from jinja2 import Template
+
+from rvr_map_layers import add_zone_markers
+from rvr_map_payload import (PAYLOAD_VERSION, RVR_COLORS, RVR_STATUSES, RVR_THRESHOLDS,
+                             epoch_seconds, zone_value_columns)
+
+
+# (name, bucket length in seconds, buckets per tile), finest first
+PYRAMID_LEVELS = (
+    ('10min', 600, 144),     # one tile per day
+    ('1h', 3600, 168),       # one tile per week
+    ('6h', 21600, 120),      # one tile per 30 days
+    ('1d', 86400, 366),      # one tile per ~year
+)
+INDEX_NAME = "index.json"
+
+
+def aggregate_level(seconds: np.ndarray, values: np.ndarray, bucket_seconds: int) -> Dict:
+    """
+    Aggregate a zones x steps value matrix into fixed time buckets
+
+    Args:
+        seconds: Step times (epoch seconds, sorted, unique)
+        values: zones x steps RVR values
+        bucket_seconds: Bucket length
+
+    Returns:
+        Dict with bucket ids (epoch // bucket_seconds), step counts, and per
+        zone min, mean and counts of steps below each RVR threshold
+        (thresholds x zones x buckets)
+    """
+    bucket = seconds // bucket_seconds
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    counts = np.diff(np.r_[starts, len(bucket)])
+    return {
+        'buckets': bucket[starts],
+        'count': counts,
+        'min': np.minimum.reduceat(values, starts, axis=1),
+        'mean': np.add.reduceat(values, starts, axis=1) / counts,
+        'below': np.stack([np.add.reduceat((values < threshold).astype(np.int32), starts, axis=1)
+                           for threshold in RVR_THRESHOLDS]),
+    }
+
+
+def build_pyramid(df: pd.DataFrame, runway_positions: Dict) -> Dict:
+    """
+    Precompute every pyramid level for the map zones
+
+    Missing zones and values count as DEFAULT_RVR, as on the other maps.
+
+    Args:
+        df: DataFrame with a parsed Datetime column and predicted columns
+        runway_positions: Dictionary of zone name -> (lat, lon)
+
+    Returns:
+        Dict with zones, coords, start/end (epoch seconds) and level aggregates
+    """
+    df = df.dropna(subset=['Datetime']).drop_duplicates('Datetime', keep='last').sort_values('Datetime')
+    zone_names = list(runway_positions.keys())
+    seconds = epoch_seconds(df['Datetime'])
+    values = np.array(zone_value_columns(df, zone_names), dtype=float).reshape(len(zone_names), len(df))
+    return {
+        'zones': zone_names,
+        'coords': [[lat, lon] for lat, lon in runway_positions.values()],
+        'start': int(seconds[0]) if len(seconds) else 0,
+        'end': int(seconds[-1]) if len(seconds) else 0,
+        'levels': {name: aggregate_level(seconds, values, bucket_seconds)
+                   for name, bucket_seconds, _ in PYRAMID_LEVELS} if len(seconds) else {},
+    }
+
+
+def _tile_json(level: Dict, rows: slice, tile: int, tile_buckets: int) -> str:
+    return json.dumps({
+        'tile': tile,
+        'buckets': (level['buckets'][rows] - tile * tile_buckets).tolist(),
+        'count': level['count'][rows].tolist(),
+        'min': np.round(level['min'][:, rows], 1).tolist(),
+        'mean': np.round(level['mean'][:, rows], 1).tolist(),
+        'below': level['below'][:, :, rows].transpose(1, 0, 2).tolist(),  # zones x thresholds x buckets
+    }, separators=(',', ':'))
+
+
+def write_pyramid(pyramid: Dict, directory) -> Path:
+    """
+    Write the pyramid as per-level tiles plus an index the map reads first
+
+    Layout: {directory}/index.json and {directory}/{level}/{tile}.json, where
+    a tile holds tile_buckets consecutive buckets. Tiles left over from an
+    earlier build of the same levels are removed.
+
+    Args:
+        pyramid: Output of build_pyramid
+        directory: Target directory
+
+    Returns:
+        Path of the index file
+    """
+    directory = Path(directory)
+    levels = []
+    for name, bucket_seconds, tile_buckets in PYRAMID_LEVELS:
+        level_dir = directory / name
+        level_dir.mkdir(parents=True, exist_ok=True)
+        for stale in level_dir.glob('*.json'):
+            if stale.stem.lstrip('-').isdigit():
+                stale.unlink()
+
+        tiles = []
+        level = pyramid['levels'].get(name)
+        if level is not None:
+            tile_ids = level['buckets'] // tile_buckets
+            bounds = np.flatnonzero(np.r_[True, tile_ids[1:] != tile_ids[:-1], True])
+            for begin, end in zip(bounds[:-1], bounds[1:]):
+                tile = int(tile_ids[begin])
+                (level_dir / f"{tile}.json").write_text(_tile_json(level, slice(begin, end), tile, tile_buckets))
+                tiles.append(tile)
+        levels.append({'name': name, 'seconds': bucket_seconds, 'tile_buckets': tile_buckets, 'tiles': tiles})
+
+    index = {
+        'version': PAYLOAD_VERSION,
+        'zones': pyramid['zones'],
+        'coords': pyramid['coords'],
+        'start': pyramid['start'],
+        'end': pyramid['end'],
+        'thresholds': RVR_THRESHOLDS.tolist(),
+        'levels': levels,
+    }
+    index_path = directory / INDEX_NAME
+    tmp_path = directory / f".{INDEX_NAME}.tmp"
+    tmp_path.write_text(json.dumps(index, separators=(',', ':')))
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+PYRAMID_LAYER_TEMPLATE = """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var markers = [{% for name in this.marker_names %}{{ name }}{% if not loop.last %}, {% endif %}{% endfor %}];
+            var colors = {{ this.colors|tojson }};
+            var statuses = {{ this.statuses|tojson }};
+            var base = {{ this.base_url|tojson }};
+            var maxBuckets = {{ this.max_buckets }};
+            var spans = [['All', null], ['Month', 30 * 86400], ['Week', 7 * 86400], ['Day', 86400]];
+            var index = null, view = null, tiles = {};
+            var state = {span: null, start: 0, cursor: 0};
+
+            function fmt(t) { return new Date(t * 1000).toISOString().replace('T', ' ').slice(0, 16); }
+
+            // Finest level that keeps the visible span under maxBuckets buckets
+            function pickLevel(span) {
+                for (var i = 0; i < index.levels.length; i++) {
+                    if (span / index.levels[i].seconds <= maxBuckets) { return index.levels[i]; }
+                }
+                return index.levels[index.levels.length - 1];
+            }
+
+            function loadTile(level, tile) {
+                var id = level.name + '/' + tile;
+                if (!tiles[id]) {
+                    tiles[id] = fetch(base + id + '.json').then(function(r) { return r.json(); });
+                }
+                return tiles[id];
+            }
+
+            function window_() {
+                var span = state.span || (index.end - index.start + 1);
+                var start = state.span ? state.start : index.start;
+                return {start: start, end: start + span, span: span};
+            }
+
+            function refresh() {
+                var w = window_();
+                var level = pickLevel(w.span);
+                var first = Math.floor(w.start / level.seconds), last = Math.floor((w.end - 1) / level.seconds);
+                var keys = [];
+                for (var k = Math.floor(first / level.tile_buckets); k <= Math.floor(last / level.tile_buckets); k++) {
+                    if (level.tiles.indexOf(k) >= 0) { keys.push(k); }
+                }
+                label.textContent = 'Loading ' + level.name + '...';
+                Promise.all(keys.map(function(k) { return loadTile(level, k); })).then(function(loaded) {
+                    var v = {level: level, times: [], count: [], min: [], mean: [], below: []};
+                    for (var z = 0; z < markers.length; z++) {
+                        v.min.push([]); v.mean.push([]); v.below.push(index.thresholds.map(function() { return []; }));
+                    }
+                    loaded.forEach(function(tile) {
+                        for (var i = 0; i < tile.buckets.length; i++) {
+                            var b = tile.tile * level.tile_buckets + tile.buckets[i];
+                            if (b < first || b > last) { continue; }
+                            v.times.push(b * level.seconds);
+                            v.count.push(tile.count[i]);
+                            for (var z = 0; z < markers.length; z++) {
+                                v.min[z].push(tile.min[z][i]);
+                                v.mean[z].push(tile.mean[z][i]);
+                                for (var t = 0; t < index.thresholds.length; t++) { v.below[z][t].push(tile.below[z][t][i]); }
+                            }
+                        }
+                    });
+                    view = v;
+                    if (!v.times.length) { label.textContent = 'No data in view'; return; }
+                    slider.max = v.times.length - 1;
+                    var nearest = 0;
+                    for (var i = 0; i < v.times.length; i++) { if (v.times[i] <= state.cursor) { nearest = i; } }
+                    slider.value = nearest;
+                    show(nearest);
+                });
+            }
+
+            function show(i) {
+                var level = view.level;
+                state.cursor = view.times[i];
+                for (var z = 0; z < markers.length; z++) {
+                    // Worst class reached in the bucket: the lowest threshold with any step below it
+                    var cls = index.thresholds.length;
+                    for (var t = 0; t < index.thresholds.length; t++) {
+                        if (view.below[z][t][i] > 0) { cls = t; break; }
+                    }
+                    var counts = '';
+                    for (var t = index.thresholds.length - 1; t >= 0; t--) {
+                        counts += '<br>&lt;' + index.thresholds[t] + 'm: ' + view.below[z][t][i] + ' of ' + view.count[i] + ' steps';
+                    }
+                    markers[z].setStyle({fillColor: colors[cls]});
+                    markers[z].setTooltipContent(index.zones[z] + ': min ' + Math.round(view.min[z][i]) +
+                                                 'm, mean ' + Math.round(view.mean[z][i]) + 'm');
+                    markers[z].setPopupContent(
+                        '<div style="min-width: 200px;"><h4 style="margin: 5px 0; color: ' + colors[cls] + ';">' +
+                        index.zones[z] + '</h4><p><strong>Min RVR:</strong> ' + Math.round(view.min[z][i]) +
+                        'm<br><strong>Mean RVR:</strong> ' + Math.round(view.mean[z][i]) + 'm' + counts +
+                        '</p><p><strong>Status (worst):</strong> ' + statuses[cls] + '</p><p><strong>' +
+                        level.name + ' from:</strong> ' + fmt(view.times[i]) + '</p></div>');
+                }
+                label.textContent = level.name + ' · ' + fmt(view.times[i]) +
+                    (level.seconds > 600 ? ' – ' + fmt(view.times[i] + level.seconds) : '');
+            }
+
+            function setSpan(span) {
+                state.span = span;
+                if (span) { state.start = state.cursor - span / 2; }
+                clamp();
+                refresh();
+            }
+
+            function pan(direction) {
+                if (!state.span) { return; }
+                state.start += direction * state.span / 2;
+                clamp();
+                state.cursor = Math.min(Math.max(state.cursor, state.start), state.start + state.span - 1);
+                refresh();
+            }
+
+            function clamp() {
+                if (!state.span) { return; }
+                state.start = Math.max(index.start, Math.min(state.start, index.end + 1 - state.span));
+            }
+
+            var control = L.control({position: 'bottomleft'});
+            var slider, label;
+            control.onAdd = function() {
+                var div = L.DomUtil.create('div', 'leaflet-bar rvr-pyramid');
+                div.style.cssText = 'background: white; padding: 6px 10px; font: 12px sans-serif;';
+                var back = L.DomUtil.create('button', '', div);
+                back.textContent = '◀';
+                back.addEventListener('click', function() { pan(-1); });
+                slider = L.DomUtil.create('input', '', div);
+                slider.type = 'range';
+                slider.min = 0;
+                slider.max = 0;
+                slider.style.cssText = 'width: 360px; vertical-align: middle; margin: 0 6px;';
+                slider.addEventListener('input', function() { if (view) { show(+slider.value); } });
+                var forward = L.DomUtil.create('button', '', div);
+                forward.textContent = '▶';
+                forward.addEventListener('click', function() { pan(1); });
+                spans.forEach(function(entry) {
+                    var button = L.DomUtil.create('button', '', div);
+                    button.textContent = entry[0];
+                    button.addEventListener('click', function() { setSpan(entry[1]); });
+                });
+                label = L.DomUtil.create('span', '', div);
+                label.style.marginLeft = '8px';
+                label.textContent = 'Loading...';
+                L.DomEvent.disableClickPropagation(div);
+                L.DomEvent.disableScrollPropagation(div);
+                return div;
+            };
+            control.addTo(map);
+
+            fetch(base + 'index.json', {cache: 'no-store'}).then(function(r) { return r.json(); }).then(function(data) {
+                index = data;
+                state.cursor = index.end;
+                refresh();
+            });
+        })();
+        {% endmacro %}
+"""
+
+
+class PyramidRVRLayer(MacroElement):
+    """
+    Zone markers over a multi-resolution time range
+
+    The visible span (All / Month / Week / Day, panned with the arrows)
+    picks the pyramid level, and only the tiles covering the span are
+    fetched. Markers are colored by the worst class reached in the bucket.
+    """
+
+    _template = Template(PYRAMID_LAYER_TEMPLATE)
+
+    def __init__(self, marker_names: List[str], base_url: str, max_buckets: int = 400):
+        super().__init__()
+        self._name = 'PyramidRVRLayer'
+        self.marker_names = marker_names
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.max_buckets = max_buckets
+        self.colors = RVR_COLORS.tolist()
+        self.statuses = RVR_STATUSES.tolist()
+
+
+def add_pyramid_layer(m, runway_positions: Dict, base_url: str, max_buckets: Optional[int] = 400):
+    """
+    Add fixed zone markers browsing a pyramid written by write_pyramid
+
+    Args:
+        m: folium.Map
+        runway_positions: Dictionary of zone name -> (lat, lon)
+        base_url: URL of the pyramid directory, relative to the page (served over HTTP)
+        max_buckets: Most buckets shown at once; picks the level for a span
+
+    Returns:
+        The PyramidRVRLayer element
+    """
+    zone_names = list(runway_positions.keys())
+    marker_names = add_zone_markers(m, zone_names, [list(p) for p in runway_positions.values()])
+    layer = PyramidRVRLayer(marker_names, base_url, max_buckets=max_buckets)
+    layer.add_to(m)
+    return layer
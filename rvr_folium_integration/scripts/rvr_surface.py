@@ -0,0 +1,211 @@
+import base64
+import struct
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from rvr_map_payload import (DEFAULT_RVR, PAYLOAD_VERSION, RVR_COLORS, ZONE_TO_COLUMN, epoch_seconds,
+                             rvr_classes, round_rvr_values)
+
+
+EARTH_RADIUS_M = 6371008.8
+SURFACE_CELL_M = 50       # Grid resolution
+SURFACE_MARGIN_M = 500    # Grid extent beyond the outermost zones
+IDW_POWER = 2
+# Overlay RGBA per color bin (RVR_COLORS), translucent so the runways show through
+SURFACE_RGBA = {
+    'darkred': (139, 0, 0, 150),
+    'red': (255, 0, 0, 130),
+    'orange': (255, 165, 0, 110),
+    'green': (0, 128, 0, 70),
+}
+
+
+class SurfaceGrid:
+    """
+    Inverse-distance weights from the zone sensors to a regular lat/lon grid
+
+    Built once per geometry (see surface_grid): interpolating a time step is
+    then one matrix-vector product, and a whole window of steps one
+    matrix-matrix product. Missing sensor values drop out of both the
+    weighted sum and the normalisation, so every cell and every missing
+    zone is interpolated from the sensors that did report.
+    """
+
+    def __init__(self, coords: List, cell_m: float = SURFACE_CELL_M,
+                 margin_m: float = SURFACE_MARGIN_M, power: float = IDW_POWER):
+        """
+        Lay out the grid and precompute the weights
+
+        Args:
+            coords: [lat, lon] per zone sensor
+            cell_m: Grid cell size (m)
+            margin_m: Grid extent beyond the outermost sensors (m)
+            power: Inverse-distance power
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        lat0 = np.radians(coords[:, 0].mean())
+        m_per_deg_lat = np.radians(1) * EARTH_RADIUS_M
+        m_per_deg_lon = m_per_deg_lat * np.cos(lat0)
+
+        margin_lat, margin_lon = margin_m / m_per_deg_lat, margin_m / m_per_deg_lon
+        south, north = coords[:, 0].min() - margin_lat, coords[:, 0].max() + margin_lat
+        west, east = coords[:, 1].min() - margin_lon, coords[:, 1].max() + margin_lon
+        self.shape = (max(1, int(np.ceil((north - south) * m_per_deg_lat / cell_m))),
+                      max(1, int(np.ceil((east - west) * m_per_deg_lon / cell_m))))
+        self.bounds = [[float(south), float(west)], [float(north), float(east)]]
+
+        # Cell centres, north row first (image order); local metres from the grid corner
+        rows, cols = self.shape
+        cell_lat = north - (np.arange(rows) + 0.5) * (north - south) / rows
+        cell_lon = west + (np.arange(cols) + 0.5) * (east - west) / cols
+        cell_y = ((cell_lat - south) * m_per_deg_lat)[:, None].repeat(cols, axis=1).ravel()
+        cell_x = ((cell_lon - west) * m_per_deg_lon)[None, :].repeat(rows, axis=0).ravel()
+        sensor_y = (coords[:, 0] - south) * m_per_deg_lat
+        sensor_x = (coords[:, 1] - west) * m_per_deg_lon
+
+        # sensors x cells; a cell on top of a sensor is dominated by it
+        distance = np.hypot(cell_x - sensor_x[:, None], cell_y - sensor_y[:, None])
+        self.weights = np.maximum(distance, 1.0) ** -power
+        # sensors x sensors, leave-one-out, for filling missing zones
+        between = np.hypot(sensor_x[:, None] - sensor_x, sensor_y[:, None] - sensor_y)
+        self.zone_weights = np.where(np.eye(len(coords), dtype=bool), 0.0, np.maximum(between, 1.0) ** -power)
+
+    @staticmethod
+    def _interpolate(weights: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """steps x targets weighted means of the present values (weights: sensors x targets)"""
+        present = ~np.isnan(values)
+        result = np.where(present, values, 0.0).T @ weights
+        denominator = present.T.astype(float) @ weights
+        # No sensor reported at all
+        empty = denominator == 0
+        if empty.any():
+            denominator[empty] = 1.0
+            result /= denominator
+            result[empty] = DEFAULT_RVR
+        else:
+            result /= denominator
+        return result
+
+    def interpolate(self, values: np.ndarray) -> np.ndarray:
+        """
+        RVR surface for sensor values
+
+        Args:
+            values: sensors x steps values (NaN = missing)
+
+        Returns:
+            steps x rows x cols surface
+        """
+        values = np.asarray(values, dtype=float).reshape(len(self.weights), -1)
+        return self._interpolate(self.weights, values).reshape(-1, *self.shape)
+
+    def fill_missing(self, values: np.ndarray) -> np.ndarray:
+        """
+        Sensor values with the missing ones interpolated from the others
+
+        Args:
+            values: sensors x steps values (NaN = missing)
+
+        Returns:
+            sensors x steps values without NaN
+        """
+        values = np.asarray(values, dtype=float)
+        return np.where(np.isnan(values), self._interpolate(self.zone_weights, values).T, values)
+
+
+_grids: Dict[Tuple, SurfaceGrid] = {}
+
+
+def surface_grid(coords: List, cell_m: float = SURFACE_CELL_M, margin_m: float = SURFACE_MARGIN_M,
+                 power: float = IDW_POWER) -> SurfaceGrid:
+    """SurfaceGrid for a geometry, built on first use and cached per process"""
+    key = (tuple(map(tuple, np.asarray(coords, dtype=float).reshape(-1, 2).tolist())), cell_m, margin_m, power)
+    grid = _grids.get(key)
+    if grid is None:
+        grid = _grids[key] = SurfaceGrid(coords, cell_m, margin_m, power)
+    return grid
+
+
+def zone_value_matrix(df: pd.DataFrame, zone_names: List[str]) -> np.ndarray:
+    """Predicted value of every zone at every row (zones x rows, NaN where missing)"""
+    values = np.full((len(zone_names), len(df)), np.nan)
+    for i, zone_name in enumerate(zone_names):
+        column_name = ZONE_TO_COLUMN.get(zone_name)
+        if column_name in df.columns:
+            values[i] = pd.to_numeric(df[column_name], errors='coerce').to_numpy(dtype=float)
+    return values
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def png_data_uri(indices: np.ndarray, palette: List[Tuple[int, int, int, int]]) -> str:
+    """
+    Encode a 2-D array of palette indices as a paletted PNG data URI
+
+    Args:
+        indices: rows x cols uint8 palette indices
+        palette: RGBA per index
+
+    Returns:
+        'data:image/png;base64,...'
+    """
+    rows, cols = indices.shape
+    # Filter byte 0 (none) before every row
+    raw = np.hstack([np.zeros((rows, 1), dtype=np.uint8), indices.astype(np.uint8)]).tobytes()
+    png = (b'\x89PNG\r\n\x1a\n'
+           + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', cols, rows, 8, 3, 0, 0, 0))
+           + _png_chunk(b'PLTE', bytes(channel for rgba in palette for channel in rgba[:3]))
+           + _png_chunk(b'tRNS', bytes(rgba[3] for rgba in palette))
+           + _png_chunk(b'IDAT', zlib.compress(raw, 9))
+           + _png_chunk(b'IEND', b''))
+    return 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
+
+
+def build_surface_payload(df: pd.DataFrame, runway_positions: Dict, cell_m: float = SURFACE_CELL_M) -> Dict:
+    """
+    Compact payload plus one color-binned surface image per time step
+
+    Zone values that are missing are interpolated from the other zones
+    (DEFAULT_RVR only when no zone reported) and flagged in 'filled'.
+
+    Args:
+        df: DataFrame with a parsed Datetime column (rows in display order)
+        runway_positions: Dictionary of zone name -> (lat, lon)
+        cell_m: Grid cell size (m)
+
+    Returns:
+        Payload in build_compact_payload's layout, plus 'filled' (per zone,
+        a digit per step: 1 = interpolated) and 'surface' (bounds, frames)
+    """
+    zone_names = list(runway_positions.keys())
+    coords = [[lat, lon] for lat, lon in runway_positions.values()]
+    grid = surface_grid(coords, cell_m)
+
+    raw = zone_value_matrix(df, zone_names)
+    filled = grid.fill_missing(raw)
+    classes = rvr_classes(grid.interpolate(raw)).astype(np.uint8)
+    palette = [SURFACE_RGBA[color] for color in RVR_COLORS.tolist()]
+
+    seconds = epoch_seconds(df['Datetime'])
+    t0 = int(seconds[0]) if len(seconds) else 0
+    payload = {
+        'version': PAYLOAD_VERSION,
+        'zones': zone_names,
+        'coords': coords,
+        't0': t0,
+        'offsets': (seconds - t0).tolist(),
+        'values': [round_rvr_values(zone_values) for zone_values in filled.tolist()],
+        'classes': [''.join(map(str, row)) for row in rvr_classes(filled).tolist()],
+        'filled': [''.join('1' if missing else '0' for missing in row) for row in np.isnan(raw).tolist()],
+        'surface': {
+            'bounds': grid.bounds,
+            'shape': list(grid.shape),
+            'frames': [png_data_uri(step, palette) for step in classes],
+        },
+    }
+    return payload
@@ -0,0 +1,157 @@
+import io
+import os
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from rvr_features import parse_rvr_datetime
+
+
+class CSVTailReader:
+    """
+    Incremental reader for the newest rows of an append-only CSV log
+
+    The first read seeks backwards from EOF to collect the last max_rows
+    complete lines; later reads only consume bytes appended since the
+    remembered offset. A last line without its newline may still be being
+    written, so it is left out until the newline arrives. Work per read is
+    bounded by max_rows and the amount of new data, not by the size of the
+    file. Truncation or replacement of the file (smaller size or new inode)
+    triggers a fresh tail scan, and so does an in-place rewrite: a new
+    mtime without growth, or a last consumed line whose bytes changed.
+    """
+
+    def __init__(self, path, max_rows: int = 100, block_size: int = 64 * 1024,
+                 datetime_column: Optional[str] = 'Datetime'):
+        """
+        Initialize the tail reader
+
+        Args:
+            path: CSV file to follow
+            max_rows: Number of newest rows kept and returned
+            block_size: Bytes read per backwards seek step
+            datetime_column: Column parsed as RVR timestamps (None to skip)
+        """
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.block_size = block_size
+        self.datetime_column = datetime_column
+
+        self.header_line: Optional[str] = None
+        self.offset = 0
+        self._identity = None
+        self._mtime_ns = None
+        self._lines = deque(maxlen=max_rows)
+        self._last_line = b''
+        self._unterminated = b''
+        self._frame: Optional[pd.DataFrame] = None
+        self.stats = {'reads': 0, 'full_scans': 0, 'bytes_read': 0, 'unchanged_reads': 0}
+
+    def reset(self):
+        """Forget cached state; the next read rescans the tail"""
+        self.header_line = None
+        self.offset = 0
+        self._identity = None
+        self._mtime_ns = None
+        self._lines.clear()
+        self._last_line = b''
+        self._unterminated = b''
+        self._frame = None
+
+    def _scan_tail(self, f, size: int):
+        """Read the header and the last max_rows complete lines"""
+        self.stats['full_scans'] += 1
+        f.seek(0)
+        header = f.readline()
+        self.stats['bytes_read'] += len(header)
+        self.header_line = header.decode('utf-8-sig').rstrip('\r\n') + '\n'
+        header_end = len(header)
+
+        # Walk backwards until enough newlines are buffered (or the header is reached)
+        position = size
+        chunk = b''
+        while position > header_end and chunk.count(b'\n') <= self.max_rows:
+            step = min(self.block_size, position - header_end)
+            position -= step
+            f.seek(position)
+            chunk = f.read(step) + chunk
+            self.stats['bytes_read'] += step
+
+        self._lines.clear()
+        self._last_line = b''
+        self.offset = header_end
+        self._consume(chunk, base_offset=position, skip_partial_head=position > header_end)
+
+    def _consume(self, data: bytes, base_offset: int, skip_partial_head: bool = False):
+        """Split new bytes into complete lines and advance the offset past them"""
+        start = 0
+        if skip_partial_head:
+            # The first piece may be the tail end of an older line
+            start = data.find(b'\n') + 1
+        last_newline = data.rfind(b'\n')
+        if last_newline >= start:
+            for line in data[start:last_newline + 1].decode('utf-8').splitlines(keepends=True):
+                if line.strip():
+                    self._lines.append(line if line.endswith('\n') else line + '\n')
+            self.offset = base_offset + last_newline + 1
+            # Raw bytes of the line ending at the offset, to detect in-place rewrites
+            self._last_line = data[max(data.rfind(b'\n', 0, last_newline) + 1, start):last_newline + 1]
+        # Bytes after the last newline are a line still being written (or a
+        # final line without a terminator); they are not parsed until their
+        # newline arrives, and are re-read from the offset next time
+        self._unterminated = data[max(last_newline + 1, start):]
+
+    def read(self) -> pd.DataFrame:
+        """
+        Get the newest rows
+
+        Returns:
+            DataFrame with up to max_rows rows (Datetime parsed, invalid dates dropped)
+
+        Raises:
+            FileNotFoundError: The file does not exist
+        """
+        self.stats['reads'] += 1
+        stat = os.stat(self.path)
+        identity = (stat.st_dev, stat.st_ino)
+
+        same_size = stat.st_size == self.offset + len(self._unterminated)
+        if self._frame is not None and identity == self._identity and same_size and \
+                stat.st_mtime_ns == self._mtime_ns:
+            self.stats['unchanged_reads'] += 1
+            return self._frame
+
+        with open(self.path, 'rb') as f:
+            if self.header_line is None or identity != self._identity or stat.st_size < self.offset or \
+                    same_size or not self._tail_intact(f):
+                # Written without growing (rewritten in place) or the last line changed
+                self._scan_tail(f, stat.st_size)
+            else:
+                f.seek(self.offset)
+                data = f.read(stat.st_size - self.offset)
+                self.stats['bytes_read'] += len(data)
+                self._consume(data, base_offset=self.offset)
+        self._identity = identity
+        self._mtime_ns = stat.st_mtime_ns
+
+        self._frame = self._parse()
+        return self._frame
+
+    def _tail_intact(self, f) -> bool:
+        """Whether the bytes just before the offset are still the last consumed line"""
+        if not self._last_line:
+            return True
+        f.seek(self.offset - len(self._last_line))
+        data = f.read(len(self._last_line))
+        self.stats['bytes_read'] += len(data)
+        return data == self._last_line
+
+    def _parse(self) -> pd.DataFrame:
+        # Only newline-terminated rows: an unterminated one may still be mid-write
+        df = pd.read_csv(io.StringIO(self.header_line + ''.join(self._lines)))
+        if self.datetime_column and self.datetime_column in df.columns:
+            df[self.datetime_column] = parse_rvr_datetime(df[self.datetime_column])
+            df = df.dropna(subset=[self.datetime_column]).reset_index(drop=True)
+        return df
@@ -0,0 +1,67 @@
+import hashlib
+import os
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+
+def file_fingerprint(path) -> Optional[Tuple[int, int]]:
+    """
+    Cheap change fingerprint of a file
+
+    Args:
+        path: File path
+
+    Returns:
+        (size, mtime_ns) or None if the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def files_fingerprint(paths: Iterable) -> Tuple:
+    """Fingerprint of a set of files, independent of listing order"""
+    return tuple(sorted((str(path), file_fingerprint(path)) for path in paths))
+
+
+def row_fingerprint(row) -> Optional[Tuple[object, str]]:
+    """
+    Content fingerprint of a data row
+
+    Args:
+        row: pandas Series (e.g. the newest RVR log row) or None
+
+    Returns:
+        (Datetime value, digest of every value in the row) or None
+    """
+    if row is None:
+        return None
+    digest = hashlib.blake2b(repr(list(row.items())).encode('utf-8'), digest_size=16).hexdigest()
+    return (row.get('Datetime'), digest)
+
+
+class ChangeDetector:
+    """
+    Remembers input fingerprints as of the last executed update cycle
+
+    Fingerprints are compared with changed() and only recorded with
+    commit() once the work that depends on them has succeeded, so a failed
+    cycle is retried on the next tick.
+    """
+
+    def __init__(self):
+        self._committed: Dict[Hashable, object] = {}
+
+    def changed(self, key: Hashable, fingerprint) -> bool:
+        """Whether the fingerprint differs from the committed one (always True the first time)"""
+        return key not in self._committed or self._committed[key] != fingerprint
+
+    def commit(self, key: Hashable, fingerprint):
+        self._committed[key] = fingerprint
+
+    def reset(self):
+        self._committed.clear()
+
+    def snapshot(self) -> Dict[Hashable, object]:
+        return dict(self._committed)
@@ -0,0 +1,203 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from source_fingerprint import files_fingerprint
+
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# IN_MODIFY is honoured for CSV logs only: appenders that keep the file open
+# never close it, and the tail reader holds back an unterminated row anyway
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """Return libc with inotify symbols, or None where inotify is unavailable"""
+    if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class SourceWatcher:
+    """
+    Notifies the update loop when files in the source directories change
+
+    Uses inotify on Linux and falls back to stat polling elsewhere (or when
+    inotify cannot be initialized). With inotify a writer closing a file or
+    renaming one into place counts, and so does any write to a CSV log, so
+    loggers that keep the file open are seen too. A write can land in the
+    middle of a row; the tail reader leaves that unfinished row unparsed
+    until its newline arrives. Excel workbooks only count once closed or
+    renamed, since a half-written workbook cannot be read. Bursts of writes
+    are debounced: wait() returns once the directories have been quiet for
+    `debounce` seconds, or after `max_debounce` seconds of continuous writes.
+    """
+
+    def __init__(self, directories: Iterable, debounce: float = 0.2, max_debounce: float = 2.0,
+                 poll_interval: float = 0.5, use_inotify: bool = True):
+        """
+        Initialize the watcher
+
+        Args:
+            directories: Directories to watch (e.g., data/raw/rvr_logs, data/raw/weather)
+            debounce: Quiet period that ends a burst of writes (seconds)
+            max_debounce: Longest a continuous burst can delay a notification (seconds)
+            poll_interval: Stat polling period for the fallback mode (seconds)
+            use_inotify: Try inotify before falling back to polling
+        """
+        self.directories: List[Path] = [Path(d) for d in directories]
+        self.debounce = debounce
+        self.max_debounce = max_debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+
+        self.mode = None
+        self._condition = threading.Condition()
+        self._first_event = None
+        self._last_event = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fd = None
+        self.events = 0
+        self.notifications = 0
+
+    def start(self):
+        """Start watching in a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        libc = _load_inotify() if self.use_inotify else None
+        if libc is not None and self._init_inotify(libc):
+            self.mode = 'inotify'
+            target = self._inotify_loop
+        else:
+            self.mode = 'polling'
+            target = self._polling_loop
+        self._thread = threading.Thread(target=target, name="rvr-source-watcher", daemon=True)
+        self._thread.start()
+        print(f"👀 Watching {', '.join(str(d) for d in self.directories)} ({self.mode})")
+
+    def stop(self):
+        """Stop the watcher thread"""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            os.close(fd)
+
+    def _init_inotify(self, libc) -> bool:
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        watched = 0
+        for directory in self.directories:
+            if directory.is_dir() and libc.inotify_add_watch(fd, str(directory).encode(), WATCH_MASK) >= 0:
+                watched += 1
+        if not watched:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def _mark_event(self):
+        now = time.monotonic()
+        with self._condition:
+            self.events += 1
+            if self._first_event is None:
+                self._first_event = now
+            self._last_event = now
+            self._condition.notify_all()
+
+    def _inotify_loop(self):
+        fd = self._fd
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([fd], [], [], 0.5)
+                if not ready:
+                    continue
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except (OSError, ValueError):
+                break  # descriptor closed by stop()
+            # Ignore editor/temp files; only real data files count as new data
+            offset = 0
+            relevant = False
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + name_len].rstrip(b'\0')
+                offset += _EVENT_HEADER.size + name_len
+                if name.startswith((b'.', b'~$')):
+                    continue
+                if name.endswith(b'.csv') or (name.endswith(b'.xlsx') and not mask & IN_MODIFY):
+                    relevant = True
+            if relevant:
+                self._mark_event()
+
+    def _polling_loop(self):
+        def fingerprint():
+            paths = []
+            for directory in self.directories:
+                if directory.is_dir():
+                    paths.extend(p for p in directory.iterdir() if p.suffix in ('.csv', '.xlsx'))
+            return files_fingerprint(paths)
+
+        previous = fingerprint()
+        while not self._stop.wait(self.poll_interval):
+            current = fingerprint()
+            if current != previous:
+                previous = current
+                self._mark_event()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until new data has settled or the timeout passes
+
+        Args:
+            timeout: Longest to wait (seconds); the caller's staleness bound
+
+        Returns:
+            True if a (debounced) change was seen, False on timeout or stop
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if self._last_event is not None:
+                    quiet_for = now - self._last_event
+                    burst_for = now - self._first_event
+                    if quiet_for >= self.debounce or burst_for >= self.max_debounce:
+                        self._first_event = None
+                        self._last_event = None
+                        self.notifications += 1
+                        return True
+                    wake_at = min(self._last_event + self.debounce, self._first_event + self.max_debounce)
+                else:
+                    wake_at = deadline
+                if now >= deadline:
+                    return False
+                self._condition.wait(max(0.0, min(wake_at, deadline) - now))
+        return False
@@ -6,12 +6,46 @@ This script runs one update cycle to verify everything works correctly
 
 import sys
 import os
+import asyncio
+import contextlib
+import json
+import shutil
+import io
+import tempfile
+import threading
+from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from real_time_rvr_system import RealTimeRVRSystem
+from runway_geometry import destination
+from rvr_features import parse_rvr_datetime
+from rvr_tail_reader import CSVTailReader
+from source_watcher import SourceWatcher
+from generate_rvr_map import RUNWAYS, prepare_time_series_data, runway_positions
+from live_map_server import LiveMapServer
+from live_rvr_predictor import LiveRVRPredictor
+from prediction_service import PredictionService, ServiceError
+from prediction_snapshot import build_snapshot
+from prediction_writer import PredictionWriter
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+MODEL_DIR = SCRIPTS_DIR.parent / "saved_models"
+RVR_COLUMNS = ['RWY 09 (BEG)', 'RWY 09 (TDZ)', 'RWY 10 (TDZ)', 'RWY 11 (BEG)', 'RWY 11 (TDZ)', 'RWY 27 (MID)',
+               'RWY 28 (BEG)', 'RWY 28 (MID)', 'RWY 28 (TDZ)', 'RWY 29 (BEG)', 'RWY 29 (MID)']
+
+def _write_rvr_log(path, periods=30, start='2024-01-01'):
+    """Synthetic RVR log in the raw format: a fog bank thickening from 1000 m to 400 m"""
+    times = pd.date_range(start, periods=periods, freq='10min')
+    df = pd.DataFrame({column: np.linspace(1000, 400, periods) + 10 * i for i, column in enumerate(RVR_COLUMNS)})
+    df.insert(0, 'Datetime', times.strftime('%Y-%m-%d %H:%M'))
+    df.to_csv(path, index=False, float_format='%.1f')
+    return df
 
 def test_single_update():
     """Test a single update cycle of the real-time system"""
@@ -49,5 +83,488 @@ def test_single_update():
     print(f"   Check the 'real_time_predictions' directory for generated CSV files")
     print(f"   Run 'python scripts/generate_rvr_map.py' to create the map with real-time data")
 
+def test_tail_reader_partial_row():
+    """A row appended in two writes is only read once its newline arrives"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "rvr.csv"
+        path.write_text("Datetime,RWY_11_BEG\n2024-01-01 00:00,1000.0\n")
+        reader = CSVTailReader(path, max_rows=10)
+        assert reader.read()['RWY_11_BEG'].tolist() == [1000.0]
+
+        # The writer has only got as far as the first digit of the value
+        with open(path, 'a') as f:
+            f.write("2024-01-01 00:10,3")
+        assert reader.read()['RWY_11_BEG'].tolist() == [1000.0]
+
+        with open(path, 'a') as f:
+            f.write("333.0\n")
+        assert reader.read()['RWY_11_BEG'].tolist() == [1000.0, 3333.0]
+    print("✅ Tail reader waits for complete rows")
+
+def _rewrite_in_place(path, old, new):
+    """Rewrite a file through the same inode, with a later mtime than the last write"""
+    stat = os.stat(path)
+    with open(path, 'r+') as f:
+        text = f.read()
+        f.seek(0)
+        f.write(text.replace(old, new))
+        f.truncate()
+    # Coarse filesystem clocks can give two quick writes the same mtime
+    os.utime(path, ns=(stat.st_atime_ns, max(os.stat(path).st_mtime_ns, stat.st_mtime_ns + 1)))
+
+def test_tail_reader_in_place_rewrite():
+    """Rows corrected in place are re-read, whether or not the file grows"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "rvr.csv"
+        path.write_text("Datetime,RWY_11_BEG\n2024-01-01 00:00,1000.0\n2024-01-01 00:10,3333.0\n")
+        reader = CSVTailReader(path, max_rows=10)
+        assert reader.read()['RWY_11_BEG'].tolist() == [1000.0, 3333.0]
+
+        # Same length: only the mtime tells
+        _rewrite_in_place(path, "3333.0", "1200.0")
+        assert reader.read()['RWY_11_BEG'].tolist() == [1000.0, 1200.0]
+
+        # Longer: the bytes after the old offset are not a new row
+        _rewrite_in_place(path, "1200.0", "1200.25")
+        assert reader.read()['RWY_11_BEG'].tolist() == [1000.0, 1200.25]
+
+        with open(path, 'a') as f:
+            f.write("2024-01-01 00:20,900.0\n")
+        assert reader.read()['RWY_11_BEG'].tolist() == [1000.0, 1200.25, 900.0]
+    print("✅ Tail reader picks up in-place rewrites")
+
+def _temp_system(tmp_dir, **kwargs):
+    """A RealTimeRVRSystem over tmp_dir/rvr (a 30-row RVR log), an empty weather dir and tmp_dir/out"""
+    (tmp_dir / "rvr").mkdir(exist_ok=True)
+    (tmp_dir / "weather").mkdir(exist_ok=True)
+    if not (tmp_dir / "rvr" / "RVR_2024.csv").exists():
+        _write_rvr_log(tmp_dir / "rvr" / "RVR_2024.csv")
+    kwargs.setdefault('snapshot_interval', None)
+    return RealTimeRVRSystem(tmp_dir / "rvr", tmp_dir / "weather", tmp_dir / "out",
+                             model_dir=str(MODEL_DIR), watch_models=False, **kwargs)
+
+def test_corrected_row_is_reingested():
+    """Correcting the newest RVR row in place re-runs the cycle; an untouched log is skipped"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        rvr_path = tmp_dir / "rvr" / "RVR_2024.csv"
+        with contextlib.redirect_stdout(io.StringIO()):
+            system = _temp_system(tmp_dir)
+            system.warm_start()
+            system.update_system()
+            first = system.get_latest_snapshot()
+            system.update_system()
+            assert system.cycle_stats['skipped'] == 1
+            assert system.get_latest_snapshot() is first
+
+            # The last reading of every zone was wrong; same length, same Datetime
+            _rewrite_in_place(rvr_path, "\n2024-01-01 04:50,400.0,", "\n2024-01-01 04:50,950.0,")
+            system.update_system()
+        second = system.get_latest_snapshot()
+        assert second.sequence == first.sequence + 1
+        assert second.timestamp == first.timestamp
+        index = second.zones.index('RWY_09_BEG')
+        assert second.currents[index] == 950.0 and first.currents[index] == 400.0
+        assert second.predictions[index] != first.predictions[index]
+        # The correction replaced the history entry instead of adding one
+        history = system.predictor.historical_data['RWY_09_BEG']
+        assert [entry['value'] for entry in history[-2:]] == [history[-2]['value'], 950.0]
+        assert history[-1]['timestamp'] != history[-2]['timestamp']
+    print("✅ Corrected RVR row re-ingested")
+
+def test_status_does_not_wait_for_publish():
+    """get_system_status answers while a publish holds the publish lock"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            system = _temp_system(Path(tmp_dir))
+            system.update_system()
+        result = {}
+        with system._publish_lock:
+            reader = threading.Thread(target=lambda: result.update(system.get_system_status()))
+            reader.start()
+            reader.join(timeout=5)
+            assert not reader.is_alive(), "status read blocked on the publish lock"
+        assert result['prediction_writer']['rows_written'] == 1
+        assert result['cycles_executed'] == 1
+    print("✅ Status read does not wait for publish")
+
+def test_service_rejects_bad_input():
+    """Malformed zone keys, offset timestamps and Content-Length get a 400, not a 500 or a dropped connection"""
+    async def status_of(coroutine):
+        try:
+            await coroutine
+        except ServiceError as e:
+            return e.status
+        return 200
+
+    async def raw_request(port, request):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+        return response
+
+    async def run(service):
+        body = {'zone': 'RWY_09_BEG', 'values': [800.0] * (service.predictor.max_lag + 1)}
+        assert await status_of(service.predict({**body, 'latest': {'RWY_09': 700}})) == 400
+        for query in ("start=2024-01-01T00:00Z&end=2024-01-02", "start=2024-01-01&end=2024-01-02T00:00%2B05:30"):
+            assert await status_of(service.route('GET', f"/range?{query}", b'')) == 400
+        assert await status_of(service.predict({**body, 'timestamp': '2024-01-01T06:00+00:00'})) == 400
+
+        server = await service.start()
+        port = server.sockets[0].getsockname()[1]
+        try:
+            for length in (b'abc', b'-1'):
+                response = await raw_request(port, b"POST /predict HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+                assert response.startswith(b"HTTP/1.1 400 "), response
+        finally:
+            await service.stop()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor = LiveRVRPredictor(model_dir=str(MODEL_DIR))
+            asyncio.run(run(PredictionService(predictor, output_dir=tmp_dir, port=0)))
+    print("✅ Service rejects malformed input with 400")
+
+def test_backfill_matches_row_replay():
+    """Vectorized and month-sharded backfills write the CSV a row-by-row replay would"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        (tmp_dir / "rvr").mkdir()
+        rvr_path = tmp_dir / "rvr" / "RVR_2024.csv"
+        # Crosses a month boundary (two shards), with gaps and a saturated spell
+        _write_rvr_log(rvr_path, periods=160, start='2024-01-30 12:00')
+        log = pd.read_csv(rvr_path)
+        log.loc[20:25, 'RWY 09 (BEG)'] = np.nan
+        log.loc[60:80, RVR_COLUMNS] = 3333.0
+        log.loc[100, 'RWY 28 (MID)'] = np.nan
+        log.to_csv(rvr_path, index=False, float_format='%.1f')
+        start, end = pd.Timestamp('2024-01-30 12:00'), pd.Timestamp('2024-02-01 14:30')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            replay_system = _temp_system(tmp_dir)
+            rows = log.assign(Datetime=parse_rvr_datetime(log['Datetime']))
+            records = []
+            for _, row in rows.iterrows():
+                replay_system.latest_rvr_data = row
+                record = replay_system.create_prediction_record(*replay_system.generate_predictions())
+                record['Datetime'] = pd.Timestamp(record['Datetime']).strftime('%Y-%m-%d %H:%M')
+                records.append(record)
+            replay = pd.DataFrame(records)
+
+            vectorized = pd.read_csv(_temp_system(tmp_dir).batch_predict_for_time_range(start, end))
+            sharded = pd.read_csv(_temp_system(tmp_dir).backfill_range(start, end, workers=2))
+
+        replay = pd.read_csv(io.StringIO(replay.to_csv(index=False)))
+        for name, frame in (('vectorized', vectorized), ('sharded', sharded)):
+            pd.testing.assert_frame_equal(frame[replay.columns], replay, check_exact=False, rtol=1e-6, obj=name)
+    print("✅ Vectorized and sharded backfills match the row replay")
+
+def test_backfill_date_only_end():
+    """A date-only backfill end covers that whole day"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        (tmp_dir / "rvr").mkdir()
+        _write_rvr_log(tmp_dir / "rvr" / "RVR_2024.csv", periods=2 * 144)
+        with contextlib.redirect_stdout(io.StringIO()):
+            system = _temp_system(tmp_dir)
+            batch_csv = system.backfill_range('2024-01-01', '2024-01-01', workers=1)
+        times = pd.read_csv(batch_csv)['Datetime']
+        assert times.iloc[0] == '2024-01-01 00:00' and times.iloc[-1] == '2024-01-01 23:50', times.iloc[-1]
+        assert len(times) == 144
+    print("✅ Date-only backfill end covers the whole day")
+
+# Row-wise slider builder as it was before the column-wise rewrite (reference for equality)
+_BASELINE_SLIDER_COLUMNS = {
+    'RWY_09_TDZ': 'RWY_09_TDZ_predicted', 'RWY_09_MID': 'RWY_09_BEG_predicted',
+    'RWY_10_TDZ': 'RWY_10_TDZ_predicted', 'RWY_10_MID': 'RWY_10_TDZ_predicted',
+    'RWY_11_TDZ': 'RWY_11_TDZ_predicted', 'RWY_11_MID': 'RWY_11_BEG_predicted',
+    'RWY_27_TDZ': 'RWY_27_MID_predicted', 'RWY_27_MID': 'RWY_27_MID_predicted',
+    'RWY_28_TDZ': 'RWY_28_TDZ_predicted', 'RWY_28_MID': 'RWY_28_MID_predicted',
+    'RWY_29_TDZ': 'RWY_29_BEG_predicted', 'RWY_29_MID': 'RWY_29_MID_predicted',
+}
+
+def _baseline_time_series_data(df, positions, hours_ahead=12):
+    reference_time = df['Datetime'].min()
+    mask = (df['Datetime'] >= reference_time) & (df['Datetime'] <= reference_time + pd.Timedelta(hours=hours_ahead))
+    filtered_df = df[mask].copy()
+    if filtered_df.empty:
+        filtered_df = df.head(hours_ahead * 6).copy()
+    features = []
+    for idx, row in filtered_df.iterrows():
+        time_str = row['Datetime'].strftime('%Y-%m-%d %H:%M:%S')
+        for zone_name, (lat, lon) in positions.items():
+            predicted_value = None
+            if zone_name in _BASELINE_SLIDER_COLUMNS:
+                column_name = _BASELINE_SLIDER_COLUMNS[zone_name]
+                if column_name in row.index and not pd.isna(row[column_name]):
+                    predicted_value = row[column_name]
+            if predicted_value is None:
+                predicted_value = 1000
+            if predicted_value >= 800:
+                color, status = 'green', 'Good'
+            elif predicted_value >= 500:
+                color, status = 'orange', 'Moderate'
+            elif predicted_value >= 200:
+                color, status = 'red', 'Poor'
+            else:
+                color, status = 'darkred', 'Very Poor'
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                'properties': {
+                    'time': time_str,
+                    'zone': zone_name,
+                    'rvr_value': round(predicted_value, 1),
+                    'status': status,
+                    'color': color,
+                    'style': {'fillColor': color, 'color': 'black', 'weight': 2, 'fillOpacity': 0.7, 'radius': 12},
+                    'popup_content': f"""
+                    <div style=\"min-width: 200px;\">
+                        <h4 style=\"margin: 5px 0; color: {color};\">{zone_name}</h4>
+                        <p><strong>Predicted RVR:</strong> {predicted_value:.0f}m</p>
+                        <p><strong>Status:</strong> {status}</p>
+                        <p><strong>Time:</strong> {time_str}</p>
+                    </div>
+                    """
+                }
+            })
+    return features
+
+def test_slider_geojson_matches_baseline():
+    """The column-wise slider builder emits the row-wise builder's GeoJSON byte for byte"""
+    rng = np.random.default_rng(41)
+    steps = 100  # beyond the 12-hour window, so the time filter is exercised too
+    df = pd.DataFrame({'Datetime': pd.date_range('2024-01-01', periods=steps, freq='10min')})
+    for zone in RVR_COLUMNS:
+        column = zone.replace(' (', '_').replace(')', '').replace(' ', '_') + '_predicted'
+        df[column] = rng.uniform(50, 1500, steps).round(2)
+    # Threshold edges, rounding ties, gaps, an integer column and a missing column
+    df.loc[:9, 'RWY_09_TDZ_predicted'] = [800.0, 799.95, 500.0, 499.99, 200.0, 199.95, 0.05, 512.25, 512.35, 3333.0]
+    df.loc[::7, 'RWY_28_MID_predicted'] = np.nan
+    df['RWY_27_MID_predicted'] = rng.integers(100, 1200, steps)
+    df = df.drop(columns='RWY_29_MID_predicted')
+    positions = runway_positions()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        features = prepare_time_series_data(df, positions, hours_ahead=12)
+    expected = _baseline_time_series_data(df, positions, hours_ahead=12)
+    assert len(features) == 73 * len(positions)
+    assert json.dumps(features) == json.dumps(expected)
+    print("✅ Slider GeoJSON matches the row-wise builder")
+
+def test_zone_positions_match_geopy():
+    """Vectorized Vincenty zone positions land within 1 cm of geopy's geodesic"""
+    try:
+        from geopy.distance import geodesic
+    except ImportError:
+        print("⏭️ geopy not installed; skipping the geodesic cross-check")
+        return
+
+    # The map's zones, derived from each runway's threshold as the original script did
+    positions = runway_positions()
+    for runway, data in RUNWAYS.items():
+        for zone, distance in (('TDZ', 300), ('MID', data['length_m'] / 2)):
+            point = geodesic(meters=distance).destination(data['beg'], data['heading'])
+            error = geodesic(positions[f'RWY_{runway}_{zone}'], (point.latitude, point.longitude)).meters
+            assert error < 0.01, f"RWY_{runway}_{zone} is {error:.4f} m off"
+
+    # Arbitrary starts, bearings and distances up to 500 km
+    rng = np.random.default_rng(49)
+    lat, lon = rng.uniform(-80, 80, 200), rng.uniform(-180, 180, 200)
+    bearing, distance = rng.uniform(0, 360, 200), rng.uniform(1, 5e5, 200)
+    lat2, lon2, _ = destination(lat, lon, bearing, distance)
+    for i in range(len(lat)):
+        point = geodesic(meters=distance[i]).destination((lat[i], lon[i]), bearing[i])
+        assert geodesic((lat2[i], lon2[i]), (point.latitude, point.longitude)).meters < 0.01
+    print("✅ Zone positions agree with geopy")
+
+def test_writer_rotation_and_atomic_latest():
+    """Day files rotate at midnight, and latest_predictions.csv is only ever replaced whole"""
+    def record(timestamp, value):
+        return {'Datetime': timestamp, 'RWY_09_BEG_predicted': value, 'RWY_09_BEG_current': value + 1}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        steps = [(datetime(2024, 1, 1, 23, 40), 410.0), (datetime(2024, 1, 1, 23, 50), 420.0),
+                 (datetime(2024, 1, 2, 0, 0), 430.0), (datetime(2024, 1, 2, 0, 10), 440.0)]
+        replaced = []
+        real_replace = os.replace
+
+        def checked_replace(src, dst):
+            # At the moment of the swap the old file is still whole and the new one complete
+            if Path(dst).name == 'latest_predictions.csv':
+                if replaced:
+                    assert Path(dst).read_text() == replaced[-1]
+                assert Path(src).parent == Path(dst).parent
+                assert len(Path(src).read_text().splitlines()) == min(len(replaced) + 1, 3) + 1
+                replaced.append(Path(src).read_text())
+            real_replace(src, dst)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            writer = PredictionWriter(tmp_dir, latest_rows=3)
+            os.replace = checked_replace
+            try:
+                for now, value in steps:
+                    writer.append(record(f"{now:%Y-%m-%d %H:%M}", value), now=now)
+            finally:
+                os.replace = real_replace
+
+            day1, day2 = writer.day_path('2024-01-01'), writer.day_path('2024-01-02')
+            assert writer.current_path == day2
+            assert writer.stats == {'rows_written': 4, 'rotations': 1, 'latest_publishes': 4}
+            assert day1.read_text().splitlines()[1:] == ['2024-01-01 23:40,410.0,411.0', '2024-01-01 23:50,420.0,421.0']
+            assert len(replaced) == 4
+            latest = writer.latest_path.read_text().splitlines()
+            assert latest == ['Datetime,RWY_09_BEG_predicted,RWY_09_BEG_current', '2024-01-01 23:50,420.0,421.0',
+                              '2024-01-02 00:00,430.0,431.0', '2024-01-02 00:10,440.0,441.0']
+
+            # A failed swap leaves the previous latest file in place and no temp file behind
+            def failing_replace(src, dst):
+                if Path(dst).name == 'latest_predictions.csv':
+                    raise OSError("disk full")
+                real_replace(src, dst)
+            os.replace = failing_replace
+            try:
+                writer.append(record('2024-01-02 00:20', 450.0), now=datetime(2024, 1, 2, 0, 20))
+                assert False, "append should have raised"
+            except OSError:
+                pass
+            finally:
+                os.replace = real_replace
+            assert writer.latest_path.read_text().splitlines() == latest
+            assert not list(tmp_dir.glob('.latest_predictions.csv.*'))
+            writer.close()
+
+            # A restart continues the day file without a second header and reseeds the latest window
+            writer = PredictionWriter(tmp_dir, latest_rows=3)
+            writer.append(record('2024-01-02 00:30', 460.0), now=datetime(2024, 1, 2, 0, 30))
+            writer.close()
+        day2_lines = day2.read_text().splitlines()
+        assert day2_lines[0] == latest[0] and day2_lines.count(latest[0]) == 1
+        assert day2_lines[-1] == '2024-01-02 00:30,460.0,461.0' and len(day2_lines) == 5
+        assert writer.latest_path.read_text().splitlines()[1:] == day2_lines[-3:]
+    print("✅ Writer rotation and atomic latest file")
+
+def test_staged_reload_waits_for_validation():
+    """A changed model file is swapped in only after it loads and passes the smoke test"""
+    import joblib
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = Path(tmp_dir) / "rvr_model_RWY_09_BEG.pkl"
+        shutil.copy(MODEL_DIR / model_path.name, model_path)
+        model_data = joblib.load(model_path)
+
+        def rewrite(data, mtime):
+            joblib.dump(data, model_path)
+            os.utime(model_path, (mtime, mtime))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor = LiveRVRPredictor(model_dir=tmp_dir)
+            original = predictor.registry.get('RWY_09_BEG')
+
+            # A model that cannot score a feature vector is rejected and never served
+            rewrite({**model_data, 'feature_columns': []}, 1_700_000_000)
+            assert predictor.check_for_model_updates() == []  # first sighting: let the write settle
+            assert predictor.check_for_model_updates() == []
+            assert predictor.apply_pending_model_updates() == []
+            assert predictor.registry.get('RWY_09_BEG') is original
+
+            # A valid replacement is staged, and serves only once the swap is applied
+            rewrite(model_data, 1_700_000_100)
+            assert predictor.check_for_model_updates() == []
+            assert predictor.check_for_model_updates() == ['RWY_09_BEG']
+            assert predictor.registry.get('RWY_09_BEG') is original
+            assert predictor.apply_pending_model_updates() == ['RWY_09_BEG']
+        swapped = predictor.registry.get('RWY_09_BEG')
+        assert swapped is not original
+        assert swapped.version == (model_path.stat().st_mtime_ns, model_path.stat().st_size)
+        assert [reload['runway_id'] for reload in predictor.model_reloads] == ['RWY_09_BEG']
+    print("✅ Staged reload waits for validation")
+
+def test_live_server_sends_changed_zones():
+    """/events sends the full state once, then only changed zones, with null for a lost value"""
+    class Source:
+        snapshot = None
+
+        def get_latest_snapshot(self):
+            return self.snapshot
+
+    zones = ('RWY_09_BEG', 'RWY_10_TDZ', 'RWY_28_MID')
+    def snapshot(sequence, timestamp, predictions, currents):
+        record = {'Datetime': timestamp}
+        record.update({f"{zone}_predicted": value for zone, value in zip(zones, predictions)})
+        record.update({f"{zone}_current": value for zone, value in zip(zones, currents)})
+        return build_snapshot(sequence, record, {}, zones=zones)
+
+    async def next_event(reader):
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if line.startswith(b'data: '):
+                return json.loads(line[len(b'data: '):])
+
+    async def run(server, source):
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        source.snapshot = snapshot(1, '2024-01-01 00:00', [800.0, 600.0, 400.0], [810.0, 610.0, 410.0])
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            await writer.drain()
+            events = [await next_event(reader)]
+            # One prediction moves; a reading disappears (NaN)
+            source.snapshot = snapshot(2, '2024-01-01 00:10', [800.0, 550.0, 400.0], [810.0, 610.0, np.nan])
+            events.append(await next_event(reader))
+            # Identical values at the same time: no event; the next change still arrives
+            source.snapshot = snapshot(3, '2024-01-01 00:10', [800.0, 550.0, 400.0], [810.0, 610.0, np.nan])
+            await asyncio.sleep(0.1)
+            source.snapshot = snapshot(4, '2024-01-01 00:20', [np.nan, 550.0, 400.0], [810.0, 610.0, np.nan])
+            events.append(await next_event(reader))
+        finally:
+            writer.close()
+            await server.stop()
+        return events
+
+    source = Source()
+    with contextlib.redirect_stdout(io.StringIO()):
+        full, second, third = asyncio.run(run(LiveMapServer(source, port=0, poll_interval=0.01), source))
+    assert full['full'] and full['values'] == {'RWY_09_BEG': 800.0, 'RWY_10_TDZ': 600.0, 'RWY_28_MID': 400.0}
+    assert second == {'seq': 2, 'time': '2024-01-01 00:10', 'full': False,
+                      'values': {'RWY_10_TDZ': 550.0}, 'currents': {'RWY_28_MID': None}}
+    assert third['seq'] == 4 and third['values'] == {'RWY_09_BEG': None} and third['currents'] == {}
+    print("✅ Live server sends only changed zones")
+
+def test_watcher_sees_open_appender():
+    """A CSV appended to by a writer that never closes the file still wakes the loop"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / "RVR_2024.csv"
+        _write_rvr_log(log, periods=3)
+        watcher = SourceWatcher([tmp], debounce=0.05)
+        with contextlib.redirect_stdout(io.StringIO()):
+            watcher.start()
+        try:
+            with open(log, 'a') as f:
+                f.write("2024-01-01 00:30," + ",".join(["500.0"] * len(RVR_COLUMNS)) + "\n")
+                f.flush()
+                assert watcher.wait(timeout=3.0), f"no notification ({watcher.mode})"
+        finally:
+            watcher.stop()
+    print("✅ Open appender test passed")
+
+
 if __name__ == "__main__":
+    test_tail_reader_partial_row()
+    test_tail_reader_in_place_rewrite()
+    test_corrected_row_is_reingested()
+    test_watcher_sees_open_appender()
+    test_status_does_not_wait_for_publish()
+    test_service_rejects_bad_input()
+    test_backfill_matches_row_replay()
+    test_backfill_date_only_end()
+    test_slider_geojson_matches_baseline()
+    test_zone_positions_match_geopy()
+    test_writer_rotation_and_atomic_latest()
+    test_staged_reload_waits_for_validation()
+    test_live_server_sends_changed_zones()
     test_single_update() 
\ No newline at end of file